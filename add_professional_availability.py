@@ -10,6 +10,8 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'server'))
 
 from database import SessionLocal
 from models import Availability, User
+from slot_engine import update_availability_bitmap
+from slot_calendar import refresh_calendar
 
 def add_availability():
     db = SessionLocal()
@@ -63,6 +65,10 @@ def add_availability():
         for avail in availabilities:
             db.add(avail)
         
+        # Atualizar agenda em bitmap e calendário de horários
+        update_availability_bitmap(db, professional)
+        refresh_calendar(db, professional)
+        
         db.commit()
         
         print(f"\n✅ {len(availabilities)} horários adicionados com sucesso!")
@@ -0,0 +1,43 @@
+"""add indexes for appointment delta sync
+
+Revision ID: add_appointment_changes_index
+Revises: add_appointment_starts_at
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_appointment_changes_index'
+down_revision = 'add_appointment_starts_at'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_appointments_patient_updated_at', ['patient_id', 'updated_at', 'id']),
+    ('ix_appointments_professional_updated_at', ['professional_id', 'updated_at', 'id']),
+]
+
+
+def upgrade():
+    """Upgrade schema - Índices (participante, updated_at, id) para /changes.
+    
+    Consultas antigas sem updated_at recebem created_at (ou o momento da
+    migração), para aparecerem na primeira sincronização. Os índices são
+    criados fora da transação (CONCURRENTLY no PostgreSQL).
+    """
+    op.execute(
+        "UPDATE appointments SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP) "
+        "WHERE updated_at IS NULL"
+    )
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES:
+            op.create_index(name, 'appointments', columns, unique=False, postgresql_concurrently=True)
+
+
+def downgrade():
+    """Downgrade schema - Remover índices de sincronização."""
+    for name, _ in reversed(INDEXES):
+        op.drop_index(name, table_name='appointments')
@@ -0,0 +1,38 @@
+"""partial index of appointments without starts_at
+
+Revision ID: add_appointment_missing_starts_index
+Revises: add_geohash_c_collation
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_appointment_missing_starts_index'
+down_revision = 'add_geohash_c_collation'
+branch_labels = None
+depends_on = None
+
+MISSING_STARTS_AT = sa.text('starts_at IS NULL')
+
+
+def upgrade():
+    """Upgrade schema - Índice parcial das consultas sem starts_at.
+    
+    backfill_appointment_starts.py roda na release e a cada rodada do
+    processo scheduler; o índice (quase sempre vazio) evita varrer
+    appointments inteira a cada execução. Criado fora da transação
+    (CONCURRENTLY no PostgreSQL).
+    """
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_appointments_missing_starts_at', 'appointments', ['id'], unique=False,
+            postgresql_where=MISSING_STARTS_AT, sqlite_where=MISSING_STARTS_AT, postgresql_concurrently=True
+        )
+
+
+def downgrade():
+    """Downgrade schema - Remover o índice."""
+    op.drop_index('ix_appointments_missing_starts_at', table_name='appointments')
@@ -0,0 +1,41 @@
+"""add settled_at to appointments
+
+Revision ID: add_appointment_settled_at
+Revises: add_appointment_changes_index
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_appointment_settled_at'
+down_revision = 'add_appointment_changes_index'
+branch_labels = None
+depends_on = None
+
+UNSETTLED = sa.text("status = 'completed' AND settled_at IS NULL")
+
+
+def upgrade():
+    """Upgrade schema - Coluna settled_at e índice das consultas a liquidar.
+    
+    Consultas realizadas existentes ficam com settled_at nulo e são
+    liquidadas pelo settle_appointments.py na primeira execução (só os
+    pagamentos ainda 'pending' ou 'paid' mudam). O índice é criado fora
+    da transação (CONCURRENTLY no PostgreSQL).
+    """
+    op.add_column('appointments', sa.Column('settled_at', sa.DateTime(), nullable=True))
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_appointments_unsettled_completed_at', 'appointments', ['completed_at'], unique=False,
+            postgresql_where=UNSETTLED, sqlite_where=UNSETTLED, postgresql_concurrently=True
+        )
+
+
+def downgrade():
+    """Downgrade schema - Remover settled_at e o índice."""
+    op.drop_index('ix_appointments_unsettled_completed_at', table_name='appointments')
+    with op.batch_alter_table('appointments') as batch_op:
+        batch_op.drop_column('settled_at')
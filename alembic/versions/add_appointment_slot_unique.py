@@ -0,0 +1,49 @@
+"""add unique index for active appointment slots
+
+Revision ID: add_appointment_slot_unique
+Revises: add_slot_holds
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_appointment_slot_unique'
+down_revision = 'add_slot_holds'
+branch_labels = None
+depends_on = None
+
+ACTIVE_CONDITION = sa.text("status IN ('pending', 'confirmed', 'completed')")
+
+
+def upgrade():
+    """Upgrade schema - Uma consulta ativa por horário do profissional.
+    
+    Falha com a lista de horários duplicados se já houver agendamentos
+    em dobro: eles envolvem pagamentos e precisam ser resolvidos à mão
+    (cancelar/estornar um deles) antes de aplicar a migração.
+    """
+    duplicates = op.get_bind().execute(sa.text(
+        "SELECT professional_id, date, time, COUNT(*) FROM appointments "
+        "WHERE status IN ('pending', 'confirmed', 'completed') "
+        "GROUP BY professional_id, date, time HAVING COUNT(*) > 1"
+    )).fetchall()
+    if duplicates:
+        listed = ', '.join(f'profissional {p} em {d} {t} ({n}x)' for p, d, t, n in duplicates)
+        raise RuntimeError(f'Agendamentos ativos duplicados: {listed}')
+    
+    op.create_index(
+        'uq_appointments_active_slot',
+        'appointments',
+        ['professional_id', 'date', 'time'],
+        unique=True,
+        postgresql_where=ACTIVE_CONDITION,
+        sqlite_where=ACTIVE_CONDITION
+    )
+
+
+def downgrade():
+    """Downgrade schema - Remover índice único de horários."""
+    op.drop_index('uq_appointments_active_slot', table_name='appointments')
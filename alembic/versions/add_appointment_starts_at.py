@@ -0,0 +1,103 @@
+"""add typed start and duration to appointments
+
+Revision ID: add_appointment_starts_at
+Revises: add_appointment_slot_unique
+Create Date: 2026-10-18
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_appointment_starts_at'
+down_revision = 'add_appointment_slot_unique'
+branch_labels = None
+depends_on = None
+
+ACTIVE_CONDITION = sa.text("status IN ('pending', 'confirmed', 'completed')")
+DISPUTED_CONDITION = sa.text("status = 'disputed'")
+
+# Cópia congelada de appointment_times.backfill_starts_at nesta revisão
+# (migrações não importam código de server/)
+BACKFILL_BATCH_SIZE = 1000
+DEFAULT_SLOT_DURATION = 30
+appointments_table = sa.table(
+    'appointments',
+    sa.column('id'), sa.column('professional_id'), sa.column('date'), sa.column('time'),
+    sa.column('starts_at'), sa.column('duration_minutes')
+)
+users_table = sa.table('users', sa.column('id'), sa.column('slot_duration'))
+
+
+def backfill_starts_at(connection, batch_size=BACKFILL_BATCH_SIZE):
+    """Preencher starts_at/duration_minutes em lotes por id (commit por lote
+    no autocommit_block); date/time inválidos ficam nulos"""
+    appointments, users = appointments_table, users_table
+    update = appointments.update().where(appointments.c.id == sa.bindparam('row_id')).values(
+        starts_at=sa.bindparam('starts_at'), duration_minutes=sa.bindparam('duration')
+    )
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(appointments.c.id, appointments.c.date, appointments.c.time, users.c.slot_duration)
+            .select_from(appointments.outerjoin(users, users.c.id == appointments.c.professional_id))
+            .where(appointments.c.starts_at.is_(None), appointments.c.id > last_id)
+            .order_by(appointments.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        values = []
+        for row_id, date_value, time_value, duration in rows:
+            try:
+                starts_at = datetime.strptime(f'{date_value} {time_value}', '%Y-%m-%d %H:%M')
+            except (ValueError, TypeError):
+                continue
+            values.append({
+                'row_id': row_id, 'starts_at': starts_at,
+                'duration': duration or DEFAULT_SLOT_DURATION
+            })
+        if values:
+            connection.execute(update, values)
+        last_id = rows[-1][0]
+
+INDEXES = [
+    ('ix_appointments_professional_starts_at', ['professional_id', 'starts_at'], None),
+    ('ix_appointments_patient_starts_at', ['patient_id', 'starts_at'], None),
+    ('ix_appointments_active_professional_starts_at', ['professional_id', 'starts_at'], ACTIVE_CONDITION),
+    ('ix_appointments_disputed_starts_at', ['starts_at'], DISPUTED_CONDITION),
+]
+
+
+def upgrade():
+    """Upgrade schema - starts_at/duration_minutes e índices por período.
+    
+    O backfill e a criação dos índices rodam fora da transação da
+    migração: um commit por lote de consultas e, no PostgreSQL,
+    CREATE INDEX CONCURRENTLY, sem bloquear os agendamentos durante o
+    deploy. Consultas gravadas por workers antigos depois do backfill
+    são preenchidas por backfill_appointment_starts.py.
+    """
+    with op.batch_alter_table('appointments') as batch_op:
+        batch_op.add_column(sa.Column('starts_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('duration_minutes', sa.Integer(), nullable=True))
+    
+    with op.get_context().autocommit_block():
+        backfill_starts_at(op.get_bind())
+        for name, columns, condition in INDEXES:
+            op.create_index(
+                name, 'appointments', columns, unique=False,
+                postgresql_where=condition, sqlite_where=condition,
+                postgresql_concurrently=True
+            )
+
+
+def downgrade():
+    """Downgrade schema - Remover starts_at/duration_minutes."""
+    for name, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name='appointments')
+    with op.batch_alter_table('appointments') as batch_op:
+        batch_op.drop_column('duration_minutes')
+        batch_op.drop_column('starts_at')
@@ -0,0 +1,45 @@
+"""server default for appointments.updated_at
+
+Revision ID: add_appointment_updated_at_default
+Revises: add_appointment_missing_starts_index
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_appointment_updated_at_default'
+down_revision = 'add_appointment_missing_starts_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Upgrade schema - updated_at sempre preenchido.
+    
+    /api/appointments/changes ordena e pagina por updated_at, e consultas
+    com updated_at nulo nunca seriam entregues. Repete o preenchimento de
+    add_appointment_changes_index para linhas gravadas depois dela fora do
+    ORM (scripts e SQL manual) e acrescenta o default no banco, que no
+    PostgreSQL só altera o catálogo.
+    """
+    op.execute(
+        "UPDATE appointments SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP) "
+        "WHERE updated_at IS NULL"
+    )
+    with op.batch_alter_table('appointments') as batch_op:
+        batch_op.alter_column(
+            'updated_at', existing_type=sa.DateTime(), existing_nullable=True,
+            server_default=sa.text('CURRENT_TIMESTAMP')
+        )
+
+
+def downgrade():
+    """Downgrade schema - Remover o default de updated_at."""
+    with op.batch_alter_table('appointments') as batch_op:
+        batch_op.alter_column(
+            'updated_at', existing_type=sa.DateTime(), existing_nullable=True,
+            server_default=None
+        )
@@ -0,0 +1,83 @@
+"""add weekly availability bitmap to users
+
+Revision ID: add_availability_bitmap
+Revises: add_slot_calendar
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_availability_bitmap'
+down_revision = 'add_slot_calendar'
+branch_labels = None
+depends_on = None
+
+# Cópias congeladas de slot_engine.to_minutes e bitmaps.encode_week nesta
+# revisão (migrações não importam código de server/)
+QUARTER_MINUTES = 15
+QUARTERS_PER_DAY = 24 * 60 // QUARTER_MINUTES
+WEEK_BYTES = 7 * QUARTERS_PER_DAY // 8
+
+
+def to_minutes(value):
+    hours, minutes = value.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def window_bits(start, end):
+    first = -(-max(start, 0) // QUARTER_MINUTES)
+    last = min(end // QUARTER_MINUTES, QUARTERS_PER_DAY)
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+def encode_week(windows_by_weekday):
+    week = 0
+    for day_of_week, windows in windows_by_weekday.items():
+        day = 0
+        for start, end in windows:
+            day |= window_bits(start, end)
+        week |= day << (day_of_week * QUARTERS_PER_DAY)
+    return week.to_bytes(WEEK_BYTES, 'big')
+
+
+def upgrade():
+    """Upgrade schema - Agenda semanal em bitmap (7 x 96 quartos de hora)."""
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('availability_bitmap', sa.LargeBinary(length=84), nullable=True))
+    
+    # Backfill a partir das linhas ativas de availability
+    bind = op.get_bind()
+    availability = sa.table(
+        'availability',
+        sa.column('professional_id'), sa.column('day_of_week'),
+        sa.column('start_time'), sa.column('end_time'), sa.column('is_active')
+    )
+    users = sa.table('users', sa.column('id'), sa.column('availability_bitmap'))
+    windows = {}
+    rows = bind.execute(
+        sa.select(
+            availability.c.professional_id, availability.c.day_of_week,
+            availability.c.start_time, availability.c.end_time
+        ).where(availability.c.is_active == sa.true())
+    ).all()
+    for professional_id, day_of_week, start, end in rows:
+        windows.setdefault(professional_id, {}).setdefault(day_of_week, []).append(
+            (to_minutes(start), to_minutes(end))
+        )
+    for professional_id, by_weekday in windows.items():
+        bind.execute(
+            users.update()
+            .where(users.c.id == professional_id)
+            .values(availability_bitmap=encode_week(by_weekday))
+        )
+
+
+def downgrade():
+    """Downgrade schema - Remover agenda em bitmap."""
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('availability_bitmap')
@@ -0,0 +1,53 @@
+"""add availability exceptions and holiday opt-in
+
+Revision ID: add_availability_exceptions
+Revises: add_availability_bitmap
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_availability_exceptions'
+down_revision = 'add_availability_bitmap'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Upgrade schema - Bloqueios de datas e atendimento em feriados."""
+    op.create_table(
+        'availability_exceptions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('professional_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.String(length=10), nullable=False),
+        sa.Column('start_time', sa.String(length=5), nullable=True),
+        sa.Column('end_time', sa.String(length=5), nullable=True),
+        sa.Column('reason', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['professional_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_availability_exceptions_id'), 'availability_exceptions', ['id'], unique=False)
+    op.create_index(
+        'ix_availability_exceptions_professional_date',
+        'availability_exceptions', ['professional_id', 'date'], unique=False
+    )
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('works_on_holidays', sa.Boolean(), nullable=True))
+    
+    # Feriados passam a bloquear a agenda: rematerializar os calendários
+    # (as leituras usam o slot_engine até o próximo roll_slot_calendar.py)
+    op.execute('DELETE FROM slot_calendar')
+    op.execute('UPDATE users SET slot_calendar_until = NULL')
+
+
+def downgrade():
+    """Downgrade schema - Remover bloqueios de datas."""
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('works_on_holidays')
+    op.drop_index('ix_availability_exceptions_professional_date', table_name='availability_exceptions')
+    op.drop_index(op.f('ix_availability_exceptions_id'), table_name='availability_exceptions')
+    op.drop_table('availability_exceptions')
@@ -0,0 +1,28 @@
+"""add availability version to users
+
+Revision ID: add_availability_version
+Revises: add_availability_exceptions
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_availability_version'
+down_revision = 'add_availability_exceptions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Upgrade schema - Versão da agenda semanal (controle de concorrência)."""
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('availability_version', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    """Downgrade schema - Remover versão da agenda semanal."""
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('availability_version')
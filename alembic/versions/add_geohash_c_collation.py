@@ -0,0 +1,43 @@
+"""geohash of search documents with "C" collation
+
+Revision ID: add_geohash_c_collation
+Revises: add_appointment_settled_at
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_geohash_c_collation'
+down_revision = 'add_appointment_settled_at'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Upgrade schema - geohash com collation "C" no PostgreSQL.
+    
+    A busca por proximidade filtra faixas prefixo <= geohash < prefixo
+    seguinte, que só valem na ordem por bytes; com a collation do banco
+    (ex.: pt_BR.UTF-8) dígitos e letras podem se intercalar. Alterar o
+    tipo reconstrói ix_professional_search_documents_geohash na nova
+    collation. O SQLite já compara por bytes.
+    """
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.alter_column(
+        'professional_search_documents', 'geohash',
+        type_=sa.String(length=12, collation='C'), existing_type=sa.String(length=12), existing_nullable=True
+    )
+
+
+def downgrade():
+    """Downgrade schema - Voltar geohash à collation padrão do banco."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.alter_column(
+        'professional_search_documents', 'geohash',
+        type_=sa.String(length=12), existing_type=sa.String(length=12, collation='C'), existing_nullable=True
+    )
@@ -0,0 +1,140 @@
+"""add cep centroids and professional geolocation
+
+Revision ID: add_professional_geo
+Revises: add_search_document_prices
+Create Date: 2026-10-18
+
+"""
+import csv
+import os
+import re
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_professional_geo'
+down_revision = 'add_search_document_prices'
+branch_labels = None
+depends_on = None
+
+# Cópias congeladas dos helpers de geo.py nesta revisão (migrações não
+# importam código de server/); os centróides vêm do arquivo de dados
+CEP_CENTROIDS_FILE = os.path.join(os.path.dirname(__file__), '..', '..', 'server', 'data', 'cep_centroids.csv')
+GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 7
+
+
+def read_cep_centroids(path=CEP_CENTROIDS_FILE):
+    with open(path, newline='', encoding='utf-8') as f:
+        return [{
+            'prefix': row['prefix'],
+            'latitude': float(row['latitude']),
+            'longitude': float(row['longitude']),
+            'label': row['label']
+        } for row in csv.DictReader(f)]
+
+
+def normalize_cep(cep):
+    return re.sub(r'\D', '', cep or '')
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    result = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(result) < precision:
+        if even:
+            mid = (lng_range[0] + lng_range[1]) / 2
+            if longitude >= mid:
+                bits = (bits << 1) | 1
+                lng_range[0] = mid
+            else:
+                bits <<= 1
+                lng_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits <<= 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            result.append(GEOHASH_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(result)
+
+
+def upgrade():
+    """Upgrade schema - Centróides de CEP e localização dos profissionais."""
+    centroids = op.create_table(
+        'cep_centroids',
+        sa.Column('prefix', sa.String(length=5), nullable=False),
+        sa.Column('latitude', sa.Float(), nullable=False),
+        sa.Column('longitude', sa.Float(), nullable=False),
+        sa.Column('label', sa.String(length=100), nullable=True),
+        sa.PrimaryKeyConstraint('prefix')
+    )
+    rows = read_cep_centroids()
+    op.bulk_insert(centroids, rows)
+    
+    for table in ('users', 'professional_search_documents'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('latitude', sa.Float(), nullable=True))
+            batch_op.add_column(sa.Column('longitude', sa.Float(), nullable=True))
+            batch_op.add_column(sa.Column('geohash', sa.String(length=12), nullable=True))
+    
+    # Backfill: prefixo de CEP mais longo cadastrado
+    by_prefix = {row['prefix']: (row['latitude'], row['longitude']) for row in rows}
+    bind = op.get_bind()
+    users = sa.table(
+        'users',
+        sa.column('id'), sa.column('cep'), sa.column('user_type'),
+        sa.column('latitude'), sa.column('longitude'), sa.column('geohash')
+    )
+    documents = sa.table(
+        'professional_search_documents',
+        sa.column('professional_id'),
+        sa.column('latitude'), sa.column('longitude'), sa.column('geohash')
+    )
+    professionals = bind.execute(
+        sa.select(users.c.id, users.c.cep).where(users.c.user_type == 'professional')
+    ).all()
+    for user_id, cep in professionals:
+        digits = normalize_cep(cep)
+        location = next(
+            (by_prefix[digits[:size]] for size in range(min(len(digits), 5), 1, -1) if digits[:size] in by_prefix),
+            None
+        )
+        if not location:
+            continue
+        values = {
+            'latitude': location[0],
+            'longitude': location[1],
+            'geohash': encode_geohash(*location)
+        }
+        bind.execute(users.update().where(users.c.id == user_id).values(**values))
+        bind.execute(documents.update().where(documents.c.professional_id == user_id).values(**values))
+    
+    op.create_index(
+        'ix_professional_search_documents_geohash',
+        'professional_search_documents', ['geohash'], unique=False
+    )
+
+
+def downgrade():
+    """Downgrade schema - Remover localização e centróides de CEP."""
+    op.drop_index('ix_professional_search_documents_geohash', table_name='professional_search_documents')
+    for table in ('professional_search_documents', 'users'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('geohash')
+            batch_op.drop_column('longitude')
+            batch_op.drop_column('latitude')
+    op.drop_table('cep_centroids')
@@ -0,0 +1,93 @@
+"""add professional search documents with full-text indexes
+
+Revision ID: add_search_documents
+Revises: add_search_rating_index
+Create Date: 2026-10-18
+
+"""
+import re
+import unicodedata
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_search_documents'
+down_revision = 'add_search_rating_index'
+branch_labels = None
+depends_on = None
+
+# Cópia congelada de search.normalize_text nesta revisão (migrações não
+# importam código de server/)
+SEARCH_FIELDS = ('city', 'profession', 'specialties')
+
+
+def normalize_text(value):
+    if not value:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', value)
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(re.findall(r'[a-z0-9]+', stripped.lower()))
+
+
+def upgrade():
+    """Upgrade schema - Criar documentos de busca e índices invertidos."""
+    documents = op.create_table(
+        'professional_search_documents',
+        sa.Column('professional_id', sa.Integer(), nullable=False),
+        sa.Column('city', sa.Text(), nullable=True),
+        sa.Column('profession', sa.Text(), nullable=True),
+        sa.Column('specialties', sa.Text(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['professional_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('professional_id')
+    )
+    
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        for field in SEARCH_FIELDS:
+            op.execute(
+                f"CREATE INDEX ix_professional_search_documents_{field}_fts "
+                f"ON professional_search_documents USING gin (to_tsvector('simple', {field}))"
+            )
+    elif bind.dialect.name == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS professional_search_fts "
+            "USING fts5(city, profession, specialties, tokenize='unicode61 remove_diacritics 2')"
+        )
+    
+    # Backfill: normalizar campos de todos os profissionais
+    professionals = bind.execute(sa.text(
+        "SELECT id, city, profession FROM users WHERE user_type = 'professional'"
+    )).fetchall()
+    specialties = {}
+    for user_id, name in bind.execute(sa.text(
+        "SELECT us.user_id, s.name FROM user_specialties us JOIN specialties s ON s.id = us.specialty_id"
+    )):
+        specialties.setdefault(user_id, []).append(name)
+    
+    rows = [{
+        'professional_id': user_id,
+        'city': normalize_text(city),
+        'profession': normalize_text(profession),
+        'specialties': normalize_text(' '.join(specialties.get(user_id, [])))
+    } for user_id, city, profession in professionals]
+    
+    if rows:
+        op.bulk_insert(documents, rows)
+        if bind.dialect.name == 'sqlite':
+            bind.execute(sa.text(
+                "INSERT INTO professional_search_fts (rowid, city, profession, specialties) "
+                "VALUES (:professional_id, :city, :profession, :specialties)"
+            ), rows)
+
+
+def downgrade():
+    """Downgrade schema - Remover documentos de busca."""
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS professional_search_fts")
+    elif bind.dialect.name == 'postgresql':
+        for field in SEARCH_FIELDS:
+            op.execute(f"DROP INDEX IF EXISTS ix_professional_search_documents_{field}_fts")
+    op.drop_table('professional_search_documents')
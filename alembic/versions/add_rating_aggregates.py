@@ -0,0 +1,49 @@
+"""add rating aggregates to users
+
+Revision ID: add_rating_aggregates
+Revises: add_favorites_001, add_slot_duration
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_rating_aggregates'
+down_revision = ('add_favorites_001', 'add_slot_duration')
+branch_labels = None
+depends_on = None
+
+RATING_COLUMNS = ['rating_count', 'rating_sum', 'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5']
+
+
+def upgrade():
+    """Upgrade schema - Adicionar agregados de avaliações em users e preencher."""
+    for column in RATING_COLUMNS:
+        op.add_column('users', sa.Column(column, sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('users', sa.Column('rating_average', sa.Float(), nullable=False, server_default='0'))
+    
+    # Backfill a partir da tabela reviews
+    op.execute("""
+        UPDATE users SET
+            rating_count = (SELECT COUNT(*) FROM reviews r WHERE r.professional_id = users.id),
+            rating_sum = (SELECT COALESCE(SUM(r.rating), 0) FROM reviews r WHERE r.professional_id = users.id),
+            rating_1 = (SELECT COUNT(*) FROM reviews r WHERE r.professional_id = users.id AND r.rating = 1),
+            rating_2 = (SELECT COUNT(*) FROM reviews r WHERE r.professional_id = users.id AND r.rating = 2),
+            rating_3 = (SELECT COUNT(*) FROM reviews r WHERE r.professional_id = users.id AND r.rating = 3),
+            rating_4 = (SELECT COUNT(*) FROM reviews r WHERE r.professional_id = users.id AND r.rating = 4),
+            rating_5 = (SELECT COUNT(*) FROM reviews r WHERE r.professional_id = users.id AND r.rating = 5)
+        WHERE EXISTS (SELECT 1 FROM reviews r WHERE r.professional_id = users.id)
+    """)
+    op.execute("""
+        UPDATE users SET rating_average = rating_sum * 1.0 / rating_count
+        WHERE rating_count > 0
+    """)
+
+
+def downgrade():
+    """Downgrade schema - Remover agregados de avaliações."""
+    op.drop_column('users', 'rating_average')
+    for column in reversed(RATING_COLUMNS):
+        op.drop_column('users', column)
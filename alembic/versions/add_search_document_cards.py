@@ -0,0 +1,186 @@
+"""add public fields and JSON card to professional search documents
+
+Revision ID: add_search_document_cards
+Revises: add_search_documents
+Create Date: 2026-10-18
+
+"""
+import json
+import re
+import unicodedata
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_search_document_cards'
+down_revision = 'add_search_documents'
+branch_labels = None
+depends_on = None
+
+USER_COLUMNS = [
+    'id', 'email', 'user_type', 'name', 'preferred_name', 'social_name',
+    'profession', 'regulatory_body', 'registration_number', 'description',
+    'photo_url', 'slot_duration', 'neighborhood', 'city', 'state',
+    'online_price', 'in_person_price', 'home_price',
+    'online_enabled', 'in_person_enabled', 'home_enabled',
+    'rating_count', 'rating_average',
+    'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5'
+]
+
+
+# Cópias congeladas de search.py nesta revisão (migrações não importam
+# código de server/)
+def normalize_text(value):
+    if not value:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', value)
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(re.findall(r'[a-z0-9]+', stripped.lower()))
+
+
+def is_searchable(user):
+    return user.user_type == 'professional' and user.email != 'admin@consultavoce.com.br'
+
+
+def public_card(user, specialty_names):
+    card = {
+        'id': user.id,
+        'name': user.name,
+        'preferred_name': user.preferred_name,
+        'social_name': user.social_name,
+        'userType': 'professional',
+        'profession': user.profession,
+        'regulatoryBody': user.regulatory_body,
+        'registrationNumber': user.registration_number,
+        'description': user.description,
+        'photo_url': user.photo_url,
+        'slot_duration': user.slot_duration or 30,
+        'specialties': specialty_names,
+        'pricing': {
+            'online': user.online_price,
+            'in_person': user.in_person_price,
+            'home': user.home_price,
+            'online_enabled': user.online_enabled if user.online_enabled is not None else True,
+            'in_person_enabled': user.in_person_enabled if user.in_person_enabled is not None else True,
+            'home_enabled': user.home_enabled if user.home_enabled is not None else False
+        }
+    }
+    if user.city or user.state:
+        card['address'] = {
+            'neighborhood': user.neighborhood,
+            'city': user.city,
+            'state': user.state
+        }
+    card['average_rating'] = user.rating_average if user.rating_count else None
+    card['total_reviews'] = user.rating_count or 0
+    return card
+
+
+def search_document_values(user, specialty_names):
+    card = public_card(user, specialty_names)
+    pricing = card['pricing']
+    return {
+        'professional_id': user.id,
+        'city': normalize_text(user.city),
+        'profession': normalize_text(user.profession),
+        'specialties': normalize_text(' '.join(specialty_names)),
+        'name': user.name,
+        'state': (user.state or '').upper() or None,
+        'specialty_names': json.dumps(specialty_names, ensure_ascii=False),
+        'online_price': user.online_price,
+        'in_person_price': user.in_person_price,
+        'home_price': user.home_price,
+        'online_enabled': pricing['online_enabled'],
+        'in_person_enabled': pricing['in_person_enabled'],
+        'home_enabled': pricing['home_enabled'],
+        'rating_count': user.rating_count or 0,
+        'rating_average': user.rating_average or 0,
+        'card': json.dumps(card, ensure_ascii=False, separators=(',', ':'))
+    }
+
+
+def upgrade():
+    """Upgrade schema - Campos públicos e cartão JSON nos documentos de busca."""
+    with op.batch_alter_table('professional_search_documents') as batch_op:
+        batch_op.add_column(sa.Column('name', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('state', sa.String(length=2), nullable=True))
+        batch_op.add_column(sa.Column('specialty_names', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('online_price', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('in_person_price', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('home_price', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('online_enabled', sa.Boolean(), nullable=True))
+        batch_op.add_column(sa.Column('in_person_enabled', sa.Boolean(), nullable=True))
+        batch_op.add_column(sa.Column('home_enabled', sa.Boolean(), nullable=True))
+        batch_op.add_column(sa.Column('rating_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('rating_average', sa.Float(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('card', sa.Text(), nullable=False, server_default='{}'))
+    
+    op.create_index('ix_professional_search_documents_state', 'professional_search_documents', ['state'], unique=False)
+    op.create_index(
+        'ix_professional_search_documents_rating',
+        'professional_search_documents',
+        [sa.text('rating_average DESC'), 'professional_id'],
+        unique=False
+    )
+    # A busca não lê mais users para ordenar por nota
+    op.drop_index('ix_users_rating_average_id', table_name='users')
+    
+    # Backfill: recalcular documento de todos os profissionais
+    bind = op.get_bind()
+    users = bind.execute(sa.text(
+        f"SELECT {', '.join(USER_COLUMNS)} FROM users WHERE user_type = 'professional'"
+    )).fetchall()
+    # Nomes ordenados em Python, como em refresh_search_document (ORDER BY
+    # usaria a collation do banco e os cartões não seriam idênticos)
+    specialties = {}
+    for user_id, name in bind.execute(sa.text(
+        "SELECT us.user_id, s.name FROM user_specialties us "
+        "JOIN specialties s ON s.id = us.specialty_id"
+    )):
+        specialties.setdefault(user_id, []).append(name)
+    for names in specialties.values():
+        names.sort()
+    
+    documents = sa.table(
+        'professional_search_documents',
+        *[sa.column(name) for name in (
+            'professional_id', 'city', 'profession', 'specialties', 'name', 'state',
+            'specialty_names', 'online_price', 'in_person_price', 'home_price',
+            'online_enabled', 'in_person_enabled', 'home_enabled',
+            'rating_count', 'rating_average', 'card'
+        )]
+    )
+    for user in users:
+        if not is_searchable(user):
+            continue
+        values = search_document_values(user, specialties.get(user.id, []))
+        professional_id = values.pop('professional_id')
+        result = bind.execute(
+            documents.update().where(documents.c.professional_id == professional_id).values(**values)
+        )
+        if result.rowcount == 0:
+            bind.execute(documents.insert().values(professional_id=professional_id, **values))
+    
+    # Conta de administração não aparece na busca
+    bind.execute(sa.text(
+        "DELETE FROM professional_search_documents WHERE professional_id IN "
+        "(SELECT id FROM users WHERE email = 'admin@consultavoce.com.br')"
+    ))
+    if bind.dialect.name == 'sqlite':
+        bind.execute(sa.text(
+            "DELETE FROM professional_search_fts WHERE rowid NOT IN "
+            "(SELECT professional_id FROM professional_search_documents)"
+        ))
+
+
+def downgrade():
+    """Downgrade schema - Remover campos públicos e cartão JSON."""
+    op.create_index('ix_users_rating_average_id', 'users', [sa.text('rating_average DESC'), 'id'], unique=False)
+    op.drop_index('ix_professional_search_documents_rating', table_name='professional_search_documents')
+    op.drop_index('ix_professional_search_documents_state', table_name='professional_search_documents')
+    with op.batch_alter_table('professional_search_documents') as batch_op:
+        for column in ('card', 'rating_average', 'rating_count', 'home_enabled', 'in_person_enabled',
+                       'online_enabled', 'home_price', 'in_person_price', 'online_price',
+                       'specialty_names', 'state', 'name'):
+            batch_op.drop_column(column)
@@ -0,0 +1,35 @@
+"""add display profession and city to professional search documents
+
+Revision ID: add_search_document_facets
+Revises: add_search_document_cards
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_search_document_facets'
+down_revision = 'add_search_document_cards'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Upgrade schema - Profissão e cidade originais para rótulos de facetas."""
+    op.add_column('professional_search_documents', sa.Column('profession_name', sa.String(length=100), nullable=True))
+    op.add_column('professional_search_documents', sa.Column('city_name', sa.String(length=100), nullable=True))
+    
+    op.execute("""
+        UPDATE professional_search_documents SET
+            profession_name = (SELECT u.profession FROM users u WHERE u.id = professional_search_documents.professional_id),
+            city_name = (SELECT u.city FROM users u WHERE u.id = professional_search_documents.professional_id)
+    """)
+
+
+def downgrade():
+    """Downgrade schema - Remover colunas de rótulos de facetas."""
+    with op.batch_alter_table('professional_search_documents') as batch_op:
+        batch_op.drop_column('city_name')
+        batch_op.drop_column('profession_name')
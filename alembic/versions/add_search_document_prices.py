@@ -0,0 +1,71 @@
+"""add price indexes to professional search documents
+
+Revision ID: add_search_document_prices
+Revises: add_search_document_facets
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_search_document_prices'
+down_revision = 'add_search_document_facets'
+branch_labels = None
+depends_on = None
+
+MODALITIES = ('online', 'in_person', 'home')
+
+
+def upgrade():
+    """Upgrade schema - Menor preço e índices de preço por modalidade."""
+    op.add_column('professional_search_documents', sa.Column('min_price', sa.Float(), nullable=True))
+    
+    # Backfill do menor preço entre as modalidades habilitadas
+    bind = op.get_bind()
+    documents = sa.table(
+        'professional_search_documents',
+        sa.column('professional_id'), sa.column('min_price'),
+        *[sa.column(f'{m}_price') for m in MODALITIES],
+        *[sa.column(f'{m}_enabled') for m in MODALITIES]
+    )
+    for row in bind.execute(sa.select(documents)).mappings().all():
+        prices = [
+            row[f'{m}_price'] for m in MODALITIES
+            if row[f'{m}_enabled'] and row[f'{m}_price'] is not None
+        ]
+        if prices:
+            bind.execute(
+                documents.update()
+                .where(documents.c.professional_id == row['professional_id'])
+                .values(min_price=min(prices))
+            )
+    
+    op.create_index(
+        'ix_professional_search_documents_state_min_price',
+        'professional_search_documents', ['state', 'min_price', 'professional_id'], unique=False
+    )
+    op.create_index(
+        'ix_professional_search_documents_min_price',
+        'professional_search_documents', ['min_price', 'professional_id'], unique=False
+    )
+    for modality in MODALITIES:
+        op.create_index(
+            f'ix_professional_search_documents_state_{modality}_price',
+            'professional_search_documents',
+            ['state', f'{modality}_price', 'professional_id'],
+            unique=False,
+            postgresql_where=sa.text(f'{modality}_enabled = true'),
+            sqlite_where=sa.text(f'{modality}_enabled = 1')
+        )
+
+
+def downgrade():
+    """Downgrade schema - Remover menor preço e índices de preço."""
+    for modality in MODALITIES:
+        op.drop_index(f'ix_professional_search_documents_state_{modality}_price', table_name='professional_search_documents')
+    op.drop_index('ix_professional_search_documents_min_price', table_name='professional_search_documents')
+    op.drop_index('ix_professional_search_documents_state_min_price', table_name='professional_search_documents')
+    with op.batch_alter_table('professional_search_documents') as batch_op:
+        batch_op.drop_column('min_price')
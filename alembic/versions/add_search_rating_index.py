@@ -0,0 +1,31 @@
+"""add rating sort index for professional search
+
+Revision ID: add_search_rating_index
+Revises: add_rating_aggregates
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_search_rating_index'
+down_revision = 'add_rating_aggregates'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Upgrade schema - Índice para paginação por cursor (nota desc, id)."""
+    op.create_index(
+        'ix_users_rating_average_id',
+        'users',
+        [sa.text('rating_average DESC'), 'id'],
+        unique=False
+    )
+
+
+def downgrade():
+    """Downgrade schema - Remover índice de paginação."""
+    op.drop_index('ix_users_rating_average_id', table_name='users')
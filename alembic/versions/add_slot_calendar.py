@@ -0,0 +1,42 @@
+"""add materialized slot calendar
+
+Revision ID: add_slot_calendar
+Revises: add_professional_geo
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_slot_calendar'
+down_revision = 'add_professional_geo'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Upgrade schema - Calendário materializado de horários livres.
+    
+    A tabela começa vazia: até a primeira execução de roll_slot_calendar.py
+    (ou uma alteração de agenda do profissional) as leituras usam o
+    slot_engine.
+    """
+    op.create_table(
+        'slot_calendar',
+        sa.Column('professional_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.String(length=10), nullable=False),
+        sa.Column('time', sa.String(length=5), nullable=False),
+        sa.ForeignKeyConstraint(['professional_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('professional_id', 'date', 'time')
+    )
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('slot_calendar_until', sa.String(length=10), nullable=True))
+
+
+def downgrade():
+    """Downgrade schema - Remover calendário materializado."""
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('slot_calendar_until')
+    op.drop_table('slot_calendar')
@@ -0,0 +1,50 @@
+"""add temporary slot holds
+
+Revision ID: add_slot_holds
+Revises: add_availability_version
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_slot_holds'
+down_revision = 'add_availability_version'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Upgrade schema - Reservas temporárias de horário.
+    
+    A chave única (professional_id, date, time) decide corridas entre
+    reservas do mesmo horário e serve a leitura por período; o índice de
+    expires_at serve o sweep_slot_holds.py.
+    """
+    op.create_table(
+        'slot_holds',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('professional_id', sa.Integer(), nullable=False),
+        sa.Column('patient_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.String(length=10), nullable=False),
+        sa.Column('time', sa.String(length=5), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['professional_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['patient_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('professional_id', 'date', 'time', name='uq_slot_holds_slot')
+    )
+    op.create_index(op.f('ix_slot_holds_id'), 'slot_holds', ['id'], unique=False)
+    op.create_index(op.f('ix_slot_holds_patient_id'), 'slot_holds', ['patient_id'], unique=False)
+    op.create_index('ix_slot_holds_expires_at', 'slot_holds', ['expires_at'], unique=False)
+
+
+def downgrade():
+    """Downgrade schema - Remover reservas temporárias."""
+    op.drop_index('ix_slot_holds_expires_at', table_name='slot_holds')
+    op.drop_index(op.f('ix_slot_holds_patient_id'), table_name='slot_holds')
+    op.drop_index(op.f('ix_slot_holds_id'), table_name='slot_holds')
+    op.drop_table('slot_holds')
@@ -28,6 +28,28 @@ try:
 except Exception as e:
     print(f"Warning: Could not initialize database: {e}")
 
+# Construir índice de autocomplete (reconstruído na primeira busca se falhar)
+try:
+    from database import SessionLocal
+    from suggest import get_suggest_index
+    db = SessionLocal()
+    try:
+        get_suggest_index().build(db)
+    finally:
+        db.close()
+except Exception as e:
+    print(f"Warning: Could not build suggest index: {e}")
+
+# Eventos em tempo real e invalidações de cache entre workers
+# (LISTEN/NOTIFY) quando configurado; sem isso, cada worker entrega só os
+# eventos e invalidações das próprias requisições
+if os.environ.get('EVENTS_BACKEND') == 'postgres':
+    from database import DATABASE_URL
+    from events import set_event_backend, PostgresEventBackend
+    from cache import use_shared_invalidation
+    set_event_backend(PostgresEventBackend(DATABASE_URL))
+    use_shared_invalidation()
+
 # Importar rotas da API
 from routes import auth_bp, professional_bp, appointment_bp, user_bp, availability_bp, admin_bp, review_bp, slots_bp
 
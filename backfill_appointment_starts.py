@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Script para preencher appointments.starts_at e duration_minutes das
+consultas que ainda não têm esses campos (ex.: gravadas por workers
+antigos durante o deploy da migração add_appointment_starts_at). Roda
+em lotes, com um commit por lote, pelo índice parcial
+ix_appointments_missing_starts_at; pode ser executado mais de uma vez.
+Roda na release (Procfile) e a cada rodada do processo scheduler
+(settle_appointments.py --loop).
+"""
+import os
+import sys
+
+# Adicionar diretório server ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'server'))
+
+from database import engine
+from appointment_times import backfill_starts_at
+
+def main():
+    try:
+        print("🔄 Preenchendo início tipado das consultas...")
+        with engine.connect() as connection:
+            filled, skipped = backfill_starts_at(connection, commit=connection.commit)
+        print(f"✅ {filled} consultas preenchidas")
+        if skipped:
+            print(f"⚠️  {skipped} consultas com data/horário inválidos ignoradas")
+        return True
+    except Exception as e:
+        print(f"❌ Erro ao preencher consultas: {e}")
+        return False
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark de agendamentos concorrentes: duplicidade e vazão
+
+Cria P profissionais com agenda de 08:00 às 18:00 em todos os dias e
+T pacientes; cada paciente, numa thread própria, tenta agendar todos os
+mesmos horários (P profissionais x 3 dias x 10 horários) pelo
+POST /api/appointments/. Ao final conta as consultas ativas duplicadas
+por (profissional, data, horário), as respostas por status e a vazão.
+
+Com --no-index o índice único uq_appointments_active_slot é removido
+antes da corrida, para comparar com a verificação só na aplicação.
+
+Uso:
+    python bench/concurrent_booking.py [--threads 16] [--professionals 5] [--no-index]
+
+Usa um SQLite em /tmp/bench_booking.db (recriado a cada execução); com
+DATABASE_URL apontando para um PostgreSQL vazio, roda sobre ele.
+"""
+import argparse
+import collections
+import os
+import sys
+import threading
+import time
+from datetime import date, timedelta
+
+DB_FILE = '/tmp/bench_booking.db'
+if not os.environ.get('DATABASE_URL'):
+    os.environ['DATABASE_URL'] = f'sqlite:///{DB_FILE}'
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'server'))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import text
+from database import Base, engine
+import models  # noqa: F401  (registra as tabelas no Base)
+
+DAYS = 3
+HOURS = range(8, 18)
+
+def register(client, email, **fields):
+    data = {'email': email, 'password': 'x', 'name': email, 'userType': 'professional'}
+    data.update(fields)
+    response = client.post('/api/auth/register', json=data)
+    assert response.status_code == 201, response.get_json()
+    body = response.get_json()
+    return body['user']['id'], {'Authorization': f"Bearer {body['token']}"}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--professionals', type=int, default=5)
+    parser.add_argument('--no-index', action='store_true', help='remover o índice único antes da corrida')
+    args = parser.parse_args()
+
+    if engine.dialect.name == 'sqlite' and os.path.exists(DB_FILE):
+        os.remove(DB_FILE)
+    Base.metadata.create_all(engine)
+    if args.no_index:
+        with engine.begin() as connection:
+            connection.execute(text('DROP INDEX uq_appointments_active_slot'))
+
+    from app import app
+    client = app.test_client()
+    professionals = []
+    for i in range(args.professionals):
+        professional_id, headers = register(client, f'profissional{i}@bench', city='São Paulo', state='SP',
+                                            profession='Psicólogo')
+        response = client.put('/api/availability/my', headers=headers, json={'availability': [
+            {'day_of_week': day, 'start_time': '08:00', 'end_time': '18:00'} for day in range(7)
+        ]})
+        assert response.status_code == 200, response.get_json()
+        professionals.append(professional_id)
+    patients = [register(client, f'paciente{i}@bench', userType='patient')[1] for i in range(args.threads)]
+
+    today = date.today()
+    slots = [
+        (professional_id, (today + timedelta(days=offset)).isoformat(), f'{hour:02d}:00')
+        for professional_id in professionals for offset in range(1, DAYS + 1) for hour in HOURS
+    ]
+    codes = collections.Counter()
+    lock = threading.Lock()
+
+    def worker(headers):
+        thread_client = app.test_client()
+        for professional_id, day, time_value in slots:
+            response = thread_client.post('/api/appointments/', headers=headers, json={
+                'professional_id': professional_id, 'date': day, 'time': time_value,
+                'type': 'Online', 'price': 100
+            })
+            with lock:
+                codes[response.status_code] += 1
+
+    threads = [threading.Thread(target=worker, args=(headers,)) for headers in patients]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    with engine.connect() as connection:
+        duplicated = connection.execute(text(
+            "SELECT COUNT(*) FROM (SELECT 1 FROM appointments "
+            "WHERE status IN ('pending', 'confirmed', 'completed') "
+            "GROUP BY professional_id, date, time HAVING COUNT(*) > 1) AS duplicated"
+        )).scalar()
+        booked = connection.execute(text("SELECT COUNT(*) FROM appointments")).scalar()
+
+    total = sum(codes.values())
+    print(f"{engine.dialect.name}, {'sem' if args.no_index else 'com'} índice único, {args.threads} threads")
+    print(f"respostas: {dict(sorted(codes.items()))}")
+    print(f"horários: {len(slots)}  consultas: {booked}  horários duplicados: {duplicated}")
+    print(f"{total / elapsed:.0f} requisições/s, {codes[201] / elapsed:.0f} agendamentos/s ({elapsed:.1f}s)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Benchmark da busca de profissionais: índice invertido x ILIKE
+
+Popula um banco com N profissionais (padrão 100.000) com cidades,
+profissões e especialidades aleatórias (semente fixa) e mede, para as
+mesmas consultas:
+
+- o caminho atual (GET /api/professionals/search, documentos de busca +
+  FTS5 no SQLite / GIN no PostgreSQL);
+- o caminho anterior: ILIKE '%...%' em users/specialties, com a mesma
+  ordenação (nota desc, id) e página de 20.
+
+Uso:
+    python bench/search_100k.py [--count 100000] [--repeat 20]
+
+Usa um SQLite em /tmp/bench_search.db (recriado a cada execução); com
+DATABASE_URL apontando para um PostgreSQL vazio, roda sobre ele.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+DB_FILE = '/tmp/bench_search.db'
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{DB_FILE}')
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'server'))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import insert
+from sqlalchemy.orm import selectinload
+from database import Base, engine, SessionLocal
+from models import User, Specialty, ProfessionalSearchDocument, user_specialties
+from search import search_document_values, get_search_backend
+
+CITIES = ['São Paulo', 'Rio de Janeiro', 'Belo Horizonte', 'Curitiba', 'Porto Alegre',
+          'Salvador', 'Recife', 'Fortaleza', 'Brasília', 'Goiânia'] + [f'Cidade {i}' for i in range(300)]
+PROFESSIONS = ['Médico', 'Psicólogo', 'Dentista', 'Nutricionista', 'Fisioterapeuta', 'Fonoaudiólogo']
+SPECIALTIES = [f'Especialidade {i}' for i in range(200)] + ['Cardiologia', 'Psicologia Clínica', 'Ortodontia']
+
+# (rótulo, parâmetros da busca)
+QUERIES = [
+    ('cidade', {'city': 'Curitiba'}),
+    ('cidade sem acento + profissão', {'city': 'sao paulo', 'profession': 'medico'}),
+    ('prefixo de especialidade', {'specialty': 'cardio'}),
+    ('especialidade + cidade', {'specialty': 'cardio', 'city': 'salvador'}),
+]
+PAGE_SIZE = 20
+BATCH_SIZE = 5000
+
+def seed(count):
+    """Criar o schema e inserir count profissionais com documentos de busca"""
+    if engine.dialect.name == 'sqlite' and os.path.exists(DB_FILE):
+        os.remove(DB_FILE)
+    Base.metadata.create_all(engine)
+    random.seed(1)
+    db = SessionLocal()
+    try:
+        db.execute(insert(Specialty), [{'id': i + 1, 'name': name} for i, name in enumerate(SPECIALTIES)])
+        backend = get_search_backend(db)
+        backend.prepare(db)
+        for first in range(1, count + 1, BATCH_SIZE):
+            users, links, documents = [], [], []
+            for user_id in range(first, min(first + BATCH_SIZE, count + 1)):
+                names = sorted(random.sample(SPECIALTIES, 2))
+                user = SimpleNamespace(
+                    id=user_id, email=f'profissional{user_id}@bench', password='x', name=f'Profissional {user_id}',
+                    preferred_name=None, social_name=None, user_type='professional',
+                    profession=random.choice(PROFESSIONS), regulatory_body=None, registration_number=None,
+                    description=None, photo_url=None, slot_duration=30,
+                    neighborhood=None, city=random.choice(CITIES), state='SP',
+                    online_price=100.0, in_person_price=None, home_price=None,
+                    online_enabled=True, in_person_enabled=True, home_enabled=False,
+                    latitude=None, longitude=None, geohash=None,
+                    rating_count=1, rating_sum=0, rating_average=round(random.random() * 5, 2),
+                    rating_1=0, rating_2=0, rating_3=0, rating_4=0, rating_5=0
+                )
+                users.append({
+                    'id': user.id, 'email': user.email, 'password': user.password, 'name': user.name,
+                    'user_type': user.user_type, 'profession': user.profession, 'city': user.city,
+                    'state': user.state, 'rating_count': user.rating_count, 'rating_sum': user.rating_sum,
+                    'rating_average': user.rating_average, 'rating_1': 0, 'rating_2': 0,
+                    'rating_3': 0, 'rating_4': 0, 'rating_5': 0
+                })
+                links += [{'user_id': user_id, 'specialty_id': SPECIALTIES.index(name) + 1} for name in names]
+                documents.append(search_document_values(user, names))
+            db.execute(insert(User), users)
+            db.execute(insert(user_specialties), links)
+            db.execute(insert(ProfessionalSearchDocument), documents)
+            for values in documents:
+                backend.index(db, SimpleNamespace(**values))
+            db.commit()
+    finally:
+        db.close()
+
+def legacy_search(db, params):
+    """Busca anterior: ILIKE com curinga à esquerda sobre users/specialties"""
+    query = db.query(User).options(selectinload(User.specialties)).filter(
+        User.user_type == 'professional',
+        User.email != 'admin@consultavoce.com.br'
+    )
+    if params.get('specialty'):
+        query = query.filter(User.specialties.any(Specialty.name.ilike(f"%{params['specialty']}%")))
+    if params.get('city'):
+        query = query.filter(User.city.ilike(f"%{params['city']}%"))
+    if params.get('profession'):
+        query = query.filter(User.profession.ilike(f"%{params['profession']}%"))
+    return query.order_by(User.rating_average.desc(), User.id.asc()).limit(PAGE_SIZE).all()
+
+def timed(fn, repeat):
+    """(milissegundos por chamada, último resultado)"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return 1000 * (time.perf_counter() - start) / repeat, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--count', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"Populando {args.count} profissionais ({engine.dialect.name})...")
+    start = time.perf_counter()
+    seed(args.count)
+    print(f"  {time.perf_counter() - start:.1f}s")
+
+    from app import app
+    from cache import get_cache
+    client = app.test_client()
+
+    def indexed(params):
+        get_cache().clear()
+        response = client.get('/api/professionals/search', query_string={**params, 'sort': 'rating'})
+        assert response.status_code == 200, response.get_json()
+        return response.get_json()['professionals']
+
+    print(f"{'consulta':35s} {'índice (ms)':>12s} {'ILIKE (ms)':>12s}  resultados (índice/ILIKE)")
+    db = SessionLocal()
+    try:
+        for label, params in QUERIES:
+            indexed_ms, found = timed(lambda: indexed(params), args.repeat)
+            legacy_ms, legacy_found = timed(lambda: legacy_search(db, params), args.repeat)
+            print(f"{label:35s} {indexed_ms:12.1f} {legacy_ms:12.1f}  {len(found)}/{len(legacy_found)}")
+    finally:
+        db.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark do slot_engine: horários livres de um dia e de um período
+
+Popula um profissional com agenda de 9 horas por dia (08:00-12:00 e
+13:00-18:00, slots de 15 minutos) e consultas aleatórias (semente fixa)
+e mede, em queries e tempo:
+
+- o cálculo anterior: uma query de consulta por horário candidato;
+- available_slots (um dia) e available_slots_range (30 dias) do
+  slot_engine, com queries fixas por chamada;
+- só a parte em memória (daily_free_bits sobre a agenda já carregada).
+
+Uso:
+    python bench/slot_engine.py [--repeat 200] [--bookings 20]
+
+Usa um SQLite em /tmp/bench_slots.db, recriado a cada execução.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+DB_FILE = '/tmp/bench_slots.db'
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_FILE}'
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'server'))
+
+from sqlalchemy import event
+from database import Base, engine, SessionLocal
+from models import User, Availability, Appointment
+from appointment_times import starts_at_of
+from slot_engine import (
+    available_slots, available_slots_range, load_schedules, daily_free_bits,
+    db_day_of_week, update_availability_bitmap, to_minutes, format_minutes, ACTIVE_STATUSES
+)
+
+WINDOWS = [('08:00', '12:00'), ('13:00', '18:00')]
+SLOT_DURATION = 15
+RANGE_DAYS = 30
+
+def seed(bookings):
+    """Profissional, agenda semanal e `bookings` consultas por dia do período"""
+    if os.path.exists(DB_FILE):
+        os.remove(DB_FILE)
+    Base.metadata.create_all(engine)
+    random.seed(1)
+    db = SessionLocal()
+    try:
+        patient = User(email='paciente@bench', password='x', name='Paciente', user_type='patient')
+        professional = User(email='profissional@bench', password='x', name='Profissional',
+                            user_type='professional', slot_duration=SLOT_DURATION)
+        db.add_all([patient, professional])
+        db.flush()
+        for day_of_week in range(7):
+            for start, end in WINDOWS:
+                db.add(Availability(professional_id=professional.id, day_of_week=day_of_week,
+                                    start_time=start, end_time=end, is_active=True))
+        update_availability_bitmap(db, professional)
+
+        first_day = date.today() + timedelta(days=1)
+        candidates = candidate_times()
+        for offset in range(RANGE_DAYS):
+            day = first_day + timedelta(days=offset)
+            for time_value in random.sample(candidates, bookings):
+                db.add(Appointment(
+                    patient_id=patient.id, professional_id=professional.id,
+                    date=day.isoformat(), time=time_value, type='presencial', price=100,
+                    starts_at=starts_at_of(day.isoformat(), time_value), duration_minutes=SLOT_DURATION,
+                    status='confirmed'
+                ))
+        db.commit()
+        return professional.id, first_day
+    finally:
+        db.close()
+
+def candidate_times():
+    """Inícios de slot da agenda ('HH:MM')"""
+    return [
+        format_minutes(minute)
+        for start, end in WINDOWS
+        for minute in range(to_minutes(start), to_minutes(end) - SLOT_DURATION + 1, SLOT_DURATION)
+    ]
+
+def per_slot_query_slots(db, professional, day):
+    """Cálculo anterior: disponibilidade do dia e uma query por horário candidato"""
+    windows = db.query(Availability).filter(
+        Availability.professional_id == professional.id,
+        Availability.day_of_week == db_day_of_week(day),
+        Availability.is_active == True
+    ).all()
+    free = []
+    for window in windows:
+        minute = to_minutes(window.start_time)
+        while minute + SLOT_DURATION <= to_minutes(window.end_time):
+            time_value = format_minutes(minute)
+            taken = db.query(Appointment.id).filter(
+                Appointment.professional_id == professional.id,
+                Appointment.date == day.isoformat(),
+                Appointment.time == time_value,
+                Appointment.status.in_(ACTIVE_STATUSES)
+            ).first()
+            if not taken:
+                free.append(time_value)
+            minute += SLOT_DURATION
+    return sorted(free)
+
+def measure(fn, repeat):
+    """(queries por chamada, milissegundos por chamada, último resultado)"""
+    statements = []
+    listener = lambda *args, **kwargs: statements.append(args[2])
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        result = fn()
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return len(statements), 1000 * (time.perf_counter() - start) / repeat, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--bookings', type=int, default=20, help='consultas por dia')
+    args = parser.parse_args()
+
+    professional_id, day = seed(args.bookings)
+    last_day = day + timedelta(days=RANGE_DAYS - 1)
+    db = SessionLocal()
+    try:
+        professional = db.get(User, professional_id)
+        print(f"Agenda de {len(candidate_times())} slots/dia, {args.bookings} consultas/dia")
+
+        legacy_queries, legacy_ms, legacy = measure(lambda: per_slot_query_slots(db, professional, day), args.repeat)
+        queries, engine_ms, slots = measure(lambda: available_slots(db, professional, day), args.repeat)
+        assert slots == legacy, 'slot_engine diverge do cálculo por horário'
+        range_queries, range_ms, _ = measure(
+            lambda: available_slots_range(db, professional, day, last_day), max(1, args.repeat // 10)
+        )
+
+        schedule = load_schedules(db, {professional_id: SLOT_DURATION}, day, last_day)[professional_id]
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for _ in daily_free_bits(schedule, SLOT_DURATION, day, last_day):
+                pass
+        memory_us = 1e6 * (time.perf_counter() - start) / args.repeat / RANGE_DAYS
+
+        print(f"{'query por horário (1 dia)':32s} {legacy_queries:4d} queries {legacy_ms:8.2f} ms")
+        print(f"{'available_slots (1 dia)':32s} {queries:4d} queries {engine_ms:8.2f} ms")
+        print(f"{f'available_slots_range ({RANGE_DAYS} dias)':32s} {range_queries:4d} queries {range_ms:8.2f} ms")
+        print(f"{'daily_free_bits em memória':32s} {'':12s} {memory_us:8.1f} us/dia")
+    finally:
+        db.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark do índice de autocomplete (suggest.py)
+
+Monta o índice em memória com N profissionais sintéticos (semente fixa:
+300 profissões, cidades aleatórias, 2.000 especialidades) e mede, por
+prefixo, a primeira consulta (sem memo) e a repetida (memo). Não usa
+banco: o índice é alimentado por add_professional.
+
+Uso:
+    python bench/suggest.py [--count 20000] [--repeat 1000]
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'server'))
+
+from suggest import SuggestIndex
+
+PREFIXES = ['c', 'ci', 'cidade', 'cidade a', 'esp 1', 'esp 19', 'psi', 'p', 'prof 2', 'zzz']
+
+def populate(index, count):
+    random.seed(1)
+    for i in range(count):
+        city = 'Cidade ' + ''.join(random.choice(string.ascii_lowercase) for _ in range(6))
+        index.add_professional(f'Prof {i % 300}', city, 'SP', [f'Esp {i % 2000}', f'Psi {i % 50}'])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--count', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=1000)
+    args = parser.parse_args()
+
+    index = SuggestIndex()
+    start = time.perf_counter()
+    populate(index, args.count)
+    print(f"{args.count} profissionais, {len(index._entries)} entradas, {len(index._terms)} termos "
+          f"({time.perf_counter() - start:.1f}s)")
+
+    print(f"{'prefixo':12s} {'sem memo (ms)':>14s} {'com memo (ms)':>14s}  sugestões")
+    for prefix in PREFIXES:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            index._memo.clear()
+            result = index.suggest(prefix)
+        cold = 1000 * (time.perf_counter() - start) / args.repeat
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            index.suggest(prefix)
+        warm = 1000 * (time.perf_counter() - start) / args.repeat
+        print(f"{prefix!r:12s} {cold:14.4f} {warm:14.4f}  {len(result)}")
+
+if __name__ == '__main__':
+    main()
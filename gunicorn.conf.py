@@ -0,0 +1,17 @@
+"""
+Configuração do gunicorn
+
+Workers gevent: cada conexão SSE ociosa (/api/appointments/events) é uma
+greenlet esperando na fila do hub de eventos, em vez de um worker
+inteiro preso. O psycopg2 é adaptado com psycogreen para que as queries
+não bloqueiem as demais greenlets do worker.
+"""
+import os
+
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+worker_class = 'gevent'
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 5000))
+
+def post_fork(server, worker):
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
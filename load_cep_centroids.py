@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Script para carregar os centróides de CEP (server/data/cep_centroids.csv)
+na tabela cep_centroids e recalcular a localização dos profissionais.
+Rodar após editar o arquivo (ex.: para acrescentar prefixos mais finos).
+As buscas em cache nos workers web só são invalidadas com
+EVENTS_BACKEND=postgres (LISTEN/NOTIFY); sem isso, expiram em até
+CACHE_TTL_SECONDS.
+"""
+import os
+import sys
+
+# Adicionar diretório server ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'server'))
+
+from database import SessionLocal
+from models import User
+from geo import load_cep_centroids, update_user_location
+from search import refresh_search_document
+from cache import use_shared_invalidation, invalidate_tags, SEARCH_TAG
+
+def main():
+    use_shared_invalidation(listen=False)
+    db = SessionLocal()
+    try:
+        print("🔄 Carregando centróides de CEP...")
+        total = load_cep_centroids(db)
+        db.flush()
+        print(f"✅ {total} prefixos carregados")
+        
+        print("🔄 Recalculando localização dos profissionais...")
+        professionals = db.query(User).filter(User.user_type == 'professional').all()
+        for user in professionals:
+            update_user_location(db, user)
+            refresh_search_document(db, user)
+        db.commit()
+        invalidate_tags([SEARCH_TAG])
+        print(f"✅ {len(professionals)} profissionais atualizados")
+        return True
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Erro ao carregar centróides: {e}")
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
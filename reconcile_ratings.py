@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Script para recalcular os agregados de avaliações dos profissionais
+(rating_count, rating_sum, rating_average e histograma) a partir da
+tabela reviews, corrigindo qualquer divergência. Os documentos de busca
+dos profissionais corrigidos são recriados. O cache de busca/perfil dos
+workers web só é invalidado com EVENTS_BACKEND=postgres (invalidação
+publicada por LISTEN/NOTIFY); sem isso, eles servem o corpo antigo por
+até CACHE_TTL_SECONDS.
+"""
+import os
+import sys
+
+# Adicionar diretório server ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'server'))
+
+from database import SessionLocal
+from ratings import reconcile_ratings
+from cache import use_shared_invalidation, invalidate_tags, professional_tag, SEARCH_TAG
+
+def main():
+    use_shared_invalidation(listen=False)
+    db = SessionLocal()
+    try:
+        print("🔄 Reconciliando agregados de avaliações...")
+        fixed = reconcile_ratings(db)
+        db.commit()
+        if fixed:
+            invalidate_tags([professional_tag(professional_id) for professional_id in fixed] + [SEARCH_TAG])
+        print(f"✅ {len(fixed)} profissionais corrigidos")
+        return True
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Erro ao reconciliar avaliações: {e}")
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
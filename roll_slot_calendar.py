@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Script para estender o calendário materializado de horários livres
+(slot_calendar): remove os dias passados e calcula os dias que entraram
+no horizonte de SLOT_CALENDAR_DAYS. Agendar uma vez por dia (ex.: cron
+do Railway logo após a meia-noite).
+"""
+import os
+import sys
+
+# Adicionar diretório server ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'server'))
+
+from database import SessionLocal
+from slot_calendar import roll_horizon
+
+def main():
+    db = SessionLocal()
+    try:
+        print("🔄 Estendendo calendário de horários...")
+        extended = roll_horizon(db)
+        db.commit()
+        print(f"✅ {extended} profissionais atualizados")
+        return True
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Erro ao estender calendário: {e}")
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
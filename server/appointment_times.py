@@ -0,0 +1,85 @@
+"""
+Início tipado das consultas
+
+appointments.starts_at guarda date + time (horário local, como as
+strings) num timestamp e duration_minutes guarda a duração do slot no
+momento do agendamento. As leituras por período usam intervalos de
+starts_at com os índices (professional_id, starts_at) e
+(patient_id, starts_at); date e time continuam gravados para as
+respostas da API e para o índice único de horários.
+
+Datas e horários das consultas são de Brasília; o servidor roda em UTC,
+então "agora" e "hoje" na agenda vêm de brasilia_now/brasilia_today.
+"""
+from datetime import datetime
+import pytz
+import sqlalchemy as sa
+from slot_engine import DEFAULT_SLOT_DURATION
+
+BACKFILL_BATCH_SIZE = 1000
+BRASILIA_TZ = pytz.timezone('America/Sao_Paulo')
+
+# Tabelas mínimas para o backfill (a migração add_appointment_starts_at
+# tem a sua própria cópia congelada)
+appointments_table = sa.table(
+    'appointments',
+    sa.column('id'), sa.column('professional_id'), sa.column('date'), sa.column('time'),
+    sa.column('starts_at'), sa.column('duration_minutes')
+)
+users_table = sa.table('users', sa.column('id'), sa.column('slot_duration'))
+
+def brasilia_now():
+    """Agora no horário de Brasília (datetime sem fuso, como starts_at)"""
+    return datetime.now(BRASILIA_TZ).replace(tzinfo=None)
+
+def brasilia_today():
+    """Data de hoje em Brasília"""
+    return brasilia_now().date()
+
+def starts_at_of(date_value, time_value):
+    """'YYYY-MM-DD' e 'HH:MM' -> datetime (ValueError se inválidos)"""
+    return datetime.strptime(f'{date_value} {time_value}', '%Y-%m-%d %H:%M')
+
+def backfill_starts_at(connection, batch_size=BACKFILL_BATCH_SIZE, commit=None):
+    """Preencher starts_at e duration_minutes das consultas sem esses campos
+
+    Percorre por id em lotes de batch_size (uma leitura e um UPDATE em
+    lote cada), chamando commit() após cada lote quando fornecido, para
+    não segurar locks na tabela inteira. A duração vem do slot_duration
+    atual do profissional. Retorna (preenchidas, ignoradas); ignoradas
+    são as de date/time inválidos, que ficam fora das buscas por período.
+    """
+    appointments, users = appointments_table, users_table
+    update = appointments.update().where(appointments.c.id == sa.bindparam('row_id')).values(
+        starts_at=sa.bindparam('starts_at'), duration_minutes=sa.bindparam('duration')
+    )
+    filled = skipped = 0
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(appointments.c.id, appointments.c.date, appointments.c.time, users.c.slot_duration)
+            .select_from(appointments.outerjoin(users, users.c.id == appointments.c.professional_id))
+            .where(appointments.c.starts_at.is_(None), appointments.c.id > last_id)
+            .order_by(appointments.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        values = []
+        for row_id, date_value, time_value, duration in rows:
+            try:
+                starts_at = starts_at_of(date_value, time_value)
+            except (ValueError, TypeError):
+                skipped += 1
+                continue
+            values.append({
+                'row_id': row_id, 'starts_at': starts_at,
+                'duration': duration or DEFAULT_SLOT_DURATION
+            })
+        if values:
+            connection.execute(update, values)
+        if commit:
+            commit()
+        filled += len(values)
+        last_id = rows[-1][0]
+    return filled, skipped
@@ -0,0 +1,89 @@
+"""
+Bitmaps de agenda em quartos de hora
+
+A agenda semanal de um profissional é um inteiro de 7 x 96 bits (bit
+dia * 96 + quarto, dia no formato do banco: 0=domingo), persistido em
+users.availability_bitmap (84 bytes). As consultas de uma data viram um
+inteiro de 96 bits. Os horários livres de um dia saem de operações bit a
+bit sobre esses inteiros (grade & ~ocupado), sem converter 'HH:MM' por
+requisição; inteiros do Python fazem as operações por palavra de máquina.
+
+A grade começa no início de cada janela contínua e anda de slot_duration
+em slot_duration; por isso os horários de disponibilidade precisam ser
+múltiplos de 15 minutos.
+"""
+from functools import lru_cache
+
+QUARTER_MINUTES = 15
+QUARTERS_PER_DAY = 24 * 60 // QUARTER_MINUTES
+DAY_MASK = (1 << QUARTERS_PER_DAY) - 1
+WEEK_BYTES = 7 * QUARTERS_PER_DAY // 8
+
+def interval_bits(start, end):
+    """Bits dos quartos que intersectam [start, end) (minutos)"""
+    first = max(start, 0) // QUARTER_MINUTES
+    last = min(-(-end // QUARTER_MINUTES), QUARTERS_PER_DAY)
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+def window_bits(start, end):
+    """Bits dos quartos inteiramente contidos em [start, end) (minutos)"""
+    first = -(-max(start, 0) // QUARTER_MINUTES)
+    last = min(end // QUARTER_MINUTES, QUARTERS_PER_DAY)
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+def encode_week(windows_by_weekday):
+    """{dia da semana: [(início, fim)] em minutos} -> bytes da agenda semanal"""
+    week = 0
+    for day_of_week, windows in windows_by_weekday.items():
+        day = 0
+        for start, end in windows:
+            day |= window_bits(start, end)
+        week |= day << (day_of_week * QUARTERS_PER_DAY)
+    return week.to_bytes(WEEK_BYTES, 'big')
+
+def decode_week(bitmap):
+    """bytes da agenda semanal -> lista com os 7 bitmaps diários"""
+    week = int.from_bytes(bitmap, 'big') if bitmap else 0
+    return [(week >> (day * QUARTERS_PER_DAY)) & DAY_MASK for day in range(7)]
+
+@lru_cache(maxsize=4096)
+def grid_bits(day, quarters):
+    """Inícios de slot permitidos: a cada `quarters` quartos a partir do
+    início de cada trecho contínuo, com o slot inteiro dentro do trecho"""
+    grid = 0
+    while day:
+        run_start = (day & -day).bit_length() - 1
+        run = day >> run_start
+        run_length = (~run & (run + 1)).bit_length() - 1
+        for offset in range(0, run_length - quarters + 1, quarters):
+            grid |= 1 << (run_start + offset)
+        day &= ~(((1 << run_length) - 1) << run_start)
+    return grid
+
+def blocked_bits(busy, quarters):
+    """Inícios cujo slot de `quarters` quartos colide com algum bit ocupado"""
+    blocked = busy
+    for shift in range(1, quarters):
+        blocked |= busy >> shift
+    return blocked
+
+def free_bits(day, busy, quarters):
+    """Inícios livres do dia: grade da agenda menos colisões com consultas"""
+    return grid_bits(day, quarters) & ~blocked_bits(busy, quarters)
+
+def bits_to_minutes(bits):
+    """Bits de quartos -> minutos em ordem crescente"""
+    minutes = []
+    while bits:
+        low = bits & -bits
+        minutes.append((low.bit_length() - 1) * QUARTER_MINUTES)
+        bits ^= low
+    return minutes
+
+def slot_quarters(duration):
+    """Duração em minutos -> número de quartos (arredondado para cima)"""
+    return max(1, -(-duration // QUARTER_MINUTES))
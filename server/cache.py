@@ -0,0 +1,195 @@
+"""
+Cache de respostas de busca e perfil de profissionais
+
+O backend padrão é um LRU em memória com TTL, por processo. Entradas são
+marcadas com tags para invalidação: 'professional:<id>' para o perfil e
+'search' para qualquer busca (uma alteração pode incluir ou remover o
+profissional de qualquer resultado). Para compartilhar o cache entre
+workers, basta registrar outro backend com set_cache_backend().
+
+Com o backend em memória, cada processo tem o seu cache: a invalidação
+feita por um worker ou por um script de manutenção não alcança os
+demais, que servem o corpo antigo até o TTL. Com EVENTS_BACKEND=postgres
+as invalidações também são publicadas por LISTEN/NOTIFY (canal
+CACHE_CHANNEL, mesmo transporte dos eventos de agenda) e aplicadas no
+cache de todos os workers; ver use_shared_invalidation.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+SEARCH_TAG = 'search'
+CACHE_CHANNEL = 'cache_invalidations'
+NOTIFY_TAGS_PER_MESSAGE = 200  # payload do NOTIFY limitado a 8000 bytes
+
+class CacheBackend:
+    """Interface dos backends de cache"""
+    
+    def get(self, key):
+        """Retorna o valor armazenado ou None"""
+        raise NotImplementedError
+    
+    def set(self, key, value, tags=()):
+        raise NotImplementedError
+    
+    def invalidate_tag(self, tag):
+        raise NotImplementedError
+    
+    def clear(self):
+        raise NotImplementedError
+    
+    def stats(self):
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    """LRU limitado por quantidade de entradas, com TTL por entrada"""
+    
+    def __init__(self, max_entries=1024, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value, tags)
+        self._tags = {}  # tag -> set(keys)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def set(self, key, value, tags=()):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, tuple(tags))
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+    
+    def invalidate_tag(self, tag):
+        with self._lock:
+            for key in list(self._tags.get(tag, ())):
+                self._remove(key)
+                self.invalidations += 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': 'memory',
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
+    
+    def _remove(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+_backend = MemoryCache(
+    max_entries=int(os.environ.get('CACHE_MAX_ENTRIES', 1024)),
+    ttl=int(os.environ.get('CACHE_TTL_SECONDS', 60))
+)
+
+def get_cache():
+    """Backend de cache em uso"""
+    return _backend
+
+def set_cache_backend(backend):
+    """Substituir o backend de cache (ex.: um store compartilhado)"""
+    global _backend
+    _backend = backend
+
+def cache_key(namespace, **params):
+    """Chave determinística a partir de parâmetros já normalizados"""
+    return f"{namespace}?{urlencode(sorted((k, '' if v is None else v) for k, v in params.items()))}"
+
+def professional_tag(professional_id):
+    return f'professional:{professional_id}'
+
+_invalidation_backend = None
+
+def set_invalidation_backend(backend, listen=True):
+    """Propagar invalidações a outros processos por um EventBackend
+
+    Com listen, aplica no cache deste processo as invalidações publicadas
+    pelos demais (workers web); scripts de manutenção só publicam.
+    """
+    global _invalidation_backend
+    if listen:
+        backend.start(lambda _, message: invalidate_local(message['tags']))
+    _invalidation_backend = backend
+
+def use_shared_invalidation(listen=True):
+    """Com EVENTS_BACKEND=postgres, publicar invalidações por LISTEN/NOTIFY
+
+    Retorna se o canal compartilhado foi configurado; sem ele as
+    invalidações ficam no próprio processo.
+    """
+    if os.environ.get('EVENTS_BACKEND') != 'postgres':
+        return False
+    from database import DATABASE_URL
+    from events import PostgresEventBackend
+    set_invalidation_backend(PostgresEventBackend(DATABASE_URL, channel=CACHE_CHANNEL), listen=listen)
+    return True
+
+def invalidate_local(tags):
+    """Invalidar tags só no cache deste processo"""
+    cache = get_cache()
+    for tag in tags:
+        cache.invalidate_tag(tag)
+
+def invalidate_tags(tags):
+    """Invalidar tags neste processo e, se configurado, nos demais
+
+    Falhas na publicação não afetam quem chamou: os demais processos
+    recebem o corpo novo ao fim do TTL.
+    """
+    tags = list(dict.fromkeys(tags))
+    invalidate_local(tags)
+    if _invalidation_backend is None:
+        return
+    try:
+        for start in range(0, len(tags), NOTIFY_TAGS_PER_MESSAGE):
+            _invalidation_backend.publish([], {'tags': tags[start:start + NOTIFY_TAGS_PER_MESSAGE]})
+    except Exception as e:
+        print(f"Erro ao publicar invalidação de cache: {e}")
+
+def invalidate_professional(professional_id):
+    """Invalidar perfil do profissional e buscas (chamar após o commit)"""
+    invalidate_tags([professional_tag(professional_id), SEARCH_TAG])
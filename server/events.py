@@ -0,0 +1,210 @@
+"""
+Eventos de agenda em tempo real (Server-Sent Events)
+
+As rotas de consulta publicam um evento depois do commit (criação,
+confirmação, conclusão, contestação, cancelamento e resolução de
+disputa) para o paciente e o profissional envolvidos. Cada worker tem um
+hub em memória com uma fila limitada por conexão SSE; o backend decide
+como o evento chega aos hubs: MemoryEventBackend entrega só no próprio
+processo e PostgresEventBackend usa LISTEN/NOTIFY para alcançar todos os
+workers. Outro transporte (ex.: Redis) basta implementar EventBackend e
+registrar com set_event_backend().
+
+Os eventos não são persistidos: ao (re)conectar, o cliente recupera o
+que perdeu com /api/appointments/changes.
+"""
+import json
+import os
+import queue
+import select
+import threading
+import time
+
+EVENTS_CHANNEL = 'appointment_events'
+SSE_HEARTBEAT_SECONDS = 20
+SSE_MAX_SECONDS = int(os.environ.get('SSE_MAX_SECONDS', 300))
+SSE_RETRY_MS = 3000
+
+class Subscription:
+    """Fila de eventos de uma conexão SSE"""
+
+    def __init__(self, user_id, queue_size):
+        self.user_id = user_id
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.closed = False
+
+    def get(self, timeout):
+        """Próximo evento, ou None se nada chegar em timeout segundos"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventHub:
+    """Conexões SSE do processo, por usuário"""
+
+    def __init__(self, max_connections=5000, queue_size=100):
+        self.max_connections = max_connections
+        self.queue_size = queue_size
+        self._subscribers = {}  # user_id -> set(Subscription)
+        self._count = 0
+        self._lock = threading.Lock()
+        self.delivered = 0
+        self.dropped = 0
+
+    def subscribe(self, user_id):
+        """Nova conexão do usuário; None se o processo atingiu o limite"""
+        with self._lock:
+            if self._count >= self.max_connections:
+                return None
+            subscription = Subscription(user_id, self.queue_size)
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+            self._count += 1
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscribers.get(subscription.user_id)
+            if subscriptions and subscription in subscriptions:
+                subscriptions.discard(subscription)
+                self._count -= 1
+                if not subscriptions:
+                    del self._subscribers[subscription.user_id]
+
+    def deliver(self, user_ids, event):
+        """Enfileirar o evento nas conexões dos usuários, sem bloquear"""
+        with self._lock:
+            targets = [s for user_id in set(user_ids) for s in self._subscribers.get(user_id, ())]
+        for subscription in targets:
+            try:
+                subscription.queue.put_nowait(event)
+                self.delivered += 1
+            except queue.Full:
+                # Cliente que não consome: encerrar a conexão; ele
+                # reconecta e recupera o que perdeu com /changes
+                subscription.closed = True
+                self.dropped += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'connections': self._count,
+                'users': len(self._subscribers),
+                'max_connections': self.max_connections,
+                'delivered': self.delivered,
+                'dropped': self.dropped
+            }
+
+
+class EventBackend:
+    """Interface dos transportes de eventos entre workers"""
+
+    def start(self, deliver):
+        """Passar a entregar os eventos publicados (neste e, se o transporte
+        permitir, nos demais workers) chamando deliver(user_ids, event)"""
+        raise NotImplementedError
+
+    def publish(self, user_ids, event):
+        raise NotImplementedError
+
+
+class MemoryEventBackend(EventBackend):
+    """Entrega direta no hub do próprio processo"""
+
+    def start(self, deliver):
+        self._deliver = deliver
+
+    def publish(self, user_ids, event):
+        self._deliver(user_ids, event)
+
+
+class PostgresEventBackend(EventBackend):
+    """LISTEN/NOTIFY no banco da aplicação
+
+    publish faz um pg_notify pelo pool do SQLAlchemy; cada worker escuta
+    o canal numa conexão dedicada (thread daemon) e entrega no próprio
+    hub. Se a conexão de escuta cair, reconecta após reconnect_delay
+    segundos; eventos desse intervalo se perdem (ver /changes).
+    """
+
+    def __init__(self, dsn, channel=EVENTS_CHANNEL, reconnect_delay=5):
+        self.dsn = dsn
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+
+    def start(self, deliver):
+        self._deliver = deliver
+        threading.Thread(target=self._listen, name='events-listener', daemon=True).start()
+
+    def publish(self, user_ids, event):
+        from sqlalchemy import text
+        from database import engine
+        payload = json.dumps({'users': list(user_ids), 'event': event}, separators=(',', ':'))
+        with engine.begin() as connection:
+            connection.execute(text('SELECT pg_notify(:channel, :payload)'), {'channel': self.channel, 'payload': payload})
+
+    def _listen(self):
+        import psycopg2
+        import psycopg2.extensions
+        while True:
+            connection = None
+            try:
+                connection = psycopg2.connect(self.dsn)
+                connection.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with connection.cursor() as cursor:
+                    cursor.execute(f'LISTEN {self.channel}')
+                while True:
+                    if select.select([connection], [], [], 60) == ([], [], []):
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        message = json.loads(connection.notifies.pop(0).payload)
+                        self._deliver(message['users'], message['event'])
+            except Exception as e:
+                print(f"Erro no listener de eventos: {e}")
+                time.sleep(self.reconnect_delay)
+            finally:
+                if connection is not None:
+                    connection.close()
+
+
+_hub = EventHub(
+    max_connections=int(os.environ.get('SSE_MAX_CONNECTIONS', 5000)),
+    queue_size=int(os.environ.get('SSE_QUEUE_SIZE', 100))
+)
+_backend = MemoryEventBackend()
+_backend.start(_hub.deliver)
+
+def get_event_hub():
+    """Hub de conexões SSE do processo"""
+    return _hub
+
+def set_event_backend(backend):
+    """Substituir o transporte de eventos (ex.: PostgresEventBackend)"""
+    global _backend
+    backend.start(_hub.deliver)
+    _backend = backend
+
+def appointment_event(kind, appointment):
+    """Evento de uma consulta (montar antes do commit, que expira o objeto)"""
+    return {
+        'type': kind,
+        'appointment_id': appointment.id,
+        'patient_id': appointment.patient_id,
+        'professional_id': appointment.professional_id,
+        'status': appointment.status,
+        'date': appointment.date,
+        'time': appointment.time
+    }
+
+def publish_event(event):
+    """Publicar para o paciente e o profissional (chamar após o commit)
+
+    Falhas no transporte não afetam a requisição: o cliente ainda vê a
+    alteração por /changes.
+    """
+    try:
+        _backend.publish([event['patient_id'], event['professional_id']], event)
+    except Exception as e:
+        print(f"Erro ao publicar evento: {e}")
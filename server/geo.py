@@ -0,0 +1,144 @@
+"""
+Geolocalização offline por CEP e geohash
+
+O CEP é resolvido pela tabela cep_centroids (prefixo de CEP -> centróide),
+carregada de data/cep_centroids.csv, usando o prefixo mais longo
+cadastrado. Cada profissional guarda latitude, longitude e geohash; a
+busca por proximidade filtra pelas células de geohash vizinhas (faixas
+no índice B-tree) e ordena pela distância aproximada.
+"""
+import csv
+import math
+import os
+import re
+from models import CepCentroid
+
+GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 7
+KM_PER_DEGREE = 111.32
+EARTH_RADIUS_KM = 6371.0
+
+CEP_CENTROIDS_FILE = os.path.join(os.path.dirname(__file__), 'data', 'cep_centroids.csv')
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Codificar coordenadas em geohash"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    result = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(result) < precision:
+        if even:
+            mid = (lng_range[0] + lng_range[1]) / 2
+            if longitude >= mid:
+                bits = (bits << 1) | 1
+                lng_range[0] = mid
+            else:
+                bits <<= 1
+                lng_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits <<= 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            result.append(GEOHASH_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(result)
+
+def geohash_cell_size(precision):
+    """Tamanho (graus de latitude, graus de longitude) de uma célula"""
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = (5 * precision) // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+def cells_for_radius(latitude, longitude, radius_km):
+    """Prefixos de geohash que cobrem um círculo (célula central + 8 vizinhas)
+    
+    Usa a maior precisão cuja célula, na latitude do centro, tem altura e
+    largura de pelo menos o raio, de modo que o quadrado 3x3 contenha o
+    círculo.
+    """
+    cos_lat = max(math.cos(math.radians(latitude)), 0.01)
+    precision = 1
+    for candidate in range(2, GEOHASH_PRECISION + 1):
+        lat_step, lng_step = geohash_cell_size(candidate)
+        if min(lat_step * KM_PER_DEGREE, lng_step * KM_PER_DEGREE * cos_lat) < radius_km:
+            break
+        precision = candidate
+    lat_step, lng_step = geohash_cell_size(precision)
+    
+    cells = set()
+    for dlat in (-lat_step, 0, lat_step):
+        for dlng in (-lng_step, 0, lng_step):
+            lat = max(-89.999999, min(89.999999, latitude + dlat))
+            lng = (longitude + dlng + 180.0) % 360.0 - 180.0
+            cells.add(encode_geohash(lat, lng, precision))
+    return sorted(cells)
+
+def geohash_prefix_upper_bound(prefix):
+    """Menor string maior que todas as que começam com o prefixo
+    
+    Vale na ordem por bytes (collation "C"), que é a da coluna geohash no
+    PostgreSQL e a padrão do SQLite; em collations de idioma a ordem entre
+    dígitos e letras não é garantida e a faixa pode perder profissionais.
+    """
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Distância em km entre dois pontos"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+def normalize_cep(cep):
+    """Apenas os dígitos do CEP"""
+    return re.sub(r'\D', '', cep or '')
+
+def read_cep_centroids(path=CEP_CENTROIDS_FILE):
+    """Ler arquivo local de centróides por prefixo de CEP"""
+    with open(path, newline='', encoding='utf-8') as f:
+        return [{
+            'prefix': row['prefix'],
+            'latitude': float(row['latitude']),
+            'longitude': float(row['longitude']),
+            'label': row['label']
+        } for row in csv.DictReader(f)]
+
+def load_cep_centroids(db, path=CEP_CENTROIDS_FILE):
+    """Carregar/atualizar cep_centroids a partir do arquivo local; retorna o total"""
+    rows = read_cep_centroids(path)
+    for row in rows:
+        db.merge(CepCentroid(**row))
+    return len(rows)
+
+def locate_cep(db, cep):
+    """Resolver CEP em (latitude, longitude) pelo prefixo mais longo; None se desconhecido"""
+    digits = normalize_cep(cep)
+    if len(digits) < 2:
+        return None
+    prefixes = [digits[:size] for size in range(min(len(digits), 5), 1, -1)]
+    centroid = db.query(CepCentroid).filter(
+        CepCentroid.prefix.in_(prefixes)
+    ).order_by(CepCentroid.prefix.desc()).first()
+    if not centroid:
+        return None
+    return centroid.latitude, centroid.longitude
+
+def update_user_location(db, user):
+    """Atualizar latitude/longitude/geohash do usuário a partir do CEP"""
+    location = locate_cep(db, user.cep)
+    if location:
+        user.latitude, user.longitude = location
+        user.geohash = encode_geohash(*location)
+    else:
+        user.latitude = user.longitude = user.geohash = None
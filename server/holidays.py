@@ -0,0 +1,54 @@
+"""
+Feriados nacionais
+
+Carregados de data/holidays.json: datas fixas (MM-DD) e feriados móveis
+definidos pelo deslocamento em dias a partir da Páscoa. Para incluir um
+feriado (ou ponto facultativo observado pela plataforma), basta editar o
+arquivo; nada depende de serviços externos.
+"""
+import json
+import os
+from datetime import date, timedelta
+from functools import lru_cache
+
+HOLIDAYS_FILE = os.path.join(os.path.dirname(__file__), 'data', 'holidays.json')
+
+def easter(year):
+    """Domingo de Páscoa (algoritmo de Meeus/Jones/Butcher)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+@lru_cache(maxsize=1)
+def read_holiday_rules(path=HOLIDAYS_FILE):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+@lru_cache(maxsize=64)
+def holidays_of_year(year):
+    """{'YYYY-MM-DD': nome} dos feriados nacionais do ano"""
+    rules = read_holiday_rules()
+    result = {f"{year}-{rule['date']}": rule['name'] for rule in rules.get('fixed', [])}
+    easter_day = easter(year)
+    for rule in rules.get('easter_offsets', []):
+        result[(easter_day + timedelta(days=rule['offset'])).isoformat()] = rule['name']
+    return result
+
+def holidays_between(first_day, last_day):
+    """{'YYYY-MM-DD': nome} dos feriados no período (inclusivo)"""
+    first, last = first_day.isoformat(), last_day.isoformat()
+    result = {}
+    for year in range(first_day.year, last_day.year + 1):
+        result.update({
+            key: name for key, name in holidays_of_year(year).items()
+            if first <= key <= last
+        })
+    return result
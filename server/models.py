@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, ForeignKey, Table, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, ForeignKey, Table, Boolean, Index, LargeBinary, UniqueConstraint, literal_column, text
+from sqlalchemy.dialects.postgresql import to_tsvector
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -53,22 +54,47 @@ class User(Base):
     in_person_enabled = Column(Boolean, default=True)
     home_enabled = Column(Boolean, default=False)
     
+    # Localização aproximada a partir do CEP (ver geo.py)
+    latitude = Column(Float)
+    longitude = Column(Float)
+    geohash = Column(String(12))
+    
     # Duração dos slots de agendamento (em minutos)
     slot_duration = Column(Integer, default=30)  # 15, 30, 45 ou 60 minutos
     
+    # Se atende em feriados nacionais (ver holidays.py)
+    works_on_holidays = Column(Boolean, default=False)
+    
+    # Agenda semanal em bitmap: 7 dias x 96 quartos de hora (ver bitmaps.py)
+    availability_bitmap = Column(LargeBinary(84))
+    availability_version = Column(Integer, default=0)  # incrementada a cada alteração da agenda
+    
+    # Último dia (YYYY-MM-DD) materializado em slot_calendar (ver slot_calendar.py)
+    slot_calendar_until = Column(String(10))
+    
     # Foto de perfil
     photo_url = Column(String(500))
     
+    # Agregados de avaliações (mantidos em create_review, ver ratings.py)
+    rating_count = Column(Integer, default=0, nullable=False)
+    rating_sum = Column(Integer, default=0, nullable=False)
+    rating_average = Column(Float, default=0, nullable=False)
+    rating_1 = Column(Integer, default=0, nullable=False)
+    rating_2 = Column(Integer, default=0, nullable=False)
+    rating_3 = Column(Integer, default=0, nullable=False)
+    rating_4 = Column(Integer, default=0, nullable=False)
+    rating_5 = Column(Integer, default=0, nullable=False)
+    
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relacionamentos
-    specialties = relationship('server.models.Specialty', secondary=user_specialties, back_populates='users')
-    appointments_as_patient = relationship('server.models.Appointment', foreign_keys='Appointment.patient_id', back_populates='patient')
-    appointments_as_professional = relationship('server.models.Appointment', foreign_keys='Appointment.professional_id', back_populates='professional')
-    reviews_received = relationship('server.models.Review', foreign_keys='Review.professional_id', back_populates='professional')
-    reviews_given = relationship('server.models.Review', foreign_keys='Review.patient_id', back_populates='patient')
+    specialties = relationship('Specialty', secondary=user_specialties, back_populates='users')
+    appointments_as_patient = relationship('Appointment', foreign_keys='Appointment.patient_id', back_populates='patient')
+    appointments_as_professional = relationship('Appointment', foreign_keys='Appointment.professional_id', back_populates='professional')
+    reviews_received = relationship('Review', foreign_keys='Review.professional_id', back_populates='professional')
+    reviews_given = relationship('Review', foreign_keys='Review.patient_id', back_populates='patient')
 
 class Specialty(Base):
     __table_args__ = {"extend_existing": True}
@@ -77,10 +103,9 @@ class Specialty(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), unique=True, nullable=False, index=True)
     
-    users = relationship('server.models.User', secondary=user_specialties, back_populates='specialties')
+    users = relationship('User', secondary=user_specialties, back_populates='specialties')
 
 class Appointment(Base):
-    __table_args__ = {"extend_existing": True}
     __tablename__ = 'appointments'
     
     id = Column(Integer, primary_key=True, index=True)
@@ -91,6 +116,11 @@ class Appointment(Base):
     time = Column(String(5), nullable=False)   # HH:MM
     type = Column(String(20), nullable=False)  # 'presencial' ou 'domiciliar'
     
+    # Início (date + time, horário local) e duração tipados para consultas
+    # por período (ver appointment_times.py)
+    starts_at = Column(DateTime)
+    duration_minutes = Column(Integer)
+    
     price = Column(Float, nullable=False)
     platform_fee = Column(Float)  # 10% da plataforma
     professional_amount = Column(Float)  # 90% para o profissional
@@ -105,15 +135,57 @@ class Appointment(Base):
     completed_at = Column(DateTime)  # Quando profissional marcou como realizada
     disputed = Column(Boolean, default=False)  # Se paciente contestou
     dispute_reason = Column(Text)  # Motivo da contestação
+    settled_at = Column(DateTime)  # Pagamento liberado (fim do prazo de contestação)
     
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Sempre preenchido (também em INSERTs fora do ORM): /changes ordena por ele
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow,
+                        server_default=text('CURRENT_TIMESTAMP'))
+    
+    __table_args__ = (
+        # No máximo uma consulta ativa (status de slot_engine.ACTIVE_STATUSES)
+        # por horário do profissional: o banco decide a corrida entre workers
+        Index(
+            'uq_appointments_active_slot', professional_id, date, time, unique=True,
+            postgresql_where=status.in_(['pending', 'confirmed', 'completed']),
+            sqlite_where=status.in_(['pending', 'confirmed', 'completed'])
+        ),
+        # Agendas por período de profissional e de paciente
+        Index('ix_appointments_professional_starts_at', professional_id, starts_at),
+        Index('ix_appointments_patient_starts_at', patient_id, starts_at),
+        # Horários ocupados (slot_engine) sem passar pelas canceladas
+        Index(
+            'ix_appointments_active_professional_starts_at', professional_id, starts_at,
+            postgresql_where=status.in_(['pending', 'confirmed', 'completed']),
+            sqlite_where=status.in_(['pending', 'confirmed', 'completed'])
+        ),
+        # Sincronização incremental da agenda (/api/appointments/changes)
+        Index('ix_appointments_patient_updated_at', patient_id, updated_at, id),
+        Index('ix_appointments_professional_updated_at', professional_id, updated_at, id),
+        # Consultas sem starts_at a preencher (backfill_appointment_starts.py)
+        Index(
+            'ix_appointments_missing_starts_at', id,
+            postgresql_where=starts_at.is_(None), sqlite_where=starts_at.is_(None)
+        ),
+        # Fila de disputas do admin
+        Index(
+            'ix_appointments_disputed_starts_at', starts_at,
+            postgresql_where=(status == 'disputed'), sqlite_where=(status == 'disputed')
+        ),
+        # Realizadas aguardando liquidação (settlement.py)
+        Index(
+            'ix_appointments_unsettled_completed_at', completed_at,
+            postgresql_where=(status == 'completed') & settled_at.is_(None),
+            sqlite_where=(status == 'completed') & settled_at.is_(None)
+        ),
+        {"extend_existing": True}
+    )
     
     # Relacionamentos
-    patient = relationship('server.models.User', foreign_keys=[patient_id], back_populates='appointments_as_patient')
-    professional = relationship('server.models.User', foreign_keys=[professional_id], back_populates='appointments_as_professional')
-    review = relationship('server.models.Review', back_populates='appointment', uselist=False)
+    patient = relationship('User', foreign_keys=[patient_id], back_populates='appointments_as_patient')
+    professional = relationship('User', foreign_keys=[professional_id], back_populates='appointments_as_professional')
+    review = relationship('Review', back_populates='appointment', uselist=False)
 
 class Review(Base):
     __table_args__ = {"extend_existing": True}
@@ -130,9 +202,9 @@ class Review(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relacionamentos
-    appointment = relationship('server.models.Appointment', back_populates='review')
-    patient = relationship('server.models.User', foreign_keys=[patient_id], back_populates='reviews_given')
-    professional = relationship('server.models.User', foreign_keys=[professional_id], back_populates='reviews_received')
+    appointment = relationship('Appointment', back_populates='review')
+    patient = relationship('User', foreign_keys=[patient_id], back_populates='reviews_given')
+    professional = relationship('User', foreign_keys=[professional_id], back_populates='reviews_received')
 
 class Payment(Base):
     __table_args__ = {"extend_existing": True}
@@ -163,8 +235,8 @@ class Favorite(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relacionamentos
-    patient = relationship('server.models.User', foreign_keys=[patient_id])
-    professional = relationship('server.models.User', foreign_keys=[professional_id])
+    patient = relationship('User', foreign_keys=[patient_id])
+    professional = relationship('User', foreign_keys=[professional_id])
 
 
 class Availability(Base):
@@ -184,5 +256,144 @@ class Availability(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relacionamento
-    professional = relationship('server.models.User', foreign_keys=[professional_id])
+    professional = relationship('User', foreign_keys=[professional_id])
+
+
+class AvailabilityException(Base):
+    __table_args__ = (
+        Index('ix_availability_exceptions_professional_date', 'professional_id', 'date'),
+        {"extend_existing": True}
+    )
+    __tablename__ = 'availability_exceptions'
+    
+    id = Column(Integer, primary_key=True, index=True)
+    professional_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    
+    # Bloqueio de uma data (férias, folga); sem horários = dia inteiro
+    date = Column(String(10), nullable=False)  # YYYY-MM-DD
+    start_time = Column(String(5))  # HH:MM
+    end_time = Column(String(5))    # HH:MM
+    reason = Column(String(255))
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Relacionamento
+    professional = relationship('User', foreign_keys=[professional_id])
+
 
+class SlotCalendar(Base):
+    __tablename__ = 'slot_calendar'
+    
+    # Horários livres pré-calculados; a chave primária serve a leitura por
+    # período (professional_id, date) como uma única varredura de índice
+    professional_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    date = Column(String(10), primary_key=True)  # YYYY-MM-DD
+    time = Column(String(5), primary_key=True)   # HH:MM
+
+
+class SlotHold(Base):
+    __table_args__ = (
+        UniqueConstraint('professional_id', 'date', 'time', name='uq_slot_holds_slot'),
+        Index('ix_slot_holds_expires_at', 'expires_at'),
+        {"extend_existing": True}
+    )
+    __tablename__ = 'slot_holds'
+    
+    # Reserva temporária de um horário enquanto o paciente finaliza o
+    # agendamento; vale até expires_at (UTC) e é removida pelo
+    # sweep_slot_holds.py (processo scheduler) depois disso
+    id = Column(Integer, primary_key=True, index=True)
+    professional_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    patient_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
+    date = Column(String(10), nullable=False)  # YYYY-MM-DD
+    time = Column(String(5), nullable=False)   # HH:MM
+    expires_at = Column(DateTime, nullable=False)
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class CepCentroid(Base):
+    __table_args__ = {"extend_existing": True}
+    __tablename__ = 'cep_centroids'
+    
+    # Prefixo de CEP (2 a 5 dígitos) -> centróide aproximado, ver geo.py
+    prefix = Column(String(5), primary_key=True)
+    latitude = Column(Float, nullable=False)
+    longitude = Column(Float, nullable=False)
+    label = Column(String(100))
+
+
+class ProfessionalSearchDocument(Base):
+    __tablename__ = 'professional_search_documents'
+    
+    professional_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    
+    # Campos pesquisáveis normalizados (minúsculas, sem acentos), ver search.py
+    city = Column(Text)
+    profession = Column(Text)
+    specialties = Column(Text)
+    
+    # Campos públicos usados em filtros, ordenação e facetas
+    name = Column(String(255))
+    profession_name = Column(String(100))
+    city_name = Column(String(100))
+    state = Column(String(2), index=True)
+    specialty_names = Column(Text)  # JSON: lista de nomes
+    online_price = Column(Float)
+    in_person_price = Column(Float)
+    home_price = Column(Float)
+    online_enabled = Column(Boolean)
+    in_person_enabled = Column(Boolean)
+    home_enabled = Column(Boolean)
+    min_price = Column(Float)  # menor preço entre as modalidades habilitadas
+    latitude = Column(Float)
+    longitude = Column(Float)
+    # Collation "C" no PostgreSQL: as faixas de prefixo da busca por
+    # proximidade dependem da ordem por bytes (ver geohash_prefix_upper_bound)
+    geohash = Column(String(12).with_variant(String(12, collation='C'), 'postgresql'), index=True)
+    rating_count = Column(Integer, default=0, nullable=False)
+    rating_average = Column(Float, default=0, nullable=False)
+    
+    # Cartão público pré-serializado (JSON pronto para a resposta da busca)
+    card = Column(Text, nullable=False)
+    
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        # Ordenação estável da busca: maior nota primeiro, desempate por id
+        Index('ix_professional_search_documents_rating', rating_average.desc(), professional_id),
+        # Filtros e ordenação por preço ("mais barato primeiro"), por modalidade
+        # via índices parciais sobre as modalidades habilitadas
+        Index('ix_professional_search_documents_state_min_price', state, min_price, professional_id),
+        Index('ix_professional_search_documents_min_price', min_price, professional_id),
+        Index(
+            'ix_professional_search_documents_state_online_price', state, online_price, professional_id,
+            postgresql_where=(online_enabled == True), sqlite_where=(online_enabled == True)
+        ),
+        Index(
+            'ix_professional_search_documents_state_in_person_price', state, in_person_price, professional_id,
+            postgresql_where=(in_person_enabled == True), sqlite_where=(in_person_enabled == True)
+        ),
+        Index(
+            'ix_professional_search_documents_state_home_price', state, home_price, professional_id,
+            postgresql_where=(home_enabled == True), sqlite_where=(home_enabled == True)
+        ),
+        # Índices invertidos (GIN) para busca textual no PostgreSQL; no SQLite
+        # a busca usa a tabela virtual FTS5 professional_search_fts (ver search.py)
+        Index(
+            'ix_professional_search_documents_city_fts',
+            to_tsvector(literal_column("'simple'"), city),
+            postgresql_using='gin'
+        ).ddl_if(dialect='postgresql'),
+        Index(
+            'ix_professional_search_documents_profession_fts',
+            to_tsvector(literal_column("'simple'"), profession),
+            postgresql_using='gin'
+        ).ddl_if(dialect='postgresql'),
+        Index(
+            'ix_professional_search_documents_specialties_fts',
+            to_tsvector(literal_column("'simple'"), specialties),
+            postgresql_using='gin'
+        ).ddl_if(dialect='postgresql'),
+        {"extend_existing": True}
+    )
@@ -0,0 +1,33 @@
+"""
+Utilitários de paginação por cursor (keyset)
+
+O cursor é opaco para o cliente: um JSON com os valores da chave de
+ordenação do último item da página, codificado em base64 url-safe.
+"""
+import base64
+import json
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+def encode_cursor(values):
+    """Codificar valores da chave de ordenação em um cursor opaco"""
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Decodificar cursor opaco; retorna None se o cursor for inválido"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        return None
+    return values if isinstance(values, list) else None
+
+def parse_limit(value, default=DEFAULT_LIMIT, maximum=MAX_LIMIT):
+    """Converter parâmetro limit, limitado a [1, maximum]"""
+    try:
+        limit = int(value) if value is not None else default
+    except (TypeError, ValueError):
+        limit = default
+    return max(1, min(limit, maximum))
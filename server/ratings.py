@@ -0,0 +1,97 @@
+"""
+Agregados de avaliações desnormalizados na tabela users
+
+Cada profissional guarda rating_count, rating_sum, rating_average e um
+histograma (rating_1..rating_5). As leituras passam a ser uma consulta
+de coluna em vez de um AVG/COUNT sobre a tabela reviews.
+"""
+from sqlalchemy import func, case
+from sqlalchemy.orm import selectinload
+from models import User, Review
+
+RATING_VALUES = (1, 2, 3, 4, 5)
+
+# Coluna do histograma de cada nota
+RATING_BUCKETS = {
+    1: User.rating_1,
+    2: User.rating_2,
+    3: User.rating_3,
+    4: User.rating_4,
+    5: User.rating_5
+}
+
+def register_review(db, professional_id, rating):
+    """Atualizar agregados do profissional na mesma transação da avaliação
+    
+    Usa incrementos atômicos no próprio UPDATE para não perder avaliações
+    gravadas em paralelo por outros workers. rating deve ser um inteiro
+    de RATING_VALUES (validado na rota).
+    """
+    bucket = RATING_BUCKETS[rating]
+    db.query(User).filter(User.id == professional_id).update({
+        User.rating_count: User.rating_count + 1,
+        User.rating_sum: User.rating_sum + rating,
+        User.rating_average: (User.rating_sum + rating) * 1.0 / (User.rating_count + 1),
+        bucket: bucket + 1
+    }, synchronize_session=False)
+
+def rating_summary(user):
+    """Converter agregados do profissional para dicionário"""
+    return {
+        'average_rating': user.rating_average if user.rating_count else None,
+        'total_reviews': user.rating_count or 0,
+        'rating_histogram': {
+            str(value): getattr(user, bucket.key) or 0 for value, bucket in RATING_BUCKETS.items()
+        }
+    }
+
+def reconcile_ratings(db):
+    """Recalcular agregados a partir de reviews e corrigir divergências
+    
+    Os documentos de busca dos profissionais corrigidos (que copiam nota e
+    total de avaliações) são recriados na mesma transação. Retorna os ids
+    corrigidos, para invalidar o cache após o commit. Não faz commit.
+    """
+    # search importa ratings
+    from search import refresh_search_document
+    
+    columns = [
+        func.count(Review.id),
+        func.coalesce(func.sum(Review.rating), 0)
+    ] + [
+        func.sum(case((Review.rating == value, 1), else_=0)) for value in RATING_VALUES
+    ]
+    actual = {
+        row[0]: tuple(int(v or 0) for v in row[1:])
+        for row in db.query(Review.professional_id, *columns).group_by(Review.professional_id).all()
+    }
+    
+    stored_columns = [User.id, User.rating_average, User.rating_count, User.rating_sum] + [
+        RATING_BUCKETS[value] for value in RATING_VALUES
+    ]
+    fixed = []
+    for row in db.query(*stored_columns).filter(User.user_type == 'professional').all():
+        expected = actual.get(row[0], (0,) * (2 + len(RATING_VALUES)))
+        count, total = expected[0], expected[1]
+        average = total / count if count else 0
+        
+        if tuple(v or 0 for v in row[2:]) == expected and abs((row[1] or 0) - average) < 1e-9:
+            continue
+        
+        values = {
+            'rating_count': count,
+            'rating_sum': total,
+            'rating_average': average
+        }
+        for value, bucket_count in zip(RATING_VALUES, expected[2:]):
+            values[RATING_BUCKETS[value].key] = bucket_count
+        db.query(User).filter(User.id == row[0]).update(values, synchronize_session=False)
+        fixed.append(row[0])
+    
+    if fixed:
+        professionals = db.query(User).options(selectinload(User.specialties)).filter(
+            User.id.in_(fixed)
+        ).populate_existing().all()
+        for professional in professionals:
+            refresh_search_document(db, professional)
+    return fixed
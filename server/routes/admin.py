@@ -1,6 +1,9 @@
 from flask import Blueprint, request, jsonify
+from datetime import datetime
 from models import Appointment, User, Payment
 from database import SessionLocal
+from cache import get_cache
+from events import appointment_event, publish_event
 import jwt
 import os
 from functools import wraps
@@ -40,7 +43,7 @@ def get_disputes(user_id):
         disputes = db.query(Appointment).filter(
             Appointment.status == 'disputed',
             Appointment.disputed == True
-        ).all()
+        ).order_by(Appointment.starts_at).all()
         
         results = []
         for apt in disputes:
@@ -116,11 +119,14 @@ def resolve_dispute(user_id, appointment_id):
             # Liberar pagamento ao profissional
             appointment.status = 'completed'
             appointment.disputed = False
+            appointment.settled_at = datetime.utcnow()
             if payment:
                 payment.status = 'completed'
             message = 'Disputa rejeitada. Pagamento liberado ao profissional.'
         
+        event = appointment_event('dispute.resolved', appointment)
         db.commit()
+        publish_event(event)
         
         return jsonify({
             'message': message,
@@ -136,3 +142,21 @@ def resolve_dispute(user_id, appointment_id):
     finally:
         db.close()
 
+
+@admin_bp.route('/cache/stats', methods=['GET'])
+@token_required
+def get_cache_stats(user_id):
+    """Contadores do cache de busca/perfil deste worker (apenas admin)"""
+    db = SessionLocal()
+    try:
+        # Verificar se é admin
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user or user.email != 'admin@consultavoce.com.br':
+            return jsonify({'error': 'Acesso negado'}), 403
+        
+        return jsonify({'cache': get_cache().stats()}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        db.close()
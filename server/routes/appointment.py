@@ -1,13 +1,35 @@
-from flask import Blueprint, request, jsonify
-from datetime import datetime
+from flask import Blueprint, Response, request, jsonify
+from datetime import datetime, timedelta
+import json
 import jwt
 import os
+import time
+from sqlalchemy import or_, and_
+from sqlalchemy.exc import IntegrityError
 from database import SessionLocal
 from models import Appointment, User, Payment
 from routes.auth import user_to_dict
+from slot_engine import has_conflict, slot_duration_of, day_bounds
+from pagination import encode_cursor, decode_cursor, parse_limit
+from events import (
+    get_event_hub, appointment_event, publish_event,
+    SSE_HEARTBEAT_SECONDS, SSE_MAX_SECONDS, SSE_RETRY_MS
+)
+from appointment_times import starts_at_of
+from slot_calendar import refresh_calendar_day, refresh_appointment_day
+from slot_holds import release_holds, refresh_days
+from settlement import DISPUTE_WINDOW_HOURS
 
 appointment_bp = Blueprint('appointment', __name__)
 
+SLOT_TAKEN_MESSAGE = 'Este horário já está ocupado. Por favor, escolha outro horário.'
+APPOINTMENT_FIELDS = ['professional_id', 'date', 'time', 'type', 'price']
+MAX_BATCH_APPOINTMENTS = 10
+APPOINTMENT_STATUSES = ('pending', 'confirmed', 'completed', 'cancelled', 'disputed')
+CHANGES_DEFAULT_LIMIT = 100
+CHANGES_MAX_LIMIT = 500
+CHANGES_SETTLE_SECONDS = int(os.environ.get('CHANGES_SETTLE_SECONDS', 2))
+
 def get_user_from_token(token):
     """Obter usuário a partir do token JWT"""
     try:
@@ -16,6 +38,75 @@ def get_user_from_token(token):
     except:
         return None
 
+def parse_appointment_data(data):
+    """Validar os campos de uma consulta: (data da consulta, erro)"""
+    if not isinstance(data, dict):
+        return None, 'Dados do agendamento inválidos'
+    for field in APPOINTMENT_FIELDS:
+        if field not in data:
+            return None, f'Campo {field} é obrigatório'
+    try:
+        appointment_date = starts_at_of(data['date'], data['time']).date()
+    except (ValueError, TypeError):
+        return None, 'Data ou horário inválido. Use YYYY-MM-DD e HH:MM'
+    try:
+        float(data['price'])
+    except (ValueError, TypeError):
+        return None, 'Preço inválido'
+    return appointment_date, None
+
+def add_appointment(db, patient_id, professional, data):
+    """Adicionar consulta e pagamento pendente à sessão, sem commit
+    
+    O flush devolve o id da consulta (RETURNING no PostgreSQL) e o
+    created_at já vem preenchido, sem db.refresh. Retorna None se o
+    índice único de horários recusou a consulta (outro worker agendou o
+    mesmo horário entre a verificação e o INSERT); o chamador faz rollback.
+    """
+    # Calcular taxas
+    price = float(data['price'])
+    platform_fee = price * 0.10  # 10% para a plataforma
+    professional_amount = price * 0.90  # 90% para o profissional
+    
+    appointment = Appointment(
+        patient_id=patient_id,
+        professional_id=professional.id,
+        date=data['date'],
+        time=data['time'],
+        type=data['type'],
+        starts_at=starts_at_of(data['date'], data['time']),
+        duration_minutes=slot_duration_of(professional),
+        price=price,
+        platform_fee=platform_fee,
+        professional_amount=professional_amount,
+        status='pending',
+        notes=data.get('notes', ''),
+        address=data.get('address', '')
+    )
+    db.add(appointment)
+    try:
+        db.flush()
+    except IntegrityError:
+        return None
+    
+    # Registro de pagamento na mesma transação
+    db.add(Payment(appointment_id=appointment.id, amount=price, status='pending'))
+    return appointment
+
+def appointment_summary(appointment, professional):
+    return {
+        'id': appointment.id,
+        'patient_id': appointment.patient_id,
+        'professional_id': appointment.professional_id,
+        'professional_name': professional.name,
+        'date': appointment.date,
+        'time': appointment.time,
+        'type': appointment.type,
+        'price': appointment.price,
+        'status': appointment.status,
+        'created_at': appointment.created_at.isoformat()
+    }
+
 @appointment_bp.route('/', methods=['POST'])
 def create_appointment():
     db = SessionLocal()
@@ -34,10 +125,9 @@ def create_appointment():
         data = request.get_json()
         
         # Validações básicas
-        required_fields = ['professional_id', 'date', 'time', 'type', 'price']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'Campo {field} é obrigatório'}), 400
+        appointment_date, error = parse_appointment_data(data)
+        if error:
+            return jsonify({'error': error}), 400
         
         # Verificar se profissional existe
         professional = db.query(User).filter(
@@ -48,64 +138,119 @@ def create_appointment():
         if not professional:
             return jsonify({'error': 'Profissional não encontrado'}), 404
         
-        # Verificar se horário já está ocupado
-        existing = db.query(Appointment).filter(
-            Appointment.professional_id == data['professional_id'],
-            Appointment.date == data['date'],
-            Appointment.time == data['time'],
-            Appointment.status.in_(['pending', 'confirmed', 'completed'])
-        ).first()
+        # Verificar se horário já está ocupado (sobreposição pela duração da
+        # consulta) ou reservado por outro paciente
+        if has_conflict(db, professional, appointment_date, data['time'], patient_id):
+            return jsonify({'error': SLOT_TAKEN_MESSAGE}), 409
         
-        if existing:
-            return jsonify({'error': 'Este horário já está ocupado. Por favor, escolha outro horário.'}), 400
-        
-        # Calcular taxas
-        price = float(data['price'])
-        platform_fee = price * 0.10  # 10% para a plataforma
-        professional_amount = price * 0.90  # 90% para o profissional
-        
-        # Criar agendamento
-        appointment = Appointment(
-            patient_id=patient_id,
-            professional_id=data['professional_id'],
-            date=data['date'],
-            time=data['time'],
-            type=data['type'],
-            price=price,
-            platform_fee=platform_fee,
-            professional_amount=professional_amount,
-            status='pending',
-            notes=data.get('notes', ''),
-            address=data.get('address', '')
-        )
-        
-        db.add(appointment)
-        db.commit()
-        db.refresh(appointment)
+        # Consulta e pagamento numa única transação
+        appointment = add_appointment(db, patient_id, professional, data)
+        if not appointment:
+            db.rollback()
+            return jsonify({'error': SLOT_TAKEN_MESSAGE}), 409
+        
+        # A reserva do paciente vira a consulta
+        released = release_holds(db, patient_id, professional.id)
+        refresh_days(db, released - {(professional.id, data['date'])})
+        refresh_calendar_day(db, professional, appointment_date)
         
-        # Criar registro de pagamento
-        payment = Payment(
-            appointment_id=appointment.id,
-            amount=price,
-            status='pending'
-        )
-        db.add(payment)
+        # Montar a resposta antes do commit (que expira os objetos)
+        result = appointment_summary(appointment, professional)
+        event = appointment_event('appointment.created', appointment)
         db.commit()
+        publish_event(event)
         
         return jsonify({
             'message': 'Agendamento criado com sucesso',
-            'appointment': {
-                'id': appointment.id,
-                'patient_id': appointment.patient_id,
-                'professional_id': appointment.professional_id,
-                'professional_name': professional.name,
-                'date': appointment.date,
-                'time': appointment.time,
-                'type': appointment.type,
-                'price': appointment.price,
-                'status': appointment.status,
-                'created_at': appointment.created_at.isoformat()
-            }
+            'appointment': result
+        }), 201
+        
+    except Exception as e:
+        db.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        db.close()
+
+@appointment_bp.route('/batch', methods=['POST'])
+def create_appointments_batch():
+    """
+    Agenda várias consultas do paciente de uma vez: ou todas são criadas
+    (com seus pagamentos, numa única transação) ou nenhuma.
+    
+    Body: {"appointments": [{professional_id, date, time, type, price, ...}]}
+    (até MAX_BATCH_APPOINTMENTS itens)
+    """
+    db = SessionLocal()
+    try:
+        # Obter token
+        auth_header = request.headers.get('Authorization')
+        if not auth_header:
+            return jsonify({'error': 'Token não fornecido'}), 401
+        
+        token = auth_header.split(' ')[1] if ' ' in auth_header else auth_header
+        patient_id = get_user_from_token(token)
+        
+        if not patient_id:
+            return jsonify({'error': 'Token inválido'}), 401
+        
+        items = (request.get_json() or {}).get('appointments')
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'Campo appointments deve ser uma lista não vazia'}), 400
+        if len(items) > MAX_BATCH_APPOINTMENTS:
+            return jsonify({'error': f'Máximo de {MAX_BATCH_APPOINTMENTS} agendamentos por vez'}), 400
+        
+        dates = []
+        for position, data in enumerate(items, start=1):
+            appointment_date, error = parse_appointment_data(data)
+            if error:
+                return jsonify({'error': f'Agendamento {position}: {error}'}), 400
+            dates.append(appointment_date)
+        
+        # Profissionais do lote numa query
+        professionals = {
+            professional.id: professional
+            for professional in db.query(User).filter(
+                User.id.in_({data['professional_id'] for data in items}),
+                User.user_type == 'professional'
+            ).all()
+        }
+        
+        created = []
+        days = set()
+        for position, (data, appointment_date) in enumerate(zip(items, dates), start=1):
+            professional = professionals.get(data['professional_id'])
+            if not professional:
+                db.rollback()
+                return jsonify({'error': f'Agendamento {position}: Profissional não encontrado'}), 404
+            
+            # O flush de add_appointment deixa os itens anteriores do lote
+            # visíveis para a verificação dos seguintes
+            if has_conflict(db, professional, appointment_date, data['time'], patient_id):
+                db.rollback()
+                return jsonify({'error': f'Agendamento {position}: {SLOT_TAKEN_MESSAGE}'}), 409
+            
+            appointment = add_appointment(db, patient_id, professional, data)
+            if not appointment:
+                db.rollback()
+                return jsonify({'error': f'Agendamento {position}: {SLOT_TAKEN_MESSAGE}'}), 409
+            created.append((appointment, professional))
+            days.add((professional.id, data['date']))
+        
+        # As reservas do paciente com esses profissionais viram consultas
+        for professional_id in professionals:
+            days |= release_holds(db, patient_id, professional_id)
+        refresh_days(db, days)
+        
+        results = [appointment_summary(appointment, professional) for appointment, professional in created]
+        events = [appointment_event('appointment.created', appointment) for appointment, _ in created]
+        db.commit()
+        for event in events:
+            publish_event(event)
+        
+        return jsonify({
+            'message': 'Agendamentos criados com sucesso',
+            'appointments': results,
+            'total': len(results)
         }), 201
         
     except Exception as e:
@@ -114,8 +259,63 @@ def create_appointment():
     finally:
         db.close()
 
+def counterpart_columns_of(user_type):
+    """Colunas do outro participante mostradas ao usuário"""
+    if user_type == 'patient':
+        return (User.id, User.name, User.profession, User.photo_url)
+    return (User.id, User.name, User.phone)
+
+def appointment_projection(db, user_type, user_id):
+    """SELECT das consultas do usuário com as colunas do outro participante
+    (JOIN em users), sem carregar objetos do ORM"""
+    if user_type == 'patient':
+        own_column, counterpart_column = Appointment.patient_id, Appointment.professional_id
+    else:
+        own_column, counterpart_column = Appointment.professional_id, Appointment.patient_id
+    return db.query(
+        Appointment.id.label('appointment_id'), Appointment.date, Appointment.time, Appointment.type,
+        Appointment.price, Appointment.status, Appointment.notes, Appointment.address,
+        Appointment.created_at, Appointment.updated_at, Appointment.starts_at,
+        *counterpart_columns_of(user_type)
+    ).join(User, User.id == counterpart_column).filter(own_column == user_id)
+
+def projected_to_dict(row, user_type):
+    """Linha de appointment_projection -> item da listagem"""
+    columns = counterpart_columns_of(user_type)
+    apt_dict = {
+        'id': row.appointment_id,
+        'date': row.date,
+        'time': row.time,
+        'type': row.type,
+        'price': row.price,
+        'status': row.status,
+        'notes': row.notes,
+        'address': row.address,
+        'created_at': row.created_at.isoformat() if row.created_at else None
+    }
+    # Adicionar informações do outro usuário
+    counterpart = dict(zip((column.key for column in columns), row[-len(columns):]))
+    apt_dict['professional' if user_type == 'patient' else 'patient'] = counterpart
+    return apt_dict
+
 @appointment_bp.route('/', methods=['GET'])
 def get_appointments():
+    """
+    Lista as consultas do usuário (como paciente ou profissional) em ordem
+    de início, paginadas por cursor
+    
+    Query params:
+    - status: Um ou mais status separados por vírgula (ex.: pending,confirmed)
+    - from, to: Período (YYYY-MM-DD, inclusivo)
+    - limit: Itens por página (padrão 20, máximo 100)
+    - cursor: next_cursor da página anterior
+    
+    Duas queries por página: o tipo do usuário e as consultas já com as
+    colunas do outro participante (JOIN), sem carregar objetos. Consultas
+    ainda sem starts_at (gravadas por workers antigos durante um deploy)
+    aparecem depois do backfill, feito na release e a cada rodada do
+    processo scheduler.
+    """
     db = SessionLocal()
     try:
         # Obter token
@@ -129,51 +329,61 @@ def get_appointments():
         if not user_id:
             return jsonify({'error': 'Token inválido'}), 401
         
-        # Buscar usuário para saber o tipo
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
+        # Buscar tipo do usuário
+        user_type = db.query(User.user_type).filter(User.id == user_id).scalar()
+        if not user_type:
             return jsonify({'error': 'Usuário não encontrado'}), 404
         
-        # Filtrar agendamentos
-        if user.user_type == 'patient':
-            appointments = db.query(Appointment).filter(Appointment.patient_id == user_id).all()
-        else:
-            appointments = db.query(Appointment).filter(Appointment.professional_id == user_id).all()
-        
-        results = []
-        for apt in appointments:
-            apt_dict = {
-                'id': apt.id,
-                'date': apt.date,
-                'time': apt.time,
-                'type': apt.type,
-                'price': apt.price,
-                'status': apt.status,
-                'notes': apt.notes,
-                'address': apt.address,
-                'created_at': apt.created_at.isoformat() if apt.created_at else None
-            }
-            
-            # Adicionar informações do outro usuário
-            if user.user_type == 'patient':
-                apt_dict['professional'] = {
-                    'id': apt.professional.id,
-                    'name': apt.professional.name,
-                    'profession': apt.professional.profession,
-                    'photo_url': apt.professional.photo_url
-                }
-            else:
-                apt_dict['patient'] = {
-                    'id': apt.patient.id,
-                    'name': apt.patient.name,
-                    'phone': apt.patient.phone
-                }
-            
-            results.append(apt_dict)
+        limit = parse_limit(request.args.get('limit'))
+        cursor = request.args.get('cursor')
+        
+        statuses = [value.strip() for value in request.args.get('status', '').split(',') if value.strip()]
+        invalid = [value for value in statuses if value not in APPOINTMENT_STATUSES]
+        if invalid:
+            return jsonify({'error': f'Status inválido: {", ".join(invalid)}'}), 400
+        
+        try:
+            first_day = datetime.strptime(request.args['from'], '%Y-%m-%d').date() if request.args.get('from') else None
+            last_day = datetime.strptime(request.args['to'], '%Y-%m-%d').date() if request.args.get('to') else None
+        except ValueError:
+            return jsonify({'error': 'Formato de data inválido. Use YYYY-MM-DD'}), 400
+        
+        query = appointment_projection(db, user_type, user_id).filter(Appointment.starts_at.isnot(None))
+        
+        if statuses:
+            query = query.filter(Appointment.status.in_(statuses))
+        if first_day:
+            query = query.filter(Appointment.starts_at >= day_bounds(first_day, first_day)[0])
+        if last_day:
+            query = query.filter(Appointment.starts_at < day_bounds(last_day, last_day)[1])
+        
+        # Paginação por cursor: ordenação estável (starts_at, id)
+        if cursor:
+            after = decode_cursor(cursor)
+            try:
+                last_start, last_id = datetime.fromisoformat(after[0]), int(after[1])
+            except (TypeError, ValueError, IndexError):
+                return jsonify({'error': 'Cursor inválido'}), 400
+            query = query.filter(or_(
+                Appointment.starts_at > last_start,
+                and_(Appointment.starts_at == last_start, Appointment.id > last_id)
+            ))
+        
+        # Buscar um item a mais para saber se existe próxima página
+        rows = query.order_by(Appointment.starts_at, Appointment.id).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        next_cursor = None
+        if has_more:
+            next_cursor = encode_cursor([rows[-1].starts_at.isoformat(), rows[-1].appointment_id])
+        
+        results = [projected_to_dict(row, user_type) for row in rows]
         
         return jsonify({
             'appointments': results,
-            'total': len(results)
+            'total': len(results),
+            'next_cursor': next_cursor
         }), 200
         
     except Exception as e:
@@ -181,6 +391,137 @@ def get_appointments():
     finally:
         db.close()
 
+@appointment_bp.route('/changes', methods=['GET'])
+def get_appointment_changes():
+    """
+    Sincronização incremental da agenda: consultas do usuário alteradas
+    depois do cursor, em ordem de alteração
+    
+    Query params:
+    - since: next_cursor da sincronização anterior (omitido = desde o início)
+    - limit: Itens por página (padrão 100, máximo 500)
+    
+    Consultas canceladas vêm só como id em deleted (tombstones). Uma
+    varredura de (participante, updated_at, id) por página; com has_more,
+    chamar de novo com o next_cursor até esgotar.
+    
+    Melhor esforço: updated_at é gravado no flush, não no commit, e só
+    alterações com mais de CHANGES_SETTLE_SECONDS entram na resposta. Uma
+    transação que fique aberta mais que isso entre a escrita e o commit
+    pode ficar para trás do cursor e não ser entregue; o cliente deve
+    ressincronizar por completo (sem since) periodicamente e quando o
+    cursor for recusado (400).
+    """
+    db = SessionLocal()
+    try:
+        # Obter token
+        auth_header = request.headers.get('Authorization')
+        if not auth_header:
+            return jsonify({'error': 'Token não fornecido'}), 401
+        
+        token = auth_header.split(' ')[1] if ' ' in auth_header else auth_header
+        user_id = get_user_from_token(token)
+        
+        if not user_id:
+            return jsonify({'error': 'Token inválido'}), 401
+        
+        user_type = db.query(User.user_type).filter(User.id == user_id).scalar()
+        if not user_type:
+            return jsonify({'error': 'Usuário não encontrado'}), 404
+        
+        limit = parse_limit(request.args.get('limit'), default=CHANGES_DEFAULT_LIMIT, maximum=CHANGES_MAX_LIMIT)
+        since = request.args.get('since')
+        
+        # Alterações muito recentes podem pertencer a transações ainda
+        # abertas em outros workers (com updated_at anterior a elas):
+        # ficam para a próxima sincronização
+        settled_at = datetime.utcnow() - timedelta(seconds=CHANGES_SETTLE_SECONDS)
+        query = appointment_projection(db, user_type, user_id).filter(Appointment.updated_at <= settled_at)
+        
+        if since:
+            after = decode_cursor(since)
+            try:
+                last_update, last_id = datetime.fromisoformat(after[0]), int(after[1])
+            except (TypeError, ValueError, IndexError):
+                return jsonify({'error': 'Cursor inválido'}), 400
+            query = query.filter(or_(
+                Appointment.updated_at > last_update,
+                and_(Appointment.updated_at == last_update, Appointment.id > last_id)
+            ))
+        
+        rows = query.order_by(Appointment.updated_at, Appointment.id).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        changes = [projected_to_dict(row, user_type) for row in rows if row.status != 'cancelled']
+        deleted = [row.appointment_id for row in rows if row.status == 'cancelled']
+        
+        # Sem alterações, o cursor continua o mesmo
+        next_cursor = since
+        if rows:
+            next_cursor = encode_cursor([rows[-1].updated_at.isoformat(), rows[-1].appointment_id])
+        
+        return jsonify({
+            'changes': changes,
+            'deleted': deleted,
+            'next_cursor': next_cursor,
+            'has_more': has_more
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        db.close()
+
+@appointment_bp.route('/events', methods=['GET'])
+def stream_appointment_events():
+    """
+    Stream SSE (text/event-stream) com as alterações das consultas do
+    usuário: appointment.created, .confirmed, .completed, .disputed,
+    .cancelled, .updated e dispute.resolved
+    
+    Autenticação pelo header Authorization ou por ?token= (o EventSource
+    do navegador não envia headers). Não usa o banco; a conexão é
+    encerrada após SSE_MAX_SECONDS e o cliente reconecta sozinho
+    (retry), chamando /changes para recuperar o que perdeu.
+    """
+    auth_header = request.headers.get('Authorization')
+    token = (auth_header.split(' ')[1] if ' ' in auth_header else auth_header) if auth_header else request.args.get('token')
+    if not token:
+        return jsonify({'error': 'Token não fornecido'}), 401
+    
+    user_id = get_user_from_token(token)
+    if not user_id:
+        return jsonify({'error': 'Token inválido'}), 401
+    
+    hub = get_event_hub()
+    subscription = hub.subscribe(user_id)
+    if not subscription:
+        return jsonify({'error': 'Muitas conexões abertas. Tente novamente em instantes.'}), 503
+    
+    def stream():
+        try:
+            yield f'retry: {SSE_RETRY_MS}\n\n'
+            deadline = time.monotonic() + SSE_MAX_SECONDS
+            while not subscription.closed and time.monotonic() < deadline:
+                event = subscription.get(timeout=SSE_HEARTBEAT_SECONDS)
+                if event is None:
+                    # Comentário SSE: mantém a conexão aberta em proxies e
+                    # detecta clientes que já desconectaram
+                    yield ': ping\n\n'
+                else:
+                    yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            hub.unsubscribe(subscription)
+    
+    response = Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # Cliente que desconecta antes do primeiro byte não chega a executar o finally
+    response.call_on_close(lambda: hub.unsubscribe(subscription))
+    return response
+
 @appointment_bp.route('/<int:appointment_id>', methods=['GET'])
 def get_appointment(appointment_id):
     db = SessionLocal()
@@ -228,6 +569,13 @@ def update_appointment(appointment_id):
         # Atualizar status
         if 'status' in data:
             appointment.status = data['status']
+            try:
+                db.flush()
+            except IntegrityError:
+                # Reativar uma consulta cujo horário já foi ocupado por outra
+                db.rollback()
+                return jsonify({'error': SLOT_TAKEN_MESSAGE}), 409
+            refresh_appointment_day(db, appointment)
             
             # Se confirmado, atualizar pagamento
             if data['status'] == 'confirmed':
@@ -235,8 +583,10 @@ def update_appointment(appointment_id):
                 if payment:
                     payment.status = 'paid'
         
+        event = appointment_event('appointment.updated', appointment)
         db.commit()
         db.refresh(appointment)
+        publish_event(event)
         
         return jsonify({
             'message': 'Agendamento atualizado com sucesso',
@@ -279,15 +629,18 @@ def cancel_appointment(appointment_id):
         if appointment.patient_id != user_id and appointment.professional_id != user_id:
             return jsonify({'error': 'Sem permissão para cancelar este agendamento'}), 403
         
-        # Atualizar status para cancelled
+        # Atualizar status para cancelled e liberar o horário
         appointment.status = 'cancelled'
+        refresh_appointment_day(db, appointment)
         
         # Atualizar pagamento se existir
         payment = db.query(Payment).filter(Payment.appointment_id == appointment_id).first()
         if payment:
             payment.status = 'refunded'
         
+        event = appointment_event('appointment.cancelled', appointment)
         db.commit()
+        publish_event(event)
         
         return jsonify({
             'message': 'Agendamento cancelado com sucesso',
@@ -334,7 +687,9 @@ def confirm_appointment(appointment_id):
         
         # Confirmar
         appointment.status = 'confirmed'
+        event = appointment_event('appointment.confirmed', appointment)
         db.commit()
+        publish_event(event)
         
         return jsonify({
             'message': 'Agendamento confirmado com sucesso',
@@ -385,10 +740,8 @@ def complete_appointment(appointment_id):
         brasilia_tz = pytz.timezone('America/Sao_Paulo')
         now_brasilia = datetime.now(brasilia_tz)
         
-        # Converter data e hora da consulta para datetime
-        apt_datetime_str = f"{appointment.date} {appointment.time}:00"
-        apt_datetime = datetime.strptime(apt_datetime_str, '%Y-%m-%d %H:%M:%S')
-        apt_datetime_brasilia = brasilia_tz.localize(apt_datetime)
+        # Início da consulta (horário de Brasília)
+        apt_datetime_brasilia = brasilia_tz.localize(appointment.starts_at or starts_at_of(appointment.date, appointment.time))
         
         if now_brasilia < apt_datetime_brasilia:
             return jsonify({
@@ -399,10 +752,12 @@ def complete_appointment(appointment_id):
         appointment.status = 'completed'
         appointment.completed_at = now_brasilia
         
+        event = appointment_event('appointment.completed', appointment)
         db.commit()
+        publish_event(event)
         
         return jsonify({
-            'message': 'Consulta marcada como realizada. Paciente tem 48h para contestar.',
+            'message': f'Consulta marcada como realizada. Paciente tem {DISPUTE_WINDOW_HOURS}h para contestar.',
             'appointment_id': appointment_id,
             'status': 'completed',
             'completed_at': now_brasilia.isoformat()
@@ -449,7 +804,7 @@ def dispute_appointment(appointment_id):
         if appointment.status != 'completed':
             return jsonify({'error': 'Apenas consultas realizadas podem ser contestadas'}), 400
         
-        # Verificar prazo de 48h
+        # Verificar prazo de contestação
         brasilia_tz = pytz.timezone('America/Sao_Paulo')
         now_brasilia = datetime.now(brasilia_tz)
         
@@ -459,17 +814,19 @@ def dispute_appointment(appointment_id):
         else:
             completed_at_aware = appointment.completed_at.astimezone(brasilia_tz)
         
-        deadline = completed_at_aware + timedelta(hours=48)
+        deadline = completed_at_aware + timedelta(hours=DISPUTE_WINDOW_HOURS)
         
         if now_brasilia > deadline:
-            return jsonify({'error': 'Prazo de 48h para contestação expirado'}), 400
+            return jsonify({'error': f'Prazo de {DISPUTE_WINDOW_HOURS}h para contestação expirado'}), 400
         
         # Registrar contestação
         appointment.disputed = True
         appointment.dispute_reason = data.get('reason', '')
         appointment.status = 'disputed'
         
+        event = appointment_event('appointment.disputed', appointment)
         db.commit()
+        publish_event(event)
         
         return jsonify({
             'message': 'Contestação registrada. Nossa equipe entrará em contato.',
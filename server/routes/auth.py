@@ -6,6 +6,10 @@ from datetime import datetime, timedelta
 from database import SessionLocal
 from models import User, Specialty
 from sqlalchemy.exc import IntegrityError
+from search import refresh_search_document, is_searchable
+from geo import update_user_location
+from cache import invalidate_professional
+from suggest import get_suggest_index
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -54,7 +58,8 @@ def user_to_dict(user):
             'registrationNumber': user.registration_number,
             'description': user.description,
             'photo_url': user.photo_url,
-            'slot_duration': user.slot_duration if hasattr(user, 'slot_duration') else 30
+            'slot_duration': user.slot_duration if hasattr(user, 'slot_duration') else 30,
+            'worksOnHolidays': bool(user.works_on_holidays)
         })
         
         # Adicionar especialidades
@@ -144,9 +149,22 @@ def register():
                         if specialty not in user.specialties:
                             user.specialties.append(specialty)
         
+        # Localizar pelo CEP e indexar profissional para a busca
+        if user.user_type == 'professional':
+            update_user_location(db, user)
+        refresh_search_document(db, user)
+        
         db.commit()
         db.refresh(user)
         
+        if user.user_type == 'professional':
+            invalidate_professional(user.id)
+            if is_searchable(user):
+                get_suggest_index().add_professional(
+                    user.profession, user.city, user.state,
+                    [s.name for s in user.specialties]
+                )
+        
         # Gerar token
         token = generate_token(user.id, user.email)
         
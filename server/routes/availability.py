@@ -1,8 +1,16 @@
 from flask import Blueprint, request, jsonify
+from datetime import date, datetime
 import jwt
 import os
+from sqlalchemy import func
 from database import SessionLocal
-from models import Availability, User
+from models import Availability, AvailabilityException, User
+from cache import invalidate_professional
+from slot_calendar import refresh_calendar, refresh_calendar_day
+from holidays import holidays_of_year
+from slot_engine import update_availability_bitmap, to_minutes, format_minutes
+from appointment_times import brasilia_today
+from bitmaps import encode_week, QUARTER_MINUTES
 
 availability_bp = Blueprint('availability', __name__)
 
@@ -14,6 +22,44 @@ def get_user_from_token(token):
     except:
         return None
 
+def bump_availability_version(db, professional_id, expected=None):
+    """Incrementar users.availability_version; None se expected não confere"""
+    current = func.coalesce(User.availability_version, 0)
+    query = db.query(User).filter(User.id == professional_id)
+    if expected is not None:
+        query = query.filter(current == expected)
+    if not query.update({User.availability_version: current + 1}, synchronize_session=False):
+        return None
+    return db.query(User.availability_version).filter(User.id == professional_id).scalar()
+
+def parse_weekly_schedule(items):
+    """Validar agenda semanal: ({dia: [(início, fim)]}, erro)"""
+    if not isinstance(items, list):
+        return None, 'Campo availability deve ser uma lista'
+    windows = {}
+    for item in items:
+        try:
+            day_of_week = int(item['day_of_week'])
+            start = to_minutes(item['start_time'])
+            end = to_minutes(item['end_time'])
+        except (KeyError, TypeError, ValueError, AttributeError):
+            return None, 'Cada janela precisa de day_of_week, start_time e end_time (HH:MM)'
+        if not 0 <= day_of_week <= 6:
+            return None, 'day_of_week deve estar entre 0 (domingo) e 6 (sábado)'
+        if start % QUARTER_MINUTES or end % QUARTER_MINUTES:
+            return None, 'Horários devem ser múltiplos de 15 minutos'
+        if not 0 <= start < end <= 24 * 60:
+            return None, 'Horário final deve ser posterior ao inicial'
+        windows.setdefault(day_of_week, []).append((start, end))
+    
+    # Janelas do mesmo dia não podem se sobrepor (encostar é permitido)
+    for day_of_week, day_windows in windows.items():
+        day_windows.sort()
+        for (_, previous_end), (start, _) in zip(day_windows, day_windows[1:]):
+            if start < previous_end:
+                return None, f'Janelas sobrepostas no dia {day_of_week}'
+    return windows, None
+
 @availability_bp.route('/<int:professional_id>', methods=['GET'])
 def get_availability(professional_id):
     """Buscar disponibilidade de um profissional"""
@@ -83,19 +129,42 @@ def create_availability():
             if field not in data:
                 return jsonify({'error': f'Campo {field} é obrigatório'}), 400
         
+        try:
+            day_of_week = int(data['day_of_week'])
+        except (TypeError, ValueError):
+            return jsonify({'error': 'day_of_week deve ser um número inteiro'}), 400
+        if not 0 <= day_of_week <= 6:
+            return jsonify({'error': 'day_of_week deve estar entre 0 (domingo) e 6 (sábado)'}), 400
+        
+        # Horários em quartos de hora (a agenda é guardada em bitmap)
+        try:
+            start_minutes = to_minutes(data['start_time'])
+            end_minutes = to_minutes(data['end_time'])
+        except (ValueError, AttributeError):
+            return jsonify({'error': 'Horário inválido. Use HH:MM'}), 400
+        if start_minutes % QUARTER_MINUTES or end_minutes % QUARTER_MINUTES:
+            return jsonify({'error': 'Horários devem ser múltiplos de 15 minutos'}), 400
+        if not 0 <= start_minutes < end_minutes <= 24 * 60:
+            return jsonify({'error': 'Horário final deve ser posterior ao inicial'}), 400
+        
         # Criar disponibilidade
         availability = Availability(
             professional_id=user_id,
-            day_of_week=data['day_of_week'],
+            day_of_week=day_of_week,
             start_time=data['start_time'],
             end_time=data['end_time'],
             is_active=data.get('is_active', True)
         )
         
         db.add(availability)
+        bump_availability_version(db, user_id)
+        update_availability_bitmap(db, user)
+        refresh_calendar(db, user)
         db.commit()
         db.refresh(availability)
         
+        invalidate_professional(user_id)
+        
         return jsonify({
             'message': 'Disponibilidade criada com sucesso',
             'availability': {
@@ -140,8 +209,14 @@ def delete_availability(availability_id):
             return jsonify({'error': 'Você não tem permissão para deletar esta disponibilidade'}), 403
         
         db.delete(availability)
+        bump_availability_version(db, user_id)
+        professional = db.get(User, user_id)
+        update_availability_bitmap(db, professional)
+        refresh_calendar(db, professional)
         db.commit()
         
+        invalidate_professional(user_id)
+        
         return jsonify({'message': 'Disponibilidade deletada com sucesso'}), 200
         
     except Exception as e:
@@ -182,9 +257,142 @@ def get_my_availability():
                 'is_active': avail.is_active
             })
         
+        version = db.query(User.availability_version).filter(User.id == user_id).scalar() or 0
+        
         return jsonify({
             'availability': results,
-            'total': len(results)
+            'total': len(results),
+            'version': version
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        db.close()
+
+@availability_bp.route('/my', methods=['PUT'])
+def replace_my_availability():
+    """Substituir a agenda semanal inteira do profissional logado
+    
+    Body: {"availability": [{"day_of_week", "start_time", "end_time"}],
+    "version": opcional}. Com version, a troca só acontece se a agenda não
+    mudou desde essa versão (409 caso contrário). Remove as janelas atuais
+    e insere as novas em lote, numa única transação.
+    """
+    db = SessionLocal()
+    try:
+        # Obter token
+        auth_header = request.headers.get('Authorization')
+        if not auth_header:
+            return jsonify({'error': 'Token não fornecido'}), 401
+        
+        token = auth_header.split(' ')[1] if ' ' in auth_header else auth_header
+        user_id = get_user_from_token(token)
+        
+        if not user_id:
+            return jsonify({'error': 'Token inválido'}), 401
+        
+        # Verificar se é profissional
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user or user.user_type != 'professional':
+            return jsonify({'error': 'Apenas profissionais podem configurar disponibilidade'}), 403
+        
+        data = request.get_json() or {}
+        windows, error = parse_weekly_schedule(data.get('availability'))
+        if error:
+            return jsonify({'error': error}), 400
+        
+        expected = data.get('version')
+        if expected is not None and (isinstance(expected, bool) or not isinstance(expected, int)):
+            return jsonify({'error': 'version deve ser um número inteiro'}), 400
+        
+        version = bump_availability_version(db, user_id, expected=expected)
+        if version is None:
+            db.rollback()
+            return jsonify({'error': 'A agenda foi alterada por outra requisição. Recarregue e tente novamente.'}), 409
+        
+        # Substituir janelas: um DELETE e um INSERT em lote
+        db.query(Availability).filter(
+            Availability.professional_id == user_id
+        ).delete(synchronize_session=False)
+        now = datetime.utcnow()
+        rows = [
+            {
+                'professional_id': user_id,
+                'day_of_week': day_of_week,
+                'start_time': format_minutes(start),
+                'end_time': format_minutes(end),
+                'is_active': True,
+                'created_at': now,
+                'updated_at': now
+            }
+            for day_of_week in sorted(windows)
+            for start, end in windows[day_of_week]
+        ]
+        if rows:
+            db.execute(Availability.__table__.insert(), rows)
+        
+        # Agenda em bitmap e calendário de horários recalculados uma vez
+        user.availability_bitmap = encode_week(windows)
+        refresh_calendar(db, user)
+        db.commit()
+        
+        invalidate_professional(user_id)
+        
+        return jsonify({
+            'message': 'Disponibilidade atualizada com sucesso',
+            'version': version,
+            'availability': [
+                {
+                    'day_of_week': row['day_of_week'],
+                    'start_time': row['start_time'],
+                    'end_time': row['end_time'],
+                    'is_active': True
+                }
+                for row in rows
+            ],
+            'total': len(rows)
+        }), 200
+        
+    except Exception as e:
+        db.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        db.close()
+
+def exception_to_dict(exception):
+    return {
+        'id': exception.id,
+        'date': exception.date,
+        'start_time': exception.start_time,
+        'end_time': exception.end_time,
+        'reason': exception.reason
+    }
+
+@availability_bp.route('/exceptions', methods=['GET'])
+def get_my_exceptions():
+    """Listar bloqueios de datas (de hoje em diante) do profissional logado"""
+    db = SessionLocal()
+    try:
+        # Obter token
+        auth_header = request.headers.get('Authorization')
+        if not auth_header:
+            return jsonify({'error': 'Token não fornecido'}), 401
+        
+        token = auth_header.split(' ')[1] if ' ' in auth_header else auth_header
+        user_id = get_user_from_token(token)
+        
+        if not user_id:
+            return jsonify({'error': 'Token inválido'}), 401
+        
+        exceptions = db.query(AvailabilityException).filter(
+            AvailabilityException.professional_id == user_id,
+            AvailabilityException.date >= brasilia_today().isoformat()
+        ).order_by(AvailabilityException.date, AvailabilityException.start_time).all()
+        
+        return jsonify({
+            'exceptions': [exception_to_dict(e) for e in exceptions],
+            'total': len(exceptions)
         }), 200
         
     except Exception as e:
@@ -192,3 +400,118 @@ def get_my_availability():
     finally:
         db.close()
 
+@availability_bp.route('/exceptions', methods=['POST'])
+def create_exception():
+    """Bloquear uma data (dia inteiro ou um intervalo), ex.: férias ou folga"""
+    db = SessionLocal()
+    try:
+        # Obter token
+        auth_header = request.headers.get('Authorization')
+        if not auth_header:
+            return jsonify({'error': 'Token não fornecido'}), 401
+        
+        token = auth_header.split(' ')[1] if ' ' in auth_header else auth_header
+        user_id = get_user_from_token(token)
+        
+        if not user_id:
+            return jsonify({'error': 'Token inválido'}), 401
+        
+        # Verificar se é profissional
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user or user.user_type != 'professional':
+            return jsonify({'error': 'Apenas profissionais podem configurar disponibilidade'}), 403
+        
+        data = request.get_json()
+        
+        if 'date' not in data:
+            return jsonify({'error': 'Campo date é obrigatório'}), 400
+        try:
+            exception_date = datetime.strptime(data['date'], '%Y-%m-%d').date()
+        except (ValueError, TypeError):
+            return jsonify({'error': 'Formato de data inválido. Use YYYY-MM-DD'}), 400
+        
+        # Intervalo opcional; sem horários bloqueia o dia inteiro
+        start_time = data.get('start_time')
+        end_time = data.get('end_time')
+        if bool(start_time) != bool(end_time):
+            return jsonify({'error': 'Informe start_time e end_time, ou nenhum para o dia inteiro'}), 400
+        if start_time:
+            try:
+                if not 0 <= to_minutes(start_time) < to_minutes(end_time) <= 24 * 60:
+                    return jsonify({'error': 'Horário final deve ser posterior ao inicial'}), 400
+            except (ValueError, AttributeError):
+                return jsonify({'error': 'Horário inválido. Use HH:MM'}), 400
+        
+        exception = AvailabilityException(
+            professional_id=user_id,
+            date=exception_date.isoformat(),
+            start_time=start_time or None,
+            end_time=end_time or None,
+            reason=data.get('reason', '')
+        )
+        db.add(exception)
+        refresh_calendar_day(db, user, exception_date)
+        db.commit()
+        db.refresh(exception)
+        
+        return jsonify({
+            'message': 'Bloqueio criado com sucesso',
+            'exception': exception_to_dict(exception)
+        }), 201
+        
+    except Exception as e:
+        db.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        db.close()
+
+@availability_bp.route('/exceptions/<int:exception_id>', methods=['DELETE'])
+def delete_exception(exception_id):
+    """Remover bloqueio de data (apenas o próprio profissional)"""
+    db = SessionLocal()
+    try:
+        # Obter token
+        auth_header = request.headers.get('Authorization')
+        if not auth_header:
+            return jsonify({'error': 'Token não fornecido'}), 401
+        
+        token = auth_header.split(' ')[1] if ' ' in auth_header else auth_header
+        user_id = get_user_from_token(token)
+        
+        if not user_id:
+            return jsonify({'error': 'Token inválido'}), 401
+        
+        exception = db.query(AvailabilityException).filter(AvailabilityException.id == exception_id).first()
+        
+        if not exception:
+            return jsonify({'error': 'Bloqueio não encontrado'}), 404
+        
+        if exception.professional_id != user_id:
+            return jsonify({'error': 'Você não tem permissão para remover este bloqueio'}), 403
+        
+        exception_date = date.fromisoformat(exception.date)
+        db.delete(exception)
+        refresh_calendar_day(db, db.get(User, user_id), exception_date)
+        db.commit()
+        
+        return jsonify({'message': 'Bloqueio removido com sucesso'}), 200
+        
+    except Exception as e:
+        db.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        db.close()
+
+@availability_bp.route('/holidays', methods=['GET'])
+def get_holidays():
+    """Feriados nacionais de um ano (padrão: ano atual)"""
+    try:
+        year = int(request.args.get('year') or brasilia_today().year)
+    except ValueError:
+        return jsonify({'error': 'Ano inválido'}), 400
+    if not 1900 <= year <= 2200:
+        return jsonify({'error': 'Ano inválido'}), 400
+    holidays = holidays_of_year(year)
+    return jsonify({
+        'holidays': [{'date': key, 'name': holidays[key]} for key in sorted(holidays)]
+    }), 200
@@ -1,66 +1,315 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
+import json
+import math
+from datetime import datetime, timedelta
 from database import SessionLocal
-from models import User, Specialty, Review
-from sqlalchemy import func
+from models import User, Review, ProfessionalSearchDocument
+from sqlalchemy import or_, and_
+from sqlalchemy.orm import joinedload
 from routes.auth import user_to_dict
+from ratings import rating_summary
+from pagination import encode_cursor, decode_cursor, parse_limit
+from search import (
+    tokenize, normalize_text, filtered_documents, price_column, distance_expression,
+    facet_counts, FACETS, MODALITIES
+)
+from geo import locate_cep, haversine_km
+from slot_engine import first_available_slots, DEFAULT_SLOT_DURATION, MAX_RANGE_DAYS
+from slot_calendar import is_materialized, first_available_from_calendar
+from appointment_times import brasilia_now
+from suggest import get_suggest_index, SUGGEST_TYPES, DEFAULT_SUGGEST_LIMIT, MAX_SUGGEST_LIMIT
+from cache import get_cache, cache_key, professional_tag, SEARCH_TAG
 
 professional_bp = Blueprint('professional', __name__)
 
+# Raio da busca por proximidade (km)
+DEFAULT_RADIUS_KM = 20
+MAX_RADIUS_KM = 200
+
+# Primeiro horário livre: período padrão (dias) e máximo de candidatos
+FIRST_AVAILABLE_DAYS = 14
+FIRST_AVAILABLE_MAX_CANDIDATES = 500
+
+def parse_search_filters(db):
+    """Filtros da busca a partir da query string: (filtros, erro)
+    
+    filtros tem os argumentos de filtered_documents (text_filters, state,
+    modality, min_price, max_price, near) e os textos originais
+    (specialty, city, profession) usados na chave do cache.
+    """
+    specialty = request.args.get('specialty', '')
+    city = request.args.get('city', '')
+    state = request.args.get('state', '')
+    profession = request.args.get('profession', '')
+    
+    # Filtros de preço e modalidade
+    modality = request.args.get('modality') or None
+    if modality and modality not in MODALITIES:
+        return None, f'Modalidade inválida. Use: {", ".join(MODALITIES)}'
+    try:
+        min_price = float(request.args['min_price']) if request.args.get('min_price') else None
+        max_price = float(request.args['max_price']) if request.args.get('max_price') else None
+    except ValueError:
+        return None, 'Preço inválido'
+    
+    # Busca por proximidade: cep ou lat/lng, com raio em km
+    near = None
+    if request.args.get('cep') or request.args.get('lat') or request.args.get('lng'):
+        try:
+            radius_km = float(request.args.get('radius_km') or DEFAULT_RADIUS_KM)
+            if request.args.get('cep'):
+                location = locate_cep(db, request.args['cep'])
+                if not location:
+                    return None, 'CEP não encontrado'
+                latitude, longitude = location
+            else:
+                latitude = float(request.args['lat'])
+                longitude = float(request.args['lng'])
+        except (KeyError, ValueError):
+            return None, 'Localização inválida. Informe cep ou lat e lng'
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180) or not (0 < radius_km <= MAX_RADIUS_KM):
+            return None, f'Localização inválida (raio máximo {MAX_RADIUS_KM:.0f} km)'
+        near = (latitude, longitude, radius_km)
+    
+    # Filtros textuais: servidos pelo índice invertido (sem acentos)
+    text_filters = {
+        field: value
+        for field, value in (('specialties', specialty), ('city', city), ('profession', profession))
+        if tokenize(value)
+    }
+    
+    return {
+        'specialty': specialty,
+        'city': city,
+        'profession': profession,
+        'text_filters': text_filters,
+        'state': state,
+        'modality': modality,
+        'min_price': min_price,
+        'max_price': max_price,
+        'near': near
+    }, None
+
+def search_arguments(filters):
+    """Argumentos de filtered_documents a partir de parse_search_filters"""
+    return {
+        name: filters[name]
+        for name in ('text_filters', 'state', 'modality', 'min_price', 'max_price', 'near')
+    }
+
 @professional_bp.route('/search', methods=['GET'])
 def search_professionals():
+    """Busca de profissionais paginada por cursor
+    
+    Retorna {professionals, next_cursor[, facets]}: no máximo limit
+    cartões e, se houver mais resultados, next_cursor para pedir a página
+    seguinte (cursor=...); null na última página. Não há total: contar o
+    conjunto filtrado custaria uma varredura completa a cada página (as
+    facetas trazem contagens por valor quando pedidas).
+    """
     db = SessionLocal()
     try:
         # Obter parâmetros de busca
-        specialty = request.args.get('specialty', '')
-        city = request.args.get('city', '')
-        state = request.args.get('state', '')
-        profession = request.args.get('profession', '')
+        filters, error = parse_search_filters(db)
+        if error:
+            return jsonify({'error': error}), 400
+        text_filters = filters['text_filters']
+        near = filters['near']
+        limit = parse_limit(request.args.get('limit'))
+        cursor = request.args.get('cursor')
         
-        # Query base - apenas profissionais (excluir admin)
-        query = db.query(User).filter(
-            User.user_type == 'professional',
-            User.email != 'admin@consultavoce.com.br'
+        # Facetas opcionais: facets=profession,state,city,specialty
+        facets = [f.strip() for f in request.args.get('facets', '').split(',') if f.strip()]
+        if any(f not in FACETS for f in facets):
+            return jsonify({'error': f'Faceta inválida. Use: {", ".join(FACETS)}'}), 400
+        
+        # Ordenação: distância (padrão com localização), relevância (padrão
+        # com filtros textuais), nota ou preço
+        sort = request.args.get('sort') or ('distance' if near else 'relevance' if text_filters else 'rating')
+        if sort not in ('relevance', 'rating', 'price', 'distance'):
+            return jsonify({'error': 'Ordenação inválida'}), 400
+        if sort == 'distance' and not near:
+            return jsonify({'error': 'Ordenação por distância requer cep ou lat e lng'}), 400
+        
+        # Cache por parâmetros normalizados
+        cache = get_cache()
+        key = cache_key(
+            'search',
+            specialty=normalize_text(filters['specialty']),
+            city=normalize_text(filters['city']),
+            state=filters['state'].upper(),
+            profession=normalize_text(filters['profession']),
+            modality=filters['modality'],
+            min_price=filters['min_price'],
+            max_price=filters['max_price'],
+            near=','.join(f'{v:.5f}' for v in near) if near else None,
+            sort=sort,
+            limit=limit,
+            cursor=cursor,
+            facets=','.join(sorted(set(facets)))
         )
+        body = cache.get(key)
+        if body is not None:
+            return Response(body, status=200, mimetype='application/json')
         
-        # Filtrar por especialidade
-        if specialty:
-            query = query.join(Specialty).filter(Specialty.name.ilike(f'%{specialty}%'))
-        
-        # Filtrar por cidade
-        if city:
-            query = query.filter(User.city.ilike(f'%{city}%'))
-        
-        # Filtrar por estado
-        if state:
-            query = query.filter(User.state == state.upper())
-        
-        # Filtrar por profissão
-        if profession:
-            query = query.filter(User.profession.ilike(f'%{profession}%'))
-        
-        professionals = query.all()
-        
-        # Adicionar média de avaliações
-        results = []
-        for prof in professionals:
-            prof_dict = user_to_dict(prof)
-            
-            # Calcular média de avaliações
-            avg_rating = db.query(func.avg(Review.rating)).filter(
-                Review.professional_id == prof.id
-            ).scalar()
-            
-            prof_dict['average_rating'] = float(avg_rating) if avg_rating else None
-            prof_dict['total_reviews'] = db.query(Review).filter(
-                Review.professional_id == prof.id
-            ).count()
-            
-            results.append(prof_dict)
+        # Consulta apenas a tabela estreita de documentos de busca; o índice
+        # só contém profissionais (sem a conta de administração)
+        doc = ProfessionalSearchDocument
+        query, rank = filtered_documents(
+            db, doc.professional_id, doc.card,
+            **search_arguments(filters)
+        )
+        if near:
+            query = query.add_columns(doc.latitude, doc.longitude)
         
-        return jsonify({
-            'professionals': results,
-            'total': len(results)
-        }), 200
+        # Facetas sobre o conjunto filtrado completo (antes do cursor)
+        facet_result = None
+        if facets:
+            filtered_ids = query.with_entities(doc.professional_id).subquery()
+            facet_result = facet_counts(db, filtered_ids, facets)
+        
+        # Chave de ordenação: preço e distância crescentes; relevância e
+        # nota decrescentes
+        if sort == 'price':
+            sort_key = price_column(filters['modality'])
+            query = query.filter(sort_key.isnot(None))
+        elif sort == 'distance':
+            sort_key = distance_expression(near[0], near[1])
+        else:
+            sort_key = rank if sort == 'relevance' else doc.rating_average
+        descending = sort in ('relevance', 'rating')
+        query = query.add_columns(sort_key.label('sort_value'))
+        
+        # Paginação por cursor: ordenação estável (chave, id asc)
+        if cursor:
+            after = decode_cursor(cursor)
+            if not after or len(after) != 2:
+                return jsonify({'error': 'Cursor inválido'}), 400
+            last_value, last_id = after
+            # Chave de ordenação numérica e finita; id inteiro
+            if (not isinstance(last_value, (int, float)) or isinstance(last_value, bool)
+                    or not math.isfinite(last_value)
+                    or not isinstance(last_id, int) or isinstance(last_id, bool)):
+                return jsonify({'error': 'Cursor inválido'}), 400
+            beyond = sort_key < last_value if descending else sort_key > last_value
+            query = query.filter(or_(
+                beyond,
+                and_(sort_key == last_value, doc.professional_id > last_id)
+            ))
+        
+        query = query.order_by(
+            sort_key.desc() if descending else sort_key.asc(),
+            doc.professional_id.asc()
+        )
+        
+        # Buscar um item a mais para saber se existe próxima página
+        rows = query.limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        next_cursor = None
+        if has_more:
+            last = rows[-1]
+            next_cursor = encode_cursor([last.sort_value, last.professional_id])
+        
+        # Cartões já estão serializados: montar a resposta sem passar pelo ORM
+        cards = [row.card for row in rows]
+        if near:
+            # Acrescentar a distância ao cartão pré-serializado
+            cards = [
+                '%s,"distance_km":%.1f}' % (
+                    row.card[:-1],
+                    haversine_km(near[0], near[1], row.latitude, row.longitude)
+                )
+                for row in rows
+            ]
+        body = '{"professionals":[%s],"next_cursor":%s}' % (','.join(cards), json.dumps(next_cursor))
+        if facet_result is not None:
+            body = body[:-1] + ',"facets":%s}' % json.dumps(facet_result, ensure_ascii=False)
+        cache.set(key, body, tags=(SEARCH_TAG,))
+        return Response(body, status=200, mimetype='application/json')
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        db.close()
+
+@professional_bp.route('/first-available', methods=['GET'])
+def first_available():
+    """Profissionais que atendem aos filtros da busca, pelo primeiro horário livre
+    
+    Aceita os filtros de /search e o período from/to (YYYY-MM-DD, padrão:
+    hoje e os próximos FIRST_AVAILABLE_DAYS dias). Os candidatos (até
+    FIRST_AVAILABLE_MAX_CANDIDATES, por relevância e nota) são resolvidos
+    em lote pelo calendário materializado e, fora do horizonte, pelo
+    slot_engine. Retorna {professionals}, no máximo limit, sem paginação.
+    """
+    db = SessionLocal()
+    try:
+        filters, error = parse_search_filters(db)
+        if error:
+            return jsonify({'error': error}), 400
+        limit = parse_limit(request.args.get('limit'))
+        
+        # Período de busca (agenda no horário de Brasília)
+        now = brasilia_now()
+        try:
+            first_day = datetime.strptime(request.args['from'], '%Y-%m-%d').date() if request.args.get('from') else now.date()
+            last_day = (
+                datetime.strptime(request.args['to'], '%Y-%m-%d').date() if request.args.get('to')
+                else first_day + timedelta(days=FIRST_AVAILABLE_DAYS - 1)
+            )
+        except ValueError:
+            return jsonify({'error': 'Formato de data inválido. Use YYYY-MM-DD'}), 400
+        if last_day < first_day:
+            return jsonify({'error': 'Data final deve ser posterior à inicial'}), 400
+        if (last_day - first_day).days + 1 > MAX_RANGE_DAYS:
+            return jsonify({'error': f'Período máximo de {MAX_RANGE_DAYS} dias'}), 400
+        first_day = max(first_day, now.date())
+        if last_day < first_day:
+            return jsonify({'professionals': []}), 200
+        
+        # Candidatos: documentos de busca filtrados + duração da consulta
+        doc = ProfessionalSearchDocument
+        query, rank = filtered_documents(
+            db, doc.professional_id, doc.card, User.slot_duration, User.slot_calendar_until,
+            **search_arguments(filters)
+        )
+        candidates = query.join(User, User.id == doc.professional_id).order_by(
+            rank.desc(), doc.rating_average.desc(), doc.professional_id.asc()
+        ).limit(FIRST_AVAILABLE_MAX_CANDIDATES).all()
+        
+        # Primeiro horário livre em lote: calendário materializado quando
+        # cobre o período, senão o slot_engine
+        materialized = [row for row in candidates if is_materialized(row, first_day, last_day)]
+        first = first_available_from_calendar(
+            db,
+            {row.professional_id: row.slot_duration or DEFAULT_SLOT_DURATION for row in materialized},
+            first_day, last_day, now
+        )
+        first.update(first_available_slots(
+            db,
+            {
+                row.professional_id: row.slot_duration or DEFAULT_SLOT_DURATION
+                for row in candidates if not is_materialized(row, first_day, last_day)
+            },
+            first_day, last_day, now=now
+        ))
+        rows = sorted(
+            (row for row in candidates if row.professional_id in first),
+            key=lambda row: (first[row.professional_id], row.professional_id)
+        )[:limit]
+        
+        # Acrescentar o horário ao cartão pré-serializado
+        cards = [
+            '%s,"first_available":%s}' % (
+                row.card[:-1],
+                json.dumps({'date': first[row.professional_id][0], 'time': first[row.professional_id][1]})
+            )
+            for row in rows
+        ]
+        body = '{"professionals":[%s]}' % ','.join(cards)
+        return Response(body, status=200, mimetype='application/json')
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -71,6 +320,12 @@ def search_professionals():
 def get_professional(professional_id):
     db = SessionLocal()
     try:
+        cache = get_cache()
+        key = cache_key('professional', id=professional_id)
+        cached = cache.get(key)
+        if cached is not None:
+            return jsonify({'professional': cached}), 200
+        
         # Buscar profissional (excluir admin)
         professional = db.query(User).filter(
             User.id == professional_id,
@@ -90,7 +345,9 @@ def get_professional(professional_id):
             prof_dict['specialties'] = []
         
         # Adicionar avaliações
-        reviews = db.query(Review).filter(Review.professional_id == professional_id).all()
+        reviews = db.query(Review).options(
+            joinedload(Review.patient)
+        ).filter(Review.professional_id == professional_id).all()
         prof_dict['reviews'] = [{
             'id': r.id,
             'rating': r.rating,
@@ -99,13 +356,10 @@ def get_professional(professional_id):
             'created_at': r.created_at.isoformat() if r.created_at else None
         } for r in reviews]
         
-        # Calcular média de avaliações
-        avg_rating = db.query(func.avg(Review.rating)).filter(
-            Review.professional_id == professional_id
-        ).scalar()
+        # Agregados de avaliações (colunas desnormalizadas)
+        prof_dict.update(rating_summary(professional))
         
-        prof_dict['average_rating'] = float(avg_rating) if avg_rating else None
-        prof_dict['total_reviews'] = len(reviews)
+        cache.set(key, prof_dict, tags=(professional_tag(professional_id),))
         
         return jsonify({'professional': prof_dict}), 200
         
@@ -114,17 +368,42 @@ def get_professional(professional_id):
     finally:
         db.close()
 
+def current_suggest_index():
+    """Índice de autocomplete; se expirado, a reconstrução roda em segundo plano"""
+    index = get_suggest_index()
+    index.rebuild_if_stale(SessionLocal)
+    return index
+
 @professional_bp.route('/specialties', methods=['GET'])
 def get_specialties():
     """Listar todas as especialidades disponíveis"""
-    db = SessionLocal()
     try:
-        specialties = db.query(Specialty.name).distinct().all()
         return jsonify({
-            'specialties': [s[0] for s in specialties]
+            'specialties': current_suggest_index().names('specialty')
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@professional_bp.route('/suggest', methods=['GET'])
+def suggest():
+    """Autocomplete de especialidades, profissões e cidades"""
+    try:
+        q = request.args.get('q', '')
+        try:
+            limit = min(int(request.args.get('limit') or DEFAULT_SUGGEST_LIMIT), MAX_SUGGEST_LIMIT)
+        except ValueError:
+            return jsonify({'error': 'Limite inválido'}), 400
+        if limit < 1:
+            return jsonify({'error': 'Limite inválido'}), 400
+        
+        # Tipos opcionais: types=specialty,profession,city
+        types = [t.strip() for t in request.args.get('types', '').split(',') if t.strip()] or SUGGEST_TYPES
+        if any(t not in SUGGEST_TYPES for t in types):
+            return jsonify({'error': f'Tipo inválido. Use: {", ".join(SUGGEST_TYPES)}'}), 400
+        
+        return jsonify({
+            'suggestions': current_suggest_index().suggest(q, limit=limit, types=tuple(types))
         }), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        db.close()
 
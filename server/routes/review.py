@@ -4,6 +4,10 @@ import os
 from database import SessionLocal
 from models import Review, Appointment, User, Favorite
 from routes.auth import user_to_dict
+from ratings import register_review, rating_summary, RATING_VALUES
+from search import refresh_search_document
+from cache import invalidate_professional
+from sqlalchemy.orm import joinedload
 
 review_bp = Blueprint('review', __name__)
 
@@ -34,8 +38,9 @@ def create_review(appointment_id):
         data = request.get_json()
         
         # Validações
-        if 'rating' not in data or not (1 <= data['rating'] <= 5):
-            return jsonify({'error': 'Nota deve ser entre 1 e 5'}), 400
+        rating = data.get('rating')
+        if not isinstance(rating, int) or isinstance(rating, bool) or rating not in RATING_VALUES:
+            return jsonify({'error': 'Nota deve ser um número inteiro entre 1 e 5'}), 400
         
         # Verificar se consulta existe e pertence ao paciente
         appointment = db.query(Appointment).filter(
@@ -60,14 +65,22 @@ def create_review(appointment_id):
             appointment_id=appointment_id,
             patient_id=patient_id,
             professional_id=appointment.professional_id,
-            rating=data['rating'],
+            rating=rating,
             comment=data.get('comment', '')
         )
         
         db.add(review)
+        
+        # Atualizar agregados e documento de busca do profissional na mesma transação
+        register_review(db, appointment.professional_id, review.rating)
+        professional = db.get(User, appointment.professional_id, populate_existing=True)
+        refresh_search_document(db, professional)
+        
         db.commit()
         db.refresh(review)
         
+        invalidate_professional(appointment.professional_id)
+        
         return jsonify({
             'message': 'Avaliação criada com sucesso',
             'review': {
@@ -89,7 +102,9 @@ def get_professional_reviews(professional_id):
     """Listar todas as avaliações de um profissional"""
     db = SessionLocal()
     try:
-        reviews = db.query(Review).filter(
+        reviews = db.query(Review).options(
+            joinedload(Review.patient)
+        ).filter(
             Review.professional_id == professional_id
         ).order_by(Review.created_at.desc()).all()
         
@@ -103,13 +118,15 @@ def get_professional_reviews(professional_id):
                 'created_at': review.created_at.isoformat() if review.created_at else None
             })
         
-        # Calcular média
-        avg_rating = sum(r.rating for r in reviews) / len(reviews) if reviews else 0
+        # Média vem dos agregados desnormalizados do profissional
+        professional = db.query(User).filter(User.id == professional_id).first()
+        summary = rating_summary(professional) if professional else {}
         
         return jsonify({
             'reviews': results,
             'total': len(results),
-            'average_rating': round(avg_rating, 1)
+            'average_rating': round(summary.get('average_rating') or 0, 1),
+            'rating_histogram': summary.get('rating_histogram', {})
         }), 200
         
     except Exception as e:
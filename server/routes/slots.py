@@ -1,94 +1,176 @@
 from flask import Blueprint, jsonify, request
-from datetime import datetime, timedelta
-from server.models import User, Availability, Appointment
-from server.database import SessionLocal
+from datetime import datetime
+import jwt
+import os
+from models import User, SlotHold
+from database import SessionLocal
+from slot_engine import available_slots_range, to_minutes, MAX_RANGE_DAYS
+from slot_calendar import is_materialized, read_calendar, refresh_calendar_day
+from slot_holds import place_hold, hold_to_dict
+from appointment_times import brasilia_today
 
 slots_bp = Blueprint('slots', __name__)
 
+def get_user_from_token(token):
+    """Obter usuário a partir do token JWT"""
+    try:
+        payload = jwt.decode(token, os.environ.get('SECRET_KEY', 'dev-secret-key'), algorithms=['HS256'])
+        return payload['user_id']
+    except:
+        return None
+
 @slots_bp.route('/<int:professional_id>/available-slots', methods=['GET'])
 def get_available_slots(professional_id):
     """
-    Retorna slots de horário disponíveis para um profissional em uma data específica
+    Retorna slots de horário disponíveis para um profissional em uma data
+    específica ou em um período
     
     Query params:
     - date: Data no formato YYYY-MM-DD
+    - from, to: Período (YYYY-MM-DD, inclusivo), no lugar de date; retorna
+      um mapa data -> slots. Dias passados são omitidos.
     - appointment_type: Tipo de atendimento (Online, Presencial, Domiciliar)
     """
+    db = SessionLocal()
     try:
         # Obter parâmetros
         date_str = request.args.get('date')
+        from_str = request.args.get('from')
+        to_str = request.args.get('to')
         appointment_type = request.args.get('appointment_type', 'Online')
         
-        if not date_str:
-            return jsonify({'error': 'Data é obrigatória'}), 400
+        if not date_str and not (from_str and to_str):
+            return jsonify({'error': 'Data é obrigatória (date ou from e to)'}), 400
         
-        # Converter data
+        # Converter datas
         try:
-            selected_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+            if date_str:
+                first_day = last_day = datetime.strptime(date_str, '%Y-%m-%d').date()
+            else:
+                first_day = datetime.strptime(from_str, '%Y-%m-%d').date()
+                last_day = datetime.strptime(to_str, '%Y-%m-%d').date()
         except ValueError:
             return jsonify({'error': 'Formato de data inválido. Use YYYY-MM-DD'}), 400
         
-        # Verificar se a data é futura
-        if selected_date < datetime.now().date():
-            return jsonify({'error': 'Data deve ser futura'}), 400
+        today = brasilia_today()
+        if date_str:
+            # Verificar se a data é futura
+            if first_day < today:
+                return jsonify({'error': 'Data deve ser futura'}), 400
+        else:
+            if last_day < first_day:
+                return jsonify({'error': 'Data final deve ser posterior à inicial'}), 400
+            if (last_day - first_day).days + 1 > MAX_RANGE_DAYS:
+                return jsonify({'error': f'Período máximo de {MAX_RANGE_DAYS} dias'}), 400
+            first_day = max(first_day, today)
         
         # Buscar profissional
-        db = SessionLocal()
-        professional = db.query(User).get(professional_id)
-        if not professional:
+        professional = db.get(User, professional_id)
+        if not professional or professional.user_type != 'professional':
             return jsonify({'error': 'Profissional não encontrado'}), 404
         
-        # Obter dia da semana (0=domingo, 6=sábado)
-        day_of_week = (selected_date.weekday() + 1) % 7  # Converter para formato do banco
-        
-        # Buscar disponibilidade do profissional para esse dia
-        availabilities = db.query(Availability).filter_by(
-            professional_id=professional_id,
-            day_of_week=day_of_week,
-            is_active=True
-        ).all()
-        
-        if not availabilities:
-            return jsonify({'slots': []}), 200
-        
-        # Gerar slots de horário
-        slot_duration = professional.slot_duration or 30  # Duração padrão: 30 minutos
-        all_slots = []
-        
-        for availability in availabilities:
-            # Converter horários para datetime
-            start_time = datetime.strptime(availability.start_time, '%H:%M').time()
-            end_time = datetime.strptime(availability.end_time, '%H:%M').time()
-            
-            # Criar datetime completo para facilitar cálculos
-            current_slot = datetime.combine(selected_date, start_time)
-            end_datetime = datetime.combine(selected_date, end_time)
-            
-            # Gerar slots
-            while current_slot + timedelta(minutes=slot_duration) <= end_datetime:
-                slot_time = current_slot.strftime('%H:%M')
-                
-                # Verificar se o slot já está ocupado
-                is_booked = db.query(Appointment).filter_by(
-                    professional_id=professional_id,
-                    appointment_date=selected_date,
-                    appointment_time=slot_time,
-                    status='scheduled'
-                ).first() is not None
-                
-                if not is_booked:
-                    all_slots.append(slot_time)
-                
-                current_slot += timedelta(minutes=slot_duration)
-        
-        # Ordenar slots
-        all_slots.sort()
+        if first_day > last_day:
+            return jsonify({'days': {}}), 200
         
-        db.close()
-        return jsonify({"slots": all_slots}), 200
+        # Calendário materializado (uma varredura de índice); fora do
+        # horizonte, disponibilidade menos consultas ativas (duas queries)
+        if is_materialized(professional, first_day, last_day):
+            days = read_calendar(db, professional, first_day, last_day)
+        else:
+            days = available_slots_range(db, professional, first_day, last_day)
+        
+        if date_str:
+            return jsonify({'slots': days[first_day.isoformat()]}), 200
+        return jsonify({'days': days}), 200
         
     except Exception as e:
-        if 'db' in locals():
-            db.close()
         print(f"Erro ao gerar slots: {str(e)}")
         return jsonify({'error': 'Erro interno do servidor'}), 500
+    finally:
+        db.close()
+
+
+@slots_bp.route('/holds', methods=['POST'])
+def create_hold():
+    """
+    Reserva um horário por SLOT_HOLD_MINUTES minutos enquanto o paciente
+    finaliza o agendamento. Substitui a reserva anterior do paciente.
+    
+    Body: professional_id, date (YYYY-MM-DD), time (HH:MM)
+    """
+    db = SessionLocal()
+    try:
+        auth_header = request.headers.get('Authorization')
+        if not auth_header:
+            return jsonify({'error': 'Token não fornecido'}), 401
+        
+        token = auth_header.split(' ')[1] if ' ' in auth_header else auth_header
+        patient_id = get_user_from_token(token)
+        
+        if not patient_id:
+            return jsonify({'error': 'Token inválido'}), 401
+        
+        data = request.get_json() or {}
+        for field in ('professional_id', 'date', 'time'):
+            if field not in data:
+                return jsonify({'error': f'Campo {field} é obrigatório'}), 400
+        
+        try:
+            day = datetime.strptime(data['date'], '%Y-%m-%d').date()
+            to_minutes(data['time'])
+        except (ValueError, AttributeError):
+            return jsonify({'error': 'Data ou horário inválido. Use YYYY-MM-DD e HH:MM'}), 400
+        
+        if day < brasilia_today():
+            return jsonify({'error': 'Data deve ser futura'}), 400
+        
+        professional = db.get(User, data['professional_id'])
+        if not professional or professional.user_type != 'professional':
+            return jsonify({'error': 'Profissional não encontrado'}), 404
+        
+        hold = place_hold(db, professional, patient_id, day, data['time'])
+        if not hold:
+            db.rollback()
+            return jsonify({'error': 'Este horário não está mais disponível. Por favor, escolha outro horário.'}), 409
+        db.commit()
+        
+        return jsonify({'hold': hold_to_dict(hold)}), 201
+        
+    except Exception as e:
+        db.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        db.close()
+
+@slots_bp.route('/holds/<int:hold_id>', methods=['DELETE'])
+def release_hold(hold_id):
+    """Libera a reserva antes de expirar (paciente desistiu do checkout)"""
+    db = SessionLocal()
+    try:
+        auth_header = request.headers.get('Authorization')
+        if not auth_header:
+            return jsonify({'error': 'Token não fornecido'}), 401
+        
+        token = auth_header.split(' ')[1] if ' ' in auth_header else auth_header
+        patient_id = get_user_from_token(token)
+        
+        if not patient_id:
+            return jsonify({'error': 'Token inválido'}), 401
+        
+        hold = db.get(SlotHold, hold_id)
+        if not hold or hold.patient_id != patient_id:
+            return jsonify({'error': 'Reserva não encontrada'}), 404
+        
+        professional = db.get(User, hold.professional_id)
+        day = datetime.strptime(hold.date, '%Y-%m-%d').date()
+        db.delete(hold)
+        refresh_calendar_day(db, professional, day)
+        db.commit()
+        
+        return jsonify({'message': 'Reserva liberada', 'hold_id': hold_id}), 200
+        
+    except Exception as e:
+        db.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        db.close()
@@ -2,14 +2,40 @@ from flask import Blueprint, request, jsonify
 import jwt
 import os
 import base64
+import math
 import uuid
 from pathlib import Path
 from database import SessionLocal
 from models import User
 from routes.auth import user_to_dict
+from search import refresh_search_document
+from geo import update_user_location
+from cache import invalidate_professional
+from slot_calendar import refresh_calendar
 
 user_bp = Blueprint('user', __name__)
 
+# Campo do JSON -> atributo de preço do profissional
+PRICE_FIELDS = {
+    'onlinePrice': 'online_price',
+    'inPersonPrice': 'in_person_price',
+    'homePrice': 'home_price'
+}
+
+def parse_price(value):
+    """Converter preço do JSON (número ou texto) em float; None se vazio
+    
+    ValueError se não for um número finito e não negativo.
+    """
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    if isinstance(value, bool):
+        raise ValueError(value)
+    price = float(value)
+    if not math.isfinite(price) or price < 0:
+        raise ValueError(value)
+    return price
+
 def get_user_from_token(token):
     """Obter usuário a partir do token JWT"""
     try:
@@ -87,6 +113,10 @@ def update_profile():
             user.neighborhood = addr.get('neighborhood')
             user.city = addr.get('city')
             user.state = addr.get('state')
+            
+            # Localização aproximada para a busca por proximidade
+            if user.user_type == 'professional':
+                update_user_location(db, user)
         
         # Atualizar campos de profissional
         if user.user_type == 'professional':
@@ -114,12 +144,12 @@ def update_profile():
                 user.bank_account = data['bankAccount']
             
             # Atualizar preços de consultas
-            if 'onlinePrice' in data:
-                user.online_price = data['onlinePrice']
-            if 'inPersonPrice' in data:
-                user.in_person_price = data['inPersonPrice']
-            if 'homePrice' in data:
-                user.home_price = data['homePrice']
+            for field, attribute in PRICE_FIELDS.items():
+                if field in data:
+                    try:
+                        setattr(user, attribute, parse_price(data[field]))
+                    except (TypeError, ValueError):
+                        return jsonify({'error': f'Preço inválido: {field}'}), 400
             if 'onlineEnabled' in data:
                 user.online_enabled = data['onlineEnabled']
             if 'inPersonEnabled' in data:
@@ -127,15 +157,27 @@ def update_profile():
             if 'homeEnabled' in data:
                 user.home_enabled = data['homeEnabled']
             
+            # Atendimento em feriados nacionais
+            if 'worksOnHolidays' in data and bool(data['worksOnHolidays']) != bool(user.works_on_holidays):
+                user.works_on_holidays = bool(data['worksOnHolidays'])
+                refresh_calendar(db, user)
+            
             # Atualizar duração dos slots de agendamento
             if 'slot_duration' in data:
                 slot_duration = int(data['slot_duration'])
-                if slot_duration in [15, 30, 45, 60]:
+                if slot_duration in [15, 30, 45, 60] and slot_duration != user.slot_duration:
                     user.slot_duration = slot_duration
+                    refresh_calendar(db, user)
+            
+            # Reindexar profissional para a busca textual
+            refresh_search_document(db, user)
         
         db.commit()
         db.refresh(user)
         
+        if user.user_type == 'professional':
+            invalidate_professional(user.id)
+        
         return jsonify({
             'message': 'Perfil atualizado com sucesso',
             'user': user_to_dict(user)
@@ -212,9 +254,15 @@ def upload_profile_photo():
         photo_url = f"/uploads/profile_photos/{filename}"
         user.photo_url = photo_url
         
+        # Foto aparece no cartão da busca
+        refresh_search_document(db, user)
+        
         db.commit()
         db.refresh(user)
         
+        if user.user_type == 'professional':
+            invalidate_professional(user.id)
+        
         return jsonify({
             'message': 'Foto atualizada com sucesso',
             'photo_url': photo_url,
@@ -0,0 +1,384 @@
+"""
+Busca textual de profissionais
+
+Cada profissional tem uma linha em professional_search_documents com os
+campos públicos usados em filtros/ordenação e um cartão JSON
+pré-serializado, devolvido tal qual pela busca. Os campos pesquisáveis
+(cidade, profissão e especialidades) são normalizados (minúsculas, sem
+acentos) e consultados por um índice invertido: tsvector/GIN no
+PostgreSQL e FTS5 no SQLite. Outros bancos caem em LIKE sobre as colunas
+normalizadas.
+"""
+import json
+import math
+import re
+import unicodedata
+from sqlalchemy import text, func, cast, select, table, column, literal, literal_column, union_all, or_, and_, Float, String
+from sqlalchemy.dialects.postgresql import to_tsvector, to_tsquery
+from models import ProfessionalSearchDocument, Specialty, user_specialties
+from ratings import rating_summary
+from geo import cells_for_radius, geohash_prefix_upper_bound, KM_PER_DEGREE
+
+SEARCH_FIELDS = ('city', 'profession', 'specialties')
+
+# Modalidade -> (coluna de habilitação, coluna de preço)
+MODALITIES = {
+    'online': ('online_enabled', 'online_price'),
+    'in_person': ('in_person_enabled', 'in_person_price'),
+    'home': ('home_enabled', 'home_price')
+}
+
+def normalize_text(value):
+    """Normalizar texto para busca: minúsculas, sem acentos e pontuação"""
+    if not value:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', value)
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(re.findall(r'[a-z0-9]+', stripped.lower()))
+
+def tokenize(value):
+    """Quebrar texto normalizado em tokens"""
+    return normalize_text(value).split()
+
+
+class SearchBackend:
+    """Backend genérico: LIKE sobre as colunas normalizadas"""
+    
+    def prepare(self, db):
+        """Garantir estruturas auxiliares do backend"""
+    
+    def index(self, db, document):
+        """Atualizar índice do backend para um documento"""
+    
+    def remove(self, db, professional_id):
+        """Remover documento do índice do backend"""
+    
+    def matches(self, db, filters):
+        """Subquery (professional_id, rank) dos documentos que atendem aos filtros
+        
+        filters: dicionário campo -> texto digitado pelo usuário. Todos os
+        tokens de todos os campos precisam casar (prefixo de palavra, como
+        nos backends com índice). As colunas normalizadas são palavras
+        [a-z0-9] separadas por espaço: o token casa no início da coluna ou
+        depois de um espaço. Sem índice invertido, é uma varredura dos
+        documentos.
+        """
+        conditions = []
+        for field, value in filters.items():
+            column = getattr(ProfessionalSearchDocument, field)
+            for token in tokenize(value):
+                conditions.append(or_(column.like(f'{token}%'), column.like(f'% {token}%')))
+        
+        return select(
+            ProfessionalSearchDocument.professional_id.label('professional_id'),
+            literal(0.0, Float).label('rank')
+        ).where(*conditions).subquery()
+
+
+class PostgresSearchBackend(SearchBackend):
+    """PostgreSQL: to_tsvector('simple', campo) com índices GIN por campo"""
+    
+    def matches(self, db, filters):
+        conditions = []
+        ranks = []
+        for field, value in filters.items():
+            tokens = tokenize(value)
+            if not tokens:
+                continue
+            # Mesma expressão dos índices GIN definidos em models.py
+            vector = to_tsvector(literal_column("'simple'"), getattr(ProfessionalSearchDocument, field))
+            query = to_tsquery(literal_column("'simple'"), ' & '.join(f'{t}:*' for t in tokens))
+            conditions.append(vector.op('@@')(query))
+            ranks.append(func.ts_rank(vector, query))
+        
+        rank = cast(sum(ranks[1:], ranks[0]), Float) if ranks else literal(0.0, Float)
+        return select(
+            ProfessionalSearchDocument.professional_id.label('professional_id'),
+            rank.label('rank')
+        ).where(*conditions).subquery()
+
+
+class SqliteSearchBackend(SearchBackend):
+    """SQLite: tabela virtual FTS5 com rowid = professional_id"""
+    
+    fts_table = 'professional_search_fts'
+    
+    def __init__(self):
+        self._prepared = False
+    
+    def prepare(self, db):
+        if self._prepared:
+            return
+        db.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.fts_table} "
+            f"USING fts5({', '.join(SEARCH_FIELDS)}, tokenize='unicode61 remove_diacritics 2')"
+        ))
+        self._prepared = True
+    
+    def index(self, db, document):
+        self.prepare(db)
+        self.remove(db, document.professional_id)
+        db.execute(text(
+            f"INSERT INTO {self.fts_table} (rowid, city, profession, specialties) "
+            "VALUES (:id, :city, :profession, :specialties)"
+        ), {
+            'id': document.professional_id,
+            'city': document.city or '',
+            'profession': document.profession or '',
+            'specialties': document.specialties or ''
+        })
+    
+    def remove(self, db, professional_id):
+        self.prepare(db)
+        db.execute(text(f"DELETE FROM {self.fts_table} WHERE rowid = :id"), {'id': professional_id})
+    
+    def matches(self, db, filters):
+        self.prepare(db)
+        expressions = []
+        for field, value in filters.items():
+            tokens = tokenize(value)
+            if tokens:
+                terms = ' AND '.join(f'"{t}"*' for t in tokens)
+                expressions.append(f'{field} : ({terms})')
+        if not expressions:
+            return super().matches(db, {})
+        
+        fts = table(self.fts_table, column('rowid'))
+        # bm25 é menor quanto mais relevante; inverter para ordenar desc
+        return select(
+            fts.c.rowid.label('professional_id'),
+            (-func.bm25(literal_column(self.fts_table))).label('rank')
+        ).where(
+            literal_column(self.fts_table).op('MATCH')(' AND '.join(expressions))
+        ).subquery()
+
+
+def price_column(modality=None):
+    """Coluna de preço usada em filtros e ordenação: da modalidade ou a menor"""
+    if modality:
+        return getattr(ProfessionalSearchDocument, MODALITIES[modality][1])
+    return ProfessionalSearchDocument.min_price
+
+def distance_expression(latitude, longitude):
+    """Quadrado da distância aproximada (em graus de latitude) até um ponto
+    
+    Projeção equiretangular: só usa aritmética, então funciona em qualquer
+    banco e preserva a ordem por distância nas escalas da busca.
+    """
+    doc = ProfessionalSearchDocument
+    cos_lat = math.cos(math.radians(latitude))
+    dlat = doc.latitude - latitude
+    dlng = (doc.longitude - longitude) * cos_lat
+    return dlat * dlat + dlng * dlng
+
+def filtered_documents(db, *columns, text_filters=None, state=None, modality=None,
+                       min_price=None, max_price=None, near=None):
+    """Query sobre professional_search_documents com os filtros da busca
+    
+    Retorna (query, rank): rank é a relevância textual (0 sem filtros
+    textuais). Os filtros de preço/modalidade são servidos pelos índices
+    (state, preço) parciais por modalidade definidos em models.py.
+    near: (latitude, longitude, raio_km) restringe às células de geohash
+    que cobrem o círculo e depois ao raio exato.
+    """
+    doc = ProfessionalSearchDocument
+    if text_filters:
+        matches = get_search_backend(db).matches(db, text_filters)
+        rank = matches.c.rank
+        query = db.query(*columns).join(matches, matches.c.professional_id == doc.professional_id)
+    else:
+        rank = literal(0.0, Float)
+        query = db.query(*columns)
+    
+    if state:
+        query = query.filter(doc.state == state.upper())
+    
+    if modality:
+        query = query.filter(getattr(doc, MODALITIES[modality][0]) == True)
+    
+    price = price_column(modality)
+    if min_price is not None:
+        query = query.filter(price >= min_price)
+    if max_price is not None:
+        query = query.filter(price <= max_price)
+    
+    if near:
+        latitude, longitude, radius_km = near
+        # Faixas no índice de geohash: prefixo <= geohash < prefixo seguinte,
+        # comparando por bytes (collation "C" da coluna no PostgreSQL)
+        geohash = doc.geohash.collate('C') if db.get_bind().dialect.name == 'postgresql' else doc.geohash
+        query = query.filter(or_(*[
+            and_(geohash >= cell, geohash < geohash_prefix_upper_bound(cell))
+            for cell in cells_for_radius(latitude, longitude, radius_km)
+        ]))
+        radius_degrees = radius_km / KM_PER_DEGREE
+        query = query.filter(distance_expression(latitude, longitude) <= radius_degrees * radius_degrees)
+    
+    return query, rank
+
+
+FACETS = ('profession', 'state', 'city', 'specialty')
+FACET_LIMIT = 50
+
+def facet_counts(db, professional_ids, facets, limit=FACET_LIMIT):
+    """Contagens por faceta sobre um conjunto filtrado, em uma única query
+    
+    professional_ids: subquery com a coluna professional_id do resultado
+    filtrado (sem paginação). Cada faceta é um GROUP BY; todos são unidos
+    com UNION ALL para ir ao banco uma vez só.
+    """
+    doc = ProfessionalSearchDocument
+    ids = professional_ids.c.professional_id
+    
+    def grouped(name, key, label):
+        return select(
+            literal(name, String).label('facet'),
+            func.max(label).label('label'),
+            func.count().label('count')
+        ).select_from(professional_ids).join(
+            doc, doc.professional_id == ids
+        ).where(key.isnot(None), key != '').group_by(key)
+    
+    selects = []
+    if 'profession' in facets:
+        selects.append(grouped('profession', doc.profession, doc.profession_name))
+    if 'state' in facets:
+        selects.append(grouped('state', doc.state, doc.state))
+    if 'city' in facets:
+        selects.append(grouped('city', doc.city, doc.city_name))
+    if 'specialty' in facets:
+        selects.append(select(
+            literal('specialty', String).label('facet'),
+            Specialty.name.label('label'),
+            func.count().label('count')
+        ).select_from(professional_ids).join(
+            user_specialties, user_specialties.c.user_id == ids
+        ).join(
+            Specialty, Specialty.id == user_specialties.c.specialty_id
+        ).group_by(Specialty.name))
+    
+    result = {name: [] for name in facets}
+    if not selects:
+        return result
+    
+    for facet, label, count in db.execute(union_all(*selects)):
+        result[facet].append({'value': label, 'count': count})
+    for name in result:
+        result[name] = sorted(result[name], key=lambda item: (-item['count'], item['value']))[:limit]
+    return result
+
+
+_backends = {}
+
+def get_search_backend(db):
+    """Obter backend de busca adequado ao banco da sessão"""
+    dialect = db.get_bind().dialect.name
+    if dialect not in _backends:
+        if dialect == 'postgresql':
+            _backends[dialect] = PostgresSearchBackend()
+        elif dialect == 'sqlite':
+            _backends[dialect] = SqliteSearchBackend()
+        else:
+            _backends[dialect] = SearchBackend()
+    return _backends[dialect]
+
+def public_card(user, specialty_names):
+    """Cartão público do profissional exibido na busca
+    
+    Ao contrário de user_to_dict, não inclui email, telefone, CPF, dados
+    bancários nem endereço completo. Aceita um User ou uma linha com os
+    mesmos atributos (usado pelo backfill da migração).
+    """
+    card = {
+        'id': user.id,
+        'name': user.name,
+        'preferred_name': user.preferred_name,
+        'social_name': user.social_name,
+        'userType': 'professional',
+        'profession': user.profession,
+        'regulatoryBody': user.regulatory_body,
+        'registrationNumber': user.registration_number,
+        'description': user.description,
+        'photo_url': user.photo_url,
+        'slot_duration': user.slot_duration or 30,
+        'specialties': specialty_names,
+        'pricing': {
+            'online': user.online_price,
+            'in_person': user.in_person_price,
+            'home': user.home_price,
+            'online_enabled': user.online_enabled if user.online_enabled is not None else True,
+            'in_person_enabled': user.in_person_enabled if user.in_person_enabled is not None else True,
+            'home_enabled': user.home_enabled if user.home_enabled is not None else False
+        }
+    }
+    
+    if user.city or user.state:
+        card['address'] = {
+            'neighborhood': user.neighborhood,
+            'city': user.city,
+            'state': user.state
+        }
+    
+    summary = rating_summary(user)
+    card['average_rating'] = summary['average_rating']
+    card['total_reviews'] = summary['total_reviews']
+    return card
+
+def search_document_values(user, specialty_names):
+    """Valores da linha de professional_search_documents de um profissional"""
+    card = public_card(user, specialty_names)
+    pricing = card['pricing']
+    return {
+        'professional_id': user.id,
+        'city': normalize_text(user.city),
+        'profession': normalize_text(user.profession),
+        'specialties': normalize_text(' '.join(specialty_names)),
+        'name': user.name,
+        'profession_name': user.profession,
+        'city_name': user.city,
+        'state': (user.state or '').upper() or None,
+        'specialty_names': json.dumps(specialty_names, ensure_ascii=False),
+        'online_price': user.online_price,
+        'in_person_price': user.in_person_price,
+        'home_price': user.home_price,
+        'online_enabled': pricing['online_enabled'],
+        'in_person_enabled': pricing['in_person_enabled'],
+        'home_enabled': pricing['home_enabled'],
+        'min_price': minimum_price(pricing),
+        'latitude': user.latitude,
+        'longitude': user.longitude,
+        'geohash': user.geohash,
+        'rating_count': user.rating_count or 0,
+        'rating_average': user.rating_average or 0,
+        'card': json.dumps(card, ensure_ascii=False, separators=(',', ':'))
+    }
+
+def minimum_price(pricing):
+    """Menor preço entre as modalidades habilitadas (None se nenhuma tiver preço)"""
+    prices = [
+        pricing[modality] for modality in MODALITIES
+        if pricing[f'{modality}_enabled'] and pricing[modality] is not None
+    ]
+    return min(prices) if prices else None
+
+def is_searchable(user):
+    """Apenas profissionais (exceto a conta de administração) aparecem na busca"""
+    return user.user_type == 'professional' and user.email != 'admin@consultavoce.com.br'
+
+def refresh_search_document(db, user):
+    """Recriar documento de busca de um profissional (não faz commit)"""
+    if not is_searchable(user):
+        return None
+    
+    db.flush()
+    # Nomes em ordem de código (sorted), como no backfill de add_search_document_cards:
+    # não depende da collation do banco nem da ordem da coleção em memória
+    values = search_document_values(user, sorted(s.name for s in user.specialties))
+    document = db.get(ProfessionalSearchDocument, user.id) or ProfessionalSearchDocument()
+    for field, value in values.items():
+        setattr(document, field, value)
+    db.add(document)
+    db.flush()
+    
+    get_search_backend(db).index(db, document)
+    return document
@@ -0,0 +1,60 @@
+"""
+Liquidação automática de consultas realizadas
+
+Depois que o profissional marca a consulta como realizada, o paciente
+tem DISPUTE_WINDOW_HOURS horas para contestar. Encerrado o prazo sem
+contestação, o pagamento é liberado ao profissional (status
+'completed', como na rejeição de uma disputa pelo admin) e a consulta
+recebe settled_at.
+
+As pendentes são encontradas pelo índice parcial
+ix_appointments_unsettled_completed_at (status 'completed' e settled_at
+nulo, por completed_at) e liquidadas em lotes com UPDATE ... WHERE id IN
+(...). No PostgreSQL o lote é travado com FOR UPDATE SKIP LOCKED: vários
+processos rodando o agendador ao mesmo tempo pegam lotes diferentes, e
+o filtro settled_at nulo torna a liquidação idempotente.
+"""
+import os
+from datetime import datetime, timedelta
+from models import Appointment, Payment
+from appointment_times import brasilia_now
+
+DISPUTE_WINDOW_HOURS = 48
+SETTLEMENT_BATCH_SIZE = 500
+SETTLEMENT_INTERVAL_SECONDS = int(os.environ.get('SETTLEMENT_INTERVAL_SECONDS', 300))
+
+# Pagamentos ainda não liberados nem reembolsados
+UNSETTLED_PAYMENT_STATUSES = ('pending', 'paid')
+
+def settlement_cutoff(now=None):
+    """Consultas realizadas antes deste instante já não podem ser contestadas
+
+    completed_at é gravado no horário de Brasília (ver complete_appointment),
+    então o corte também é.
+    """
+    now = now or brasilia_now()
+    return now.replace(tzinfo=None) - timedelta(hours=DISPUTE_WINDOW_HOURS)
+
+def settle_due_appointments(db, now=None, batch_size=SETTLEMENT_BATCH_SIZE):
+    """Liquidar um lote de consultas com o prazo de contestação encerrado
+
+    Retorna quantas consultas foram liquidadas; chamar até retornar menos
+    que batch_size, com um commit por lote (o commit libera as travas).
+    """
+    ids = [appointment_id for appointment_id, in db.query(Appointment.id).filter(
+        Appointment.status == 'completed',
+        Appointment.settled_at.is_(None),
+        Appointment.completed_at < settlement_cutoff(now)
+    ).order_by(Appointment.completed_at).limit(batch_size).with_for_update(skip_locked=True).all()]
+    if not ids:
+        return 0
+    settled_at = datetime.utcnow()
+    db.query(Payment).filter(
+        Payment.appointment_id.in_(ids),
+        Payment.status.in_(UNSETTLED_PAYMENT_STATUSES)
+    ).update({Payment.status: 'completed', Payment.updated_at: settled_at}, synchronize_session=False)
+    db.query(Appointment).filter(
+        Appointment.id.in_(ids),
+        Appointment.settled_at.is_(None)
+    ).update({Appointment.settled_at: settled_at, Appointment.updated_at: settled_at}, synchronize_session=False)
+    return len(ids)
@@ -0,0 +1,207 @@
+"""
+Calendário materializado de horários livres
+
+A tabela slot_calendar guarda os horários livres de cada profissional de
+hoje até SLOT_CALENDAR_DAYS dias à frente; users.slot_calendar_until
+marca o último dia materializado. As escritas que mudam a agenda
+recalculam só o necessário, na mesma transação:
+
+- criar/cancelar consulta, criar/liberar reserva temporária: o dia do
+  horário (refresh_calendar_day; reservas expiradas, pelo sweeper)
+- criar/remover disponibilidade ou mudar slot_duration: o horizonte
+  inteiro do profissional (refresh_calendar)
+
+O job diário (roll_slot_calendar.py) remove os dias passados e estende o
+horizonte. Leituras dentro do horizonte são uma única varredura da chave
+primária; fora dele (ou antes do primeiro job) caem no slot_engine.
+
+Um horário reservado sai do calendário em place_hold e só volta quando o
+dia é recalculado (sweep de reservas expiradas ou outra escrita no dia).
+Até lá as leituras recalculam pelo slot_engine, que já ignora reservas
+expiradas, os dias com reserva vencida ainda não varrida.
+"""
+import os
+from datetime import date, datetime, timedelta
+from sqlalchemy import func
+from models import SlotCalendar, SlotHold, User
+from appointment_times import brasilia_today
+from slot_engine import (
+    load_schedules, daily_free_slots, available_slots_range, first_available_slots,
+    format_minutes, slot_duration_of, DEFAULT_SLOT_DURATION
+)
+
+SLOT_CALENDAR_DAYS = int(os.environ.get('SLOT_CALENDAR_DAYS', 60))
+ROLL_BATCH_SIZE = 200
+
+def calendar_horizon(today=None):
+    """(primeiro, último) dia do horizonte materializado (hoje em Brasília)"""
+    today = today or brasilia_today()
+    return today, today + timedelta(days=SLOT_CALENDAR_DAYS - 1)
+
+def lock_professionals(db, professional_ids):
+    """Serializar a reescrita do calendário por profissional até o commit
+
+    Sem a trava, duas transações (READ COMMITTED) recalculam o mesmo dia
+    cada uma com o seu snapshot: o DELETE da segunda não vê o INSERT da
+    primeira e o calendário termina com chave duplicada ou com um horário
+    já agendado. Com ela, a segunda espera o commit da primeira e as
+    leituras de load_schedules já enxergam a consulta nova. FOR NO KEY
+    UPDATE não conflita com a trava de chave estrangeira que o INSERT da
+    consulta pega no profissional; a ordem por id evita deadlock entre
+    lotes. No SQLite (escritas já serializadas) é um SELECT simples.
+    """
+    db.query(User.id).filter(
+        User.id.in_(list(professional_ids))
+    ).order_by(User.id).with_for_update(key_share=True).all()
+
+def materialize(db, durations, first_day, last_day):
+    """Recalcular slot_calendar de vários profissionais no período
+
+    durations: {professional_id: slot_duration}. As queries de leitura de
+    load_schedules, um DELETE e um INSERT em lote, depois de travar as
+    linhas dos profissionais (lock_professionals).
+    """
+    if not durations or last_day < first_day:
+        return 0
+    lock_professionals(db, durations)
+    schedules = load_schedules(db, durations, first_day, last_day)
+    rows = [
+        {'professional_id': professional_id, 'date': key, 'time': format_minutes(start)}
+        for professional_id, schedule in schedules.items()
+        for key, starts in daily_free_slots(schedule, durations[professional_id], first_day, last_day)
+        for start in starts
+    ]
+    db.query(SlotCalendar).filter(
+        SlotCalendar.professional_id.in_(list(durations)),
+        SlotCalendar.date >= first_day.isoformat(),
+        SlotCalendar.date <= last_day.isoformat()
+    ).delete(synchronize_session=False)
+    if rows:
+        db.execute(SlotCalendar.__table__.insert(), rows)
+    return len(rows)
+
+def refresh_calendar(db, professional):
+    """Recalcular o horizonte inteiro do profissional (chamar antes do commit)"""
+    first_day, last_day = calendar_horizon()
+    db.flush()
+    materialize(db, {professional.id: slot_duration_of(professional)}, first_day, last_day)
+    professional.slot_calendar_until = last_day.isoformat()
+
+def refresh_calendar_day(db, professional, day):
+    """Recalcular um dia do profissional, se estiver no horizonte materializado"""
+    if not is_materialized(professional, day, day):
+        return
+    db.flush()
+    materialize(db, {professional.id: slot_duration_of(professional)}, day, day)
+
+def refresh_appointment_day(db, appointment):
+    """Recalcular o dia de uma consulta cujo status mudou"""
+    professional = db.get(User, appointment.professional_id)
+    if professional:
+        refresh_calendar_day(db, professional, date.fromisoformat(appointment.date))
+
+def is_materialized(professional, first_day, last_day):
+    """Se o período está coberto pelo calendário do profissional"""
+    until = professional.slot_calendar_until
+    return bool(until) and first_day >= brasilia_today() and last_day.isoformat() <= until
+
+def expired_hold_days(db, professional_ids, first_day, last_day, now=None):
+    """{professional_id: {datas}} com reservas expiradas ainda não varridas no período"""
+    now = now or datetime.utcnow()
+    rows = db.query(SlotHold.professional_id, SlotHold.date).filter(
+        SlotHold.professional_id.in_(list(professional_ids)),
+        SlotHold.date >= first_day.isoformat(),
+        SlotHold.date <= last_day.isoformat(),
+        SlotHold.expires_at <= now
+    ).distinct().all()
+    days = {}
+    for professional_id, key in rows:
+        days.setdefault(professional_id, set()).add(key)
+    return days
+
+def read_calendar(db, professional, first_day, last_day):
+    """Horários livres por data no período, numa varredura da chave primária
+
+    Dias com reserva expirada ainda não varrida vêm do slot_engine.
+    """
+    rows = db.query(SlotCalendar.date, SlotCalendar.time).filter(
+        SlotCalendar.professional_id == professional.id,
+        SlotCalendar.date >= first_day.isoformat(),
+        SlotCalendar.date <= last_day.isoformat()
+    ).order_by(SlotCalendar.date, SlotCalendar.time).all()
+    days = {}
+    day = first_day
+    while day <= last_day:
+        days[day.isoformat()] = []
+        day += timedelta(days=1)
+    for key, time in rows:
+        days[key].append(time)
+    stale = expired_hold_days(db, [professional.id], first_day, last_day).get(professional.id)
+    if stale:
+        fresh = available_slots_range(db, professional, date.fromisoformat(min(stale)), date.fromisoformat(max(stale)))
+        days.update({key: fresh[key] for key in stale})
+    return days
+
+def first_available_from_calendar(db, durations, first_day, last_day, now):
+    """Primeiro horário livre de cada profissional a partir do calendário
+
+    durations: {professional_id: slot_duration}; os profissionais devem ter
+    o período materializado (ver is_materialized). Uma query de reservas
+    expiradas e uma no calendário; quem tem reserva expirada não varrida no
+    período é resolvido pelo slot_engine. Retorna
+    {professional_id: (data, 'HH:MM')}.
+    """
+    if not durations:
+        return {}
+    stale = expired_hold_days(db, durations, max(first_day, now.date()), last_day)
+    first = first_available_slots(
+        db, {professional_id: durations[professional_id] for professional_id in stale}, first_day, last_day, now=now
+    )
+    professional_ids = [professional_id for professional_id in durations if professional_id not in stale]
+    if not professional_ids:
+        return first
+    today = now.date().isoformat()
+    slot = SlotCalendar.date + ' ' + SlotCalendar.time
+    rows = db.query(SlotCalendar.professional_id, func.min(slot)).filter(
+        SlotCalendar.professional_id.in_(professional_ids),
+        SlotCalendar.date >= max(first_day.isoformat(), today),
+        SlotCalendar.date <= last_day.isoformat(),
+        (SlotCalendar.date > today) | (SlotCalendar.time >= now.strftime('%H:%M'))
+    ).group_by(SlotCalendar.professional_id).all()
+    first.update({professional_id: tuple(value.split(' ')) for professional_id, value in rows})
+    return first
+
+def roll_horizon(db, today=None, batch_size=ROLL_BATCH_SIZE):
+    """Remover dias passados e estender o calendário de todos os profissionais
+
+    Processa em lotes de batch_size profissionais; cada lote usa as mesmas
+    queries de leitura de materialize. Retorna o número de
+    profissionais estendidos.
+    """
+    today = today or brasilia_today()
+    first_day, last_day = calendar_horizon(today)
+    db.query(SlotCalendar).filter(
+        SlotCalendar.date < first_day.isoformat()
+    ).delete(synchronize_session=False)
+
+    pending = db.query(User.id, User.slot_duration, User.slot_calendar_until).filter(
+        User.user_type == 'professional',
+        (User.slot_calendar_until == None) | (User.slot_calendar_until < last_day.isoformat())
+    ).order_by(User.id).all()
+
+    # Agrupar por primeiro dia a materializar (normalmente o mesmo para todos)
+    groups = {}
+    for professional_id, duration, until in pending:
+        start = first_day
+        if until and until >= first_day.isoformat():
+            start = date.fromisoformat(until) + timedelta(days=1)
+        groups.setdefault(start, []).append((professional_id, duration))
+
+    for start, professionals in groups.items():
+        for i in range(0, len(professionals), batch_size):
+            batch = professionals[i:i + batch_size]
+            materialize(db, {pid: duration or DEFAULT_SLOT_DURATION for pid, duration in batch}, start, last_day)
+            db.query(User).filter(User.id.in_([pid for pid, _ in batch])).update(
+                {User.slot_calendar_until: last_day.isoformat()}, synchronize_session=False
+            )
+    return len(pending)
@@ -0,0 +1,277 @@
+"""
+Geração de horários disponíveis
+
+Os horários livres de um dia ou de um período são calculados com quatro
+queries (agendas semanais em users.availability_bitmap, exceções de
+data, consultas ativas e reservas temporárias do período), para um ou
+vários profissionais. Exceções e feriados nacionais removem quartos da
+agenda do dia; cada consulta ocupa [início, início + duração gravada)
+e cada reserva não expirada [horário, horário + slot_duration). A
+subtração é feita com bitmaps de quartos de hora (ver bitmaps.py), sem
+consultar o banco por horário.
+"""
+import os
+from datetime import datetime, time, timedelta
+from sqlalchemy import or_, and_
+from models import User, Availability, AvailabilityException, Appointment, SlotHold
+from holidays import holidays_between
+from bitmaps import (
+    encode_week, decode_week, interval_bits, free_bits, bits_to_minutes, slot_quarters,
+    QUARTER_MINUTES, DAY_MASK
+)
+
+# Status que ocupam o horário do profissional
+ACTIVE_STATUSES = ('pending', 'confirmed', 'completed')
+DEFAULT_SLOT_DURATION = 30  # minutos
+
+# Tamanho máximo dos períodos consultados de uma vez (dias)
+MAX_RANGE_DAYS = int(os.environ.get('SLOTS_MAX_RANGE_DAYS', 62))
+
+def to_minutes(value):
+    """'HH:MM' -> minutos desde 00:00"""
+    hours, minutes = value.split(':')
+    return int(hours) * 60 + int(minutes)
+
+def format_minutes(value):
+    """Minutos desde 00:00 -> 'HH:MM'"""
+    return f'{value // 60:02d}:{value % 60:02d}'
+
+def db_day_of_week(day):
+    """Dia da semana no formato do banco (0=domingo, 6=sábado)"""
+    return (day.weekday() + 1) % 7
+
+def slot_duration_of(professional):
+    return professional.slot_duration or DEFAULT_SLOT_DURATION
+
+def merge_intervals(intervals):
+    """Ordenar e unir intervalos [início, fim) sobrepostos ou adjacentes"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [tuple(interval) for interval in merged]
+
+def availability_windows_bulk(db, professional_ids):
+    """Janelas [(início, fim)] em minutos por profissional e dia da semana, numa query"""
+    rows = db.query(
+        Availability.professional_id, Availability.day_of_week,
+        Availability.start_time, Availability.end_time
+    ).filter(
+        Availability.professional_id.in_(professional_ids),
+        Availability.is_active == True
+    ).all()
+    windows = {}
+    for professional_id, day_of_week, start, end in rows:
+        windows.setdefault(professional_id, {}).setdefault(day_of_week, []).append(
+            (to_minutes(start), to_minutes(end))
+        )
+    return windows
+
+def update_availability_bitmap(db, professional):
+    """Recalcular users.availability_bitmap a partir das linhas de Availability"""
+    db.flush()
+    windows = availability_windows_bulk(db, [professional.id]).get(professional.id, {})
+    professional.availability_bitmap = encode_week(windows)
+
+def day_bounds(first_day, last_day):
+    """[00:00 de first_day, 00:00 do dia seguinte a last_day) para filtrar starts_at"""
+    return datetime.combine(first_day, time.min), datetime.combine(last_day + timedelta(days=1), time.min)
+
+def appointment_times_bulk(db, professional_ids, first_day, last_day):
+    """(início em minutos, duração) das consultas ativas por profissional e
+    data, numa varredura de (professional_id, starts_at)
+
+    Consultas ainda sem starts_at (gravadas por workers antigos antes do
+    backfill) entram pela data/horário em texto, pelo índice único de
+    horários ativos. A duração é a gravada no agendamento (None nessas
+    consultas: vale a do profissional).
+    """
+    period_start, period_end = day_bounds(first_day, last_day)
+    rows = db.query(
+        Appointment.professional_id, Appointment.starts_at, Appointment.duration_minutes,
+        Appointment.date, Appointment.time
+    ).filter(
+        Appointment.professional_id.in_(list(professional_ids)),
+        or_(
+            and_(Appointment.starts_at >= period_start, Appointment.starts_at < period_end),
+            and_(
+                Appointment.starts_at.is_(None),
+                Appointment.date >= first_day.isoformat(),
+                Appointment.date <= last_day.isoformat()
+            )
+        ),
+        Appointment.status.in_(ACTIVE_STATUSES)
+    ).all()
+    times = {}
+    for professional_id, starts_at, duration, date_value, time_value in rows:
+        if starts_at is None:
+            try:
+                starts_at = datetime.strptime(f'{date_value} {time_value}', '%Y-%m-%d %H:%M')
+            except (ValueError, TypeError):
+                continue
+        times.setdefault(professional_id, {}).setdefault(starts_at.date().isoformat(), []).append(
+            (starts_at.hour * 60 + starts_at.minute, duration)
+        )
+    return times
+
+def hold_times_bulk(db, professional_ids, first_day, last_day, exclude_patient_id=None):
+    """Inícios (minutos) das reservas não expiradas por profissional e data, numa query"""
+    query = db.query(SlotHold.professional_id, SlotHold.date, SlotHold.time).filter(
+        SlotHold.professional_id.in_(list(professional_ids)),
+        SlotHold.date >= first_day.isoformat(),
+        SlotHold.date <= last_day.isoformat(),
+        SlotHold.expires_at > datetime.utcnow()
+    )
+    if exclude_patient_id is not None:
+        query = query.filter(SlotHold.patient_id != exclude_patient_id)
+    times = {}
+    for professional_id, date, time in query.all():
+        times.setdefault(professional_id, {}).setdefault(date, []).append(to_minutes(time))
+    return times
+
+def busy_intervals(db, professional_id, day, duration, exclude_patient_id=None):
+    """Intervalos ocupados do dia (consultas ativas e reservas de outros pacientes)"""
+    key = day.isoformat()
+    booked = appointment_times_bulk(db, [professional_id], day, day).get(professional_id, {}).get(key, [])
+    held = hold_times_bulk(db, [professional_id], day, day, exclude_patient_id).get(professional_id, {}).get(key, [])
+    return merge_intervals(
+        [(start, start + (booked_duration or duration)) for start, booked_duration in booked]
+        + [(start, start + duration) for start in held]
+    )
+
+def exception_bits_bulk(db, professional_ids, first_day, last_day):
+    """Quartos bloqueados por exceções, por profissional e data, numa query"""
+    rows = db.query(
+        AvailabilityException.professional_id, AvailabilityException.date,
+        AvailabilityException.start_time, AvailabilityException.end_time
+    ).filter(
+        AvailabilityException.professional_id.in_(list(professional_ids)),
+        AvailabilityException.date >= first_day.isoformat(),
+        AvailabilityException.date <= last_day.isoformat()
+    ).all()
+    blocked = {}
+    for professional_id, date, start, end in rows:
+        bits = interval_bits(to_minutes(start), to_minutes(end)) if start and end else DAY_MASK
+        by_date = blocked.setdefault(professional_id, {})
+        by_date[date] = by_date.get(date, 0) | bits
+    return blocked
+
+def load_schedules(db, durations, first_day, last_day):
+    """Agendas, exceções, feriados e consultas de vários profissionais em bitmaps
+
+    durations: {professional_id: slot_duration}. Quatro queries para todos
+    os profissionais (agendas, exceções, consultas e reservas). Retorna
+    {professional_id: (7 bitmaps diários, bloqueios por data, ocupados por data)}
+    apenas para quem tem disponibilidade ativa. Bloqueios (exceções e
+    feriados nacionais, para quem não atende em feriados) removem
+    quartos da agenda do dia; consultas e reservas só colidem com os slots.
+    Profissionais ainda sem availability_bitmap têm a agenda montada a
+    partir das linhas de Availability (uma query a mais).
+    """
+    if not durations:
+        return {}
+    rows = db.query(User.id, User.availability_bitmap, User.works_on_holidays).filter(
+        User.id.in_(list(durations))
+    ).all()
+    bitmaps = {pid: bitmap for pid, bitmap, _ in rows}
+    works_on_holidays = {pid for pid, _, works in rows if works}
+    missing = [pid for pid, bitmap in bitmaps.items() if bitmap is None]
+    if missing:
+        windows = availability_windows_bulk(db, missing)
+        bitmaps.update({pid: encode_week(windows.get(pid, {})) for pid in missing})
+    
+    weeks = {pid: decode_week(bitmap) for pid, bitmap in bitmaps.items()}
+    weeks = {pid: week for pid, week in weeks.items() if any(week)}
+    if not weeks:
+        return {}
+    
+    holidays = dict.fromkeys(holidays_between(first_day, last_day), DAY_MASK)
+    exceptions = exception_bits_bulk(db, list(weeks), first_day, last_day)
+    times = appointment_times_bulk(db, list(weeks), first_day, last_day)
+    for pid, by_date in hold_times_bulk(db, list(weeks), first_day, last_day).items():
+        for date, starts in by_date.items():
+            times.setdefault(pid, {}).setdefault(date, []).extend((start, None) for start in starts)
+    
+    schedules = {}
+    for pid, week in weeks.items():
+        duration = durations[pid]
+        blocked = dict(holidays) if pid not in works_on_holidays else {}
+        for date, bits in exceptions.get(pid, {}).items():
+            blocked[date] = blocked.get(date, 0) | bits
+        busy = {}
+        for date, starts in times.get(pid, {}).items():
+            day = 0
+            for start, booked_duration in starts:
+                day |= interval_bits(start, start + (booked_duration or duration))
+            busy[date] = day
+        schedules[pid] = (week, blocked, busy)
+    return schedules
+
+def daily_free_bits(schedule, duration, first_day, last_day):
+    """Gera (data 'YYYY-MM-DD', bitmap dos inícios livres) para cada dia do período
+
+    Por dia: grade da agenda semanal sem os bloqueios da data, &
+    ~colisões com o bitmap ocupado. Janelas sobrepostas já estão unidas
+    no bitmap, então não há horários duplicados.
+    """
+    week, blocked_by_date, busy_by_date = schedule
+    quarters = slot_quarters(duration)
+    day = first_day
+    while day <= last_day:
+        key = day.isoformat()
+        template = week[db_day_of_week(day)] & ~blocked_by_date.get(key, 0)
+        yield key, free_bits(template, busy_by_date.get(key, 0), quarters)
+        day += timedelta(days=1)
+
+def daily_free_slots(schedule, duration, first_day, last_day):
+    """Gera (data 'YYYY-MM-DD', [minutos livres]) para cada dia do período"""
+    for key, bits in daily_free_bits(schedule, duration, first_day, last_day):
+        yield key, bits_to_minutes(bits)
+
+def available_slots_range(db, professional, first_day, last_day):
+    """Horários livres por data ('YYYY-MM-DD' -> ['HH:MM']) de first_day a last_day
+
+    As queries de load_schedules valem para o período inteiro.
+    """
+    duration = slot_duration_of(professional)
+    schedule = load_schedules(db, {professional.id: duration}, first_day, last_day).get(professional.id, ([0] * 7, {}, {}))
+    return {
+        key: [format_minutes(start) for start in starts]
+        for key, starts in daily_free_slots(schedule, duration, first_day, last_day)
+    }
+
+def available_slots(db, professional, day):
+    """Horários livres ('HH:MM') do profissional em uma data"""
+    return available_slots_range(db, professional, day, day)[day.isoformat()]
+
+def first_available_slots(db, durations, first_day, last_day, now=None):
+    """Primeiro horário livre de cada profissional no período
+
+    durations: {professional_id: slot_duration}. Usa as queries de
+    load_schedules para todos os profissionais; now (datetime) descarta horários já passados.
+    Retorna {professional_id: (data 'YYYY-MM-DD', 'HH:MM')} apenas para
+    quem tem horário livre.
+    """
+    today = now.date().isoformat() if now else None
+    # Quartos de hoje que já começaram ficam de fora
+    past_today = (1 << -(-(now.hour * 60 + now.minute) // QUARTER_MINUTES)) - 1 if now else 0
+    first = {}
+    for professional_id, schedule in load_schedules(db, durations, first_day, last_day).items():
+        for key, bits in daily_free_bits(schedule, durations[professional_id], first_day, last_day):
+            if key == today:
+                bits &= ~past_today
+            if bits:
+                first[professional_id] = (key, format_minutes(bits_to_minutes(bits & -bits)[0]))
+                break
+    return first
+
+def has_conflict(db, professional, day, time, patient_id=None):
+    """Se um agendamento em day/time colide com consultas ativas do
+    profissional ou com reservas de outros pacientes (as do próprio
+    patient_id não contam)"""
+    duration = slot_duration_of(professional)
+    start = to_minutes(time)
+    busy = busy_intervals(db, professional.id, day, duration, patient_id)
+    return any(busy_start < start + duration and start < busy_end for busy_start, busy_end in busy)
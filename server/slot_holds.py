@@ -0,0 +1,128 @@
+"""
+Reservas temporárias de horário
+
+Enquanto o paciente preenche o checkout, o horário escolhido fica
+reservado por SLOT_HOLD_MINUTES minutos (tabela slot_holds). Reservas
+não expiradas ocupam o horário no slot_engine (e portanto no calendário
+materializado) e contam como conflito em create_appointment para os
+demais pacientes. Cada paciente tem no máximo uma reserva ativa; a
+chave única (profissional, data, horário) decide corridas entre duas
+reservas do mesmo horário.
+
+Reservas expiradas deixam de contar no slot_engine imediatamente, e as
+leituras do calendário recalculam os dias com reserva vencida (ver
+slot_calendar.expired_hold_days); o sweep_slot_holds.py, rodado pelo
+processo scheduler, remove as linhas em lotes (pelo índice de
+expires_at) e recalcula os dias afetados do calendário.
+"""
+import os
+from datetime import date, datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from models import SlotHold, User
+from slot_engine import available_slots, DEFAULT_SLOT_DURATION
+from slot_calendar import materialize, refresh_calendar_day, calendar_horizon
+
+SLOT_HOLD_MINUTES = int(os.environ.get('SLOT_HOLD_MINUTES', 10))
+SWEEP_BATCH_SIZE = 500
+
+def hold_to_dict(hold):
+    return {
+        'id': hold.id,
+        'professional_id': hold.professional_id,
+        'date': hold.date,
+        'time': hold.time,
+        'expires_at': hold.expires_at.isoformat()
+    }
+
+def place_hold(db, professional, patient_id, day, time, now=None):
+    """Reservar day/time para o paciente; None se o horário não está livre
+
+    Libera a reserva anterior do paciente e remove uma reserva expirada
+    do mesmo horário ainda não varrida. A corrida entre dois pacientes
+    termina na chave única: o segundo também recebe None e o chamador
+    faz rollback.
+    """
+    now = now or datetime.utcnow()
+    previous = db.query(SlotHold).filter(SlotHold.patient_id == patient_id).all()
+    for hold in previous:
+        db.delete(hold)
+    db.flush()
+    db.query(SlotHold).filter(
+        SlotHold.professional_id == professional.id,
+        SlotHold.date == day.isoformat(),
+        SlotHold.time == time,
+        SlotHold.expires_at <= now
+    ).delete(synchronize_session=False)
+
+    if time not in available_slots(db, professional, day):
+        return None
+
+    hold = SlotHold(
+        professional_id=professional.id,
+        patient_id=patient_id,
+        date=day.isoformat(),
+        time=time,
+        expires_at=now + timedelta(minutes=SLOT_HOLD_MINUTES)
+    )
+    db.add(hold)
+    try:
+        db.flush()
+    except IntegrityError:
+        return None
+    refresh_days(db, {(previous_hold.professional_id, previous_hold.date) for previous_hold in previous})
+    refresh_calendar_day(db, professional, day)
+    return hold
+
+def release_holds(db, patient_id, professional_id=None):
+    """Remover as reservas do paciente (opcionalmente só de um profissional)
+
+    Retorna os pares (profissional, data) liberados, para recalcular o
+    calendário com refresh_days.
+    """
+    query = db.query(SlotHold).filter(SlotHold.patient_id == patient_id)
+    if professional_id is not None:
+        query = query.filter(SlotHold.professional_id == professional_id)
+    holds = query.all()
+    for hold in holds:
+        db.delete(hold)
+    return {(hold.professional_id, hold.date) for hold in holds}
+
+def refresh_days(db, days):
+    """Recalcular no calendário os pares (profissional, data) materializados
+
+    Um materialize por data com todos os profissionais daquela data.
+    """
+    if not days:
+        return
+    db.flush()
+    first_day = calendar_horizon()[0]
+    rows = db.query(User.id, User.slot_duration, User.slot_calendar_until).filter(
+        User.id.in_({professional_id for professional_id, _ in days})
+    ).all()
+    professionals = {pid: (duration or DEFAULT_SLOT_DURATION, until) for pid, duration, until in rows}
+    by_date = {}
+    for professional_id, key in days:
+        duration, until = professionals.get(professional_id, (None, None))
+        if until and first_day.isoformat() <= key <= until:
+            by_date.setdefault(key, {})[professional_id] = duration
+    for key, durations in by_date.items():
+        day = date.fromisoformat(key)
+        materialize(db, durations, day, day)
+
+def sweep_expired_holds(db, now=None, batch_size=SWEEP_BATCH_SIZE):
+    """Remover um lote de reservas expiradas e recalcular os dias afetados
+
+    Retorna quantas reservas foram removidas; chamar até retornar menos
+    que batch_size, com um commit por lote.
+    """
+    now = now or datetime.utcnow()
+    rows = db.query(SlotHold.id, SlotHold.professional_id, SlotHold.date).filter(
+        SlotHold.expires_at <= now
+    ).order_by(SlotHold.expires_at).limit(batch_size).all()
+    if not rows:
+        return 0
+    db.query(SlotHold).filter(
+        SlotHold.id.in_([hold_id for hold_id, _, _ in rows])
+    ).delete(synchronize_session=False)
+    refresh_days(db, {(professional_id, key) for _, professional_id, key in rows})
+    return len(rows)
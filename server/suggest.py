@@ -0,0 +1,221 @@
+"""
+Índice em memória para o autocomplete da busca
+
+Especialidades, profissões e cidades ficam num array ordenado de termos
+normalizados (sem acentos, minúsculas). Cada nome gera um termo por
+início de palavra, de modo que 'clin' encontra 'Psicologia Clínica'. A
+busca é um bisect pelo prefixo e as sugestões são ordenadas pelo número
+de profissionais; para prefixos curtos (que casam com muitas entradas)
+as melhores entradas já ficam pré-calculadas por tipo.
+
+O índice é construído na inicialização, atualizado de forma incremental
+nos cadastros e reconstruído periodicamente para refletir edições de
+perfil (SUGGEST_REBUILD_SECONDS). A reconstrução roda numa thread e
+troca o índice de uma vez; até lá as sugestões saem do índice anterior.
+"""
+import bisect
+import heapq
+import json
+import os
+import threading
+import time
+from collections import Counter
+from models import Specialty, ProfessionalSearchDocument
+from search import normalize_text
+
+SUGGEST_TYPES = ('specialty', 'profession', 'city')
+DEFAULT_SUGGEST_LIMIT = 10
+MAX_SUGGEST_LIMIT = 50
+SHORT_PREFIX = 3
+
+class SuggestIndex:
+    """Array ordenado de (termo, entrada) com contagem por entrada"""
+
+    def __init__(self, rebuild_interval=300, memo_size=4096):
+        self.rebuild_interval = rebuild_interval
+        self.memo_size = memo_size
+        self.built_at = None
+        self._lock = threading.Lock()
+        self._rebuilding = False
+        self._reset()
+
+    def _reset(self):
+        self._terms = []      # [(termo, id da entrada)] ordenado
+        self._entries = []    # [{'type', 'key', 'state', 'displays', 'count'}]
+        self._by_key = {}     # (tipo, chave normalizada, uf) -> id da entrada
+        self._top = {}        # (prefixo curto, tipo) -> ids das entradas mais frequentes
+        self._memo = {}       # (prefixo, tipos, limite) -> sugestões
+
+    def is_stale(self):
+        return self.built_at is None or time.monotonic() - self.built_at > self.rebuild_interval
+
+    def build(self, db):
+        """Reconstruir a partir dos documentos de busca e da tabela de especialidades
+
+        O índice novo é montado fora da trava e trocado de uma vez; as
+        consultas concorrentes não esperam as queries nem a ordenação.
+        """
+        doc = ProfessionalSearchDocument
+        rows = db.query(doc.profession_name, doc.city_name, doc.state, doc.specialty_names).all()
+        specialty_names = [name for (name,) in db.query(Specialty.name).all()]
+
+        fresh = SuggestIndex(self.rebuild_interval, self.memo_size)
+        fresh._load(rows, specialty_names)
+        with self._lock:
+            self._terms, self._entries, self._by_key = fresh._terms, fresh._entries, fresh._by_key
+            self._top, self._memo = fresh._top, {}
+            self.built_at = time.monotonic()
+
+    def _load(self, rows, specialty_names):
+        for name in specialty_names:
+            self._add('specialty', name, count=0, sort=False)
+        for profession, city, state, specialties in rows:
+            self._add_professional(profession, city, state, json.loads(specialties or '[]'), sort=False)
+        self._terms.sort()
+        candidates = {}
+        for entry_id, entry in enumerate(self._entries):
+            for prefix in short_prefixes(entry['key']):
+                candidates.setdefault((prefix, entry['type']), []).append(entry_id)
+        for top_key, ids in candidates.items():
+            self._top[top_key] = heapq.nsmallest(MAX_SUGGEST_LIMIT, ids, key=self._rank)
+
+    def rebuild_if_stale(self, session_factory):
+        """Disparar a reconstrução numa thread se o índice expirou
+
+        Só o primeiro chamador dispara; todos seguem servindo o índice
+        atual até a troca. Retorna se disparou.
+        """
+        with self._lock:
+            if self._rebuilding or not self.is_stale():
+                return False
+            self._rebuilding = True
+        threading.Thread(
+            target=self._rebuild, args=(session_factory,), name='suggest-rebuild', daemon=True
+        ).start()
+        return True
+
+    def _rebuild(self, session_factory):
+        db = session_factory()
+        try:
+            self.build(db)
+        except Exception as e:
+            print(f"Erro ao reconstruir índice de autocomplete: {e}")
+        finally:
+            db.close()
+            self._rebuilding = False
+
+    def add_professional(self, profession, city, state, specialties):
+        """Contabilizar um profissional novo (cria entradas que ainda não existem)"""
+        with self._lock:
+            self._add_professional(profession, city, state, specialties)
+            self._memo.clear()
+
+    def _add_professional(self, profession, city, state, specialties, sort=True):
+        self._add('profession', profession, sort=sort)
+        self._add('city', city, state=(state or '').upper() or None, sort=sort)
+        for name in set(specialties):
+            self._add('specialty', name, sort=sort)
+
+    def _add(self, kind, display, state=None, count=1, sort=True):
+        key = normalize_text(display)
+        if not key:
+            return
+        entry_id = self._by_key.get((kind, key, state))
+        if entry_id is None:
+            entry_id = len(self._entries)
+            self._by_key[(kind, key, state)] = entry_id
+            self._entries.append({
+                'type': kind, 'key': key, 'state': state,
+                'displays': Counter(), 'count': 0
+            })
+            # Um termo por início de palavra
+            words = key.split()
+            for i in range(len(words)):
+                term = (' '.join(words[i:]), entry_id)
+                if sort:
+                    bisect.insort(self._terms, term)
+                else:
+                    self._terms.append(term)
+        entry = self._entries[entry_id]
+        entry['displays'][display.strip()] += 1
+        entry['count'] += count
+        if sort:
+            self._promote(entry_id)
+
+    def _rank(self, entry_id):
+        entry = self._entries[entry_id]
+        return -entry['count'], entry['key']
+
+    def _promote(self, entry_id):
+        """Atualizar as listas de prefixos curtos (contagens só crescem)"""
+        entry = self._entries[entry_id]
+        for prefix in short_prefixes(entry['key']):
+            top = self._top.setdefault((prefix, entry['type']), [])
+            if entry_id not in top:
+                top.append(entry_id)
+            top.sort(key=self._rank)
+            del top[MAX_SUGGEST_LIMIT:]
+
+    def suggest(self, query, limit=DEFAULT_SUGGEST_LIMIT, types=SUGGEST_TYPES):
+        """Sugestões para o prefixo digitado, mais frequentes primeiro"""
+        prefix = normalize_text(query)
+        if not prefix:
+            return []
+        memo_key = (prefix, tuple(types), limit)
+        with self._lock:
+            cached = self._memo.get(memo_key)
+            if cached is not None:
+                return cached
+
+            if len(prefix) <= SHORT_PREFIX:
+                matched = [i for kind in types for i in self._top.get((prefix, kind), ())]
+            else:
+                start = bisect.bisect_left(self._terms, (prefix,))
+                end = bisect.bisect_left(self._terms, (prefix + '\uffff',), start)
+                matched = {entry_id for _, entry_id in self._terms[start:end]}
+                matched = [i for i in matched if self._entries[i]['type'] in types]
+
+            top = heapq.nsmallest(limit, matched, key=self._rank)
+            result = [self._to_dict(self._entries[i]) for i in top]
+
+            if len(self._memo) >= self.memo_size:
+                self._memo.clear()
+            self._memo[memo_key] = result
+            return result
+
+    def names(self, kind):
+        """Todos os nomes de um tipo, em ordem alfabética"""
+        with self._lock:
+            entries = [e for e in self._entries if e['type'] == kind]
+        return [self._display(e) for e in sorted(entries, key=lambda e: e['key'])]
+
+    @staticmethod
+    def _display(entry):
+        return entry['displays'].most_common(1)[0][0]
+
+    def _to_dict(self, entry):
+        suggestion = {
+            'type': entry['type'],
+            'value': self._display(entry),
+            'count': entry['count']
+        }
+        if entry['type'] == 'city':
+            suggestion['state'] = entry['state']
+        return suggestion
+
+
+def short_prefixes(key):
+    """Prefixos de até SHORT_PREFIX caracteres de cada início de palavra"""
+    words = key.split()
+    prefixes = set()
+    for i in range(len(words)):
+        term = ' '.join(words[i:])
+        prefixes.update(term[:size] for size in range(1, min(len(term), SHORT_PREFIX) + 1))
+    return prefixes
+
+
+_index = SuggestIndex(rebuild_interval=int(os.environ.get('SUGGEST_REBUILD_SECONDS', 300)))
+
+def get_suggest_index():
+    """Índice de autocomplete do processo"""
+    return _index
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Script para liquidar consultas realizadas cujo prazo de contestação
+(48h) terminou: libera os pagamentos ao profissional em lotes, com um
+commit por lote. Sem argumentos faz uma rodada (ex.: cron do Railway);
+com --loop repete a cada SETTLEMENT_INTERVAL_SECONDS (processo
+scheduler do Procfile), liberando também as reservas de horário
+expiradas (sweep_slot_holds.py) e preenchendo starts_at das consultas
+gravadas sem ele (backfill_appointment_starts.py). Várias instâncias podem rodar ao mesmo
+tempo: cada lote é travado com FOR UPDATE SKIP LOCKED (ver
+server/settlement.py).
+"""
+import os
+import sys
+import time
+
+# Adicionar diretório server ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'server'))
+
+from database import SessionLocal
+from settlement import settle_due_appointments, SETTLEMENT_BATCH_SIZE, SETTLEMENT_INTERVAL_SECONDS
+import sweep_slot_holds
+import backfill_appointment_starts
+
+def main():
+    db = SessionLocal()
+    try:
+        print("🔄 Liquidando consultas com prazo de contestação encerrado...")
+        total = 0
+        while True:
+            settled = settle_due_appointments(db)
+            db.commit()
+            total += settled
+            if settled < SETTLEMENT_BATCH_SIZE:
+                break
+        print(f"✅ {total} consultas liquidadas")
+        return True
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Erro ao liquidar consultas: {e}")
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    if '--loop' in sys.argv:
+        while True:
+            main()
+            sweep_slot_holds.main()
+            backfill_appointment_starts.main()
+            time.sleep(SETTLEMENT_INTERVAL_SECONDS)
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Script para liberar reservas temporárias de horário expiradas
+(slot_holds): remove as linhas em lotes, com um commit por lote, e
+recalcula os dias afetados do calendário materializado. O processo
+scheduler (settle_appointments.py --loop) já roda esta limpeza a cada
+rodada; as leituras do calendário não dependem dela, pois recalculam
+pelo slot_engine os dias com reserva expirada ainda não varrida.
+"""
+import os
+import sys
+
+# Adicionar diretório server ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'server'))
+
+from database import SessionLocal
+from slot_holds import sweep_expired_holds, SWEEP_BATCH_SIZE
+
+def main():
+    db = SessionLocal()
+    try:
+        print("🔄 Liberando reservas de horário expiradas...")
+        total = 0
+        while True:
+            swept = sweep_expired_holds(db)
+            db.commit()
+            total += swept
+            if swept < SWEEP_BATCH_SIZE:
+                break
+        print(f"✅ {total} reservas liberadas")
+        return True
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Erro ao liberar reservas: {e}")
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
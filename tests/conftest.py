@@ -0,0 +1,54 @@
+"""
+Fixtures dos testes: app Flask sobre um SQLite em memória
+
+DATABASE_URL precisa estar definido antes do primeiro import de
+database.py, que cria o engine no import.
+"""
+import os
+import sys
+
+os.environ['DATABASE_URL'] = 'sqlite://'
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'server'))
+sys.path.insert(0, ROOT)
+
+import pytest
+from sqlalchemy import event
+from database import Base, engine, SessionLocal
+import models  # noqa: F401  (registra as tabelas no Base)
+from cache import get_cache
+
+@pytest.fixture
+def db_schema():
+    """Tabelas criadas do zero a cada teste"""
+    Base.metadata.create_all(engine)
+    yield
+    Base.metadata.drop_all(engine)
+    get_cache().clear()
+
+@pytest.fixture
+def client(db_schema):
+    from app import app
+    app.config['TESTING'] = True
+    return app.test_client()
+
+@pytest.fixture
+def db(db_schema):
+    session = SessionLocal()
+    yield session
+    session.close()
+
+@pytest.fixture
+def count_queries():
+    """Executa fn() e retorna (número de statements SQL, resultado)"""
+    def count(fn):
+        statements = []
+        listener = lambda *args, **kwargs: statements.append(args[2])
+        event.listen(engine, 'before_cursor_execute', listener)
+        try:
+            result = fn()
+        finally:
+            event.remove(engine, 'before_cursor_execute', listener)
+        return len(statements), result
+    return count
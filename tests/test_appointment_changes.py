@@ -0,0 +1,27 @@
+"""Sincronização incremental: consultas gravadas fora do ORM também são entregues"""
+from sqlalchemy import text
+import routes.appointment
+from models import User
+
+def test_changes_include_appointment_inserted_without_updated_at(client, db, monkeypatch):
+    monkeypatch.setattr(routes.appointment, 'CHANGES_SETTLE_SECONDS', 0)
+    response = client.post('/api/auth/register', json={
+        'email': 'paciente@teste.com', 'password': 'x', 'name': 'Paciente', 'userType': 'patient'
+    })
+    assert response.status_code == 201
+    body = response.get_json()
+    headers = {'Authorization': f"Bearer {body['token']}"}
+    professional = User(email='profissional@teste.com', password='x', name='Profissional', user_type='professional')
+    db.add(professional)
+    db.commit()
+    
+    # SQL manual sem updated_at: o default do banco preenche
+    db.execute(text(
+        "INSERT INTO appointments (patient_id, professional_id, date, time, type, price, status) "
+        "VALUES (:patient, :professional, '2026-10-20', '08:00', 'Online', 100, 'pending')"
+    ), {'patient': body['user']['id'], 'professional': professional.id})
+    db.commit()
+    
+    response = client.get('/api/appointments/changes', headers=headers)
+    assert response.status_code == 200
+    assert [change['time'] for change in response.get_json()['changes']] == ['08:00']
@@ -0,0 +1,57 @@
+"""Cache de busca/perfil: invalidação propagada entre processos"""
+import cache
+from cache import MemoryCache, set_invalidation_backend, invalidate_professional, professional_tag, SEARCH_TAG
+from events import EventBackend
+
+class LoopbackBackend(EventBackend):
+    """Transporte em memória no lugar do LISTEN/NOTIFY: entrega a todos os inscritos"""
+    
+    def __init__(self):
+        self.listeners = []
+        self.published = []
+    
+    def start(self, deliver):
+        self.listeners.append(deliver)
+    
+    def publish(self, user_ids, event):
+        self.published.append(event)
+        for deliver in self.listeners:
+            deliver(user_ids, event)
+
+def test_invalidation_from_another_process_reaches_local_cache(monkeypatch):
+    monkeypatch.setattr(cache, '_backend', MemoryCache())
+    monkeypatch.setattr(cache, '_invalidation_backend', None)
+    transport = LoopbackBackend()
+    set_invalidation_backend(transport)
+    cache.get_cache().set('search?city=recife', '{}', tags=(SEARCH_TAG,))
+    cache.get_cache().set('professional?id=7', {}, tags=(professional_tag(7),))
+    
+    # Outro processo (ex.: reconcile_ratings.py) publica a invalidação
+    transport.listeners[0]([], {'tags': [professional_tag(7), SEARCH_TAG]})
+    
+    assert cache.get_cache().get('search?city=recife') is None
+    assert cache.get_cache().get('professional?id=7') is None
+
+def test_invalidate_professional_publishes_tags(monkeypatch):
+    monkeypatch.setattr(cache, '_backend', MemoryCache())
+    monkeypatch.setattr(cache, '_invalidation_backend', None)
+    transport = LoopbackBackend()
+    set_invalidation_backend(transport, listen=False)
+    
+    invalidate_professional(7)
+    
+    assert transport.listeners == []
+    assert transport.published == [{'tags': [professional_tag(7), SEARCH_TAG]}]
+
+def test_publish_failure_keeps_local_invalidation(monkeypatch):
+    class BrokenBackend(LoopbackBackend):
+        def publish(self, user_ids, event):
+            raise ConnectionError('banco indisponível')
+    monkeypatch.setattr(cache, '_backend', MemoryCache())
+    monkeypatch.setattr(cache, '_invalidation_backend', None)
+    set_invalidation_backend(BrokenBackend(), listen=False)
+    cache.get_cache().set('search?city=recife', '{}', tags=(SEARCH_TAG,))
+    
+    invalidate_professional(7)
+    
+    assert cache.get_cache().get('search?city=recife') is None
@@ -0,0 +1,74 @@
+"""Busca de profissionais: número de queries e paginação por cursor"""
+from models import User, Appointment, Review
+from cache import get_cache
+from ratings import register_review
+from search import refresh_search_document
+from pagination import encode_cursor
+
+def create_professionals(db, count, start=0):
+    patient = db.query(User).filter(User.email == 'paciente@teste.com').first()
+    if not patient:
+        patient = User(email='paciente@teste.com', password='x', name='Paciente', user_type='patient')
+        db.add(patient)
+        db.flush()
+    for i in range(start, start + count):
+        professional = User(
+            email=f'profissional{i}@teste.com', password='x', name=f'Profissional {i}',
+            user_type='professional', profession='Fisioterapeuta', city='Recife', state='PE'
+        )
+        db.add(professional)
+        db.flush()
+        for rating in (3, 5):
+            appointment = Appointment(
+                patient_id=patient.id, professional_id=professional.id, date='2026-01-05',
+                time=f'{8 + rating:02d}:00', type='presencial', price=100, status='completed'
+            )
+            db.add(appointment)
+            db.flush()
+            db.add(Review(appointment_id=appointment.id, patient_id=patient.id,
+                          professional_id=professional.id, rating=rating))
+            register_review(db, professional.id, rating)
+        db.refresh(professional)
+        refresh_search_document(db, professional)
+    db.commit()
+
+def search(client):
+    response = client.get('/api/professionals/search?limit=100')
+    assert response.status_code == 200
+    return response.get_json()
+
+def test_search_query_count_does_not_grow_with_results(client, db, count_queries):
+    create_professionals(db, 3)
+    small_count, small = count_queries(lambda: search(client))
+    
+    create_professionals(db, 30, start=3)
+    get_cache().clear()
+    large_count, large = count_queries(lambda: search(client))
+    
+    assert len(small['professionals']) == 3
+    assert len(large['professionals']) == 33
+    assert large_count == small_count
+    
+    ratings = {professional['average_rating'] for professional in large['professionals']}
+    assert ratings == {4.0}
+
+def test_search_pages_through_all_results_by_cursor(client, db):
+    create_professionals(db, 25)
+    seen, cursor = [], None
+    while True:
+        response = client.get('/api/professionals/search', query_string={'limit': 10, 'cursor': cursor or ''})
+        assert response.status_code == 200
+        body = response.get_json()
+        assert 'total' not in body
+        seen += [professional['id'] for professional in body['professionals']]
+        cursor = body['next_cursor']
+        if not cursor:
+            break
+    assert len(seen) == 25 and len(set(seen)) == 25
+
+def test_search_rejects_cursor_with_wrong_types(client):
+    for values in (['4.0', 1], [4.0, '1'], [None, 1], [4.0, 1.5], [True, 1], [float('nan'), 1], [float('inf'), 1]):
+        response = client.get('/api/professionals/search', query_string={'cursor': encode_cursor(values)})
+        assert response.status_code == 400, values
+    response = client.get('/api/professionals/search?cursor=NaN-lixo')
+    assert response.status_code == 400
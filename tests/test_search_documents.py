@@ -0,0 +1,56 @@
+"""Documentos de busca: cartões iguais no refresh e no backfill; LIKE por prefixo de palavra"""
+import importlib.util
+import json
+import os
+from sqlalchemy import select
+from models import User, Specialty, ProfessionalSearchDocument
+from search import refresh_search_document, SearchBackend
+
+MIGRATION = os.path.join(os.path.dirname(__file__), '..', 'alembic', 'versions', 'add_search_document_cards.py')
+
+def load_migration():
+    spec = importlib.util.spec_from_file_location('add_search_document_cards', MIGRATION)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def create_professional(db, specialty_names, **fields):
+    professional = User(
+        email=f"{fields.get('name', 'profissional')}@teste.com", password='x', user_type='professional',
+        **{'name': 'Profissional', 'profession': 'Psicólogo', 'city': 'Recife', 'state': 'PE', **fields}
+    )
+    professional.specialties = [Specialty(name=name) for name in specialty_names]
+    db.add(professional)
+    db.flush()
+    return professional
+
+def test_refreshed_card_matches_backfilled_card(db):
+    names = ['Terapia de Casal', 'Ética Profissional', 'Estética', 'Ansiedade']
+    professional = create_professional(db, names)
+    document = refresh_search_document(db, professional)
+    db.commit()
+    
+    backfilled = load_migration().search_document_values(professional, sorted(names))
+    assert document.card == backfilled['card']
+    assert json.loads(document.card)['specialties'] == sorted(names)
+    
+    # Recarregada do banco (outra ordem da coleção), o cartão não muda
+    db.expire_all()
+    professional = db.get(User, professional.id)
+    assert refresh_search_document(db, professional).card == backfilled['card']
+
+def test_generic_backend_matches_word_prefixes_only(db):
+    cardiologist = create_professional(db, ['Cardiologia'], name='cardio')
+    clinical = create_professional(db, ['Psicologia Clínica'], name='clinica')
+    for professional in (cardiologist, clinical):
+        refresh_search_document(db, professional)
+    db.commit()
+    
+    def found(value):
+        matches = SearchBackend().matches(db, {'specialties': value})
+        return set(db.execute(select(matches.c.professional_id)).scalars())
+    
+    assert found('cardio') == {cardiologist.id}
+    assert found('clin') == {clinical.id}
+    assert found('psico clin') == {clinical.id}
+    assert found('ologia') == set()
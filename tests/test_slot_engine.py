@@ -0,0 +1,30 @@
+"""slot_engine: consultas gravadas sem starts_at ainda ocupam o horário"""
+from datetime import timedelta
+from models import User, Availability, Appointment
+from appointment_times import brasilia_today, backfill_starts_at
+from slot_engine import available_slots, update_availability_bitmap
+from database import engine
+
+def test_appointment_without_starts_at_is_busy_and_backfilled(db):
+    patient = User(email='paciente@teste.com', password='x', name='Paciente', user_type='patient')
+    professional = User(email='profissional@teste.com', password='x', name='Profissional',
+                        user_type='professional', slot_duration=30)
+    db.add_all([patient, professional])
+    db.flush()
+    for day_of_week in range(7):
+        db.add(Availability(professional_id=professional.id, day_of_week=day_of_week,
+                            start_time='08:00', end_time='10:00', is_active=True))
+    update_availability_bitmap(db, professional)
+    day = brasilia_today() + timedelta(days=2)
+    # Gravada por um worker anterior à migração: sem starts_at/duration_minutes
+    db.add(Appointment(patient_id=patient.id, professional_id=professional.id, date=day.isoformat(),
+                       time='08:30', type='Online', price=100, status='confirmed'))
+    db.commit()
+    
+    assert available_slots(db, professional, day) == ['08:00', '09:00', '09:30']
+    
+    with engine.connect() as connection:
+        assert backfill_starts_at(connection, commit=connection.commit) == (1, 0)
+    db.expire_all()
+    assert db.query(Appointment).one().starts_at.strftime('%H:%M') == '08:30'
+    assert available_slots(db, professional, day) == ['08:00', '09:00', '09:30']
@@ -0,0 +1,53 @@
+"""Reservas temporárias: horário de reserva expirada volta ao calendário sem o sweep"""
+from datetime import datetime, timedelta
+from models import SlotHold
+from appointment_times import brasilia_today
+
+def register(client, email, **fields):
+    response = client.post('/api/auth/register', json={
+        'email': email, 'password': 'x', 'name': email, **fields
+    })
+    assert response.status_code == 201
+    body = response.get_json()
+    return body['user']['id'], {'Authorization': f"Bearer {body['token']}"}
+
+def test_expired_hold_returns_to_calendar_without_sweep(client, db):
+    professional_id, professional = register(
+        client, 'profissional@teste.com', userType='professional', city='Recife', state='PE', profession='Psicólogo'
+    )
+    response = client.put('/api/availability/my', headers=professional, json={'availability': [
+        {'day_of_week': day, 'start_time': '08:00', 'end_time': '09:00'} for day in range(7)
+    ]})
+    assert response.status_code == 200
+    _, patient = register(client, 'paciente@teste.com', userType='patient')
+    
+    day = (brasilia_today() + timedelta(days=2)).isoformat()
+    day_after = (brasilia_today() + timedelta(days=3)).isoformat()
+    
+    def free_slots():
+        response = client.get(f'/api/slots/{professional_id}/available-slots', query_string={'date': day})
+        assert response.status_code == 200
+        return response.get_json()['slots']
+    
+    def first_available():
+        response = client.get('/api/professionals/first-available', query_string={'from': day, 'to': day_after})
+        assert response.status_code == 200
+        return [professional['first_available'] for professional in response.get_json()['professionals']]
+    
+    # Reservar todos os horários do dia: o primeiro livre passa ao dia seguinte
+    for time_value in free_slots():
+        response = client.post('/api/slots/holds', headers=patient, json={
+            'professional_id': professional_id, 'date': day, 'time': time_value
+        })
+        assert response.status_code == 201
+        # Cada paciente tem uma reserva ativa: manter as anteriores
+        db.query(SlotHold).update({SlotHold.patient_id: professional_id}, synchronize_session=False)
+        db.commit()
+    assert free_slots() == []
+    assert first_available() == [{'date': day_after, 'time': '08:00'}]
+    
+    # Reservas vencem sem o sweep_slot_holds.py rodar
+    db.query(SlotHold).update({SlotHold.expires_at: datetime.utcnow() - timedelta(minutes=1)})
+    db.commit()
+    assert free_slots() == ['08:00', '08:30']
+    assert first_available() == [{'date': day, 'time': '08:00'}]
@@ -0,0 +1,39 @@
+"""Atualização de perfil: preços das modalidades"""
+import pytest
+
+def register_professional(client):
+    response = client.post('/api/auth/register', json={
+        'email': 'profissional@teste.com', 'password': 'x', 'name': 'Profissional',
+        'userType': 'professional', 'city': 'Recife', 'state': 'PE'
+    })
+    assert response.status_code == 201
+    headers = {'Authorization': f"Bearer {response.get_json()['token']}"}
+    response = client.patch('/api/users/profile', headers=headers, json={
+        'inPersonPrice': 120.0, 'onlineEnabled': True, 'inPersonEnabled': True
+    })
+    assert response.status_code == 200
+    return headers
+
+def test_price_sent_as_string_is_stored_as_number(client):
+    headers = register_professional(client)
+    response = client.patch('/api/users/profile', headers=headers, json={'onlinePrice': '150'})
+    assert response.status_code == 200
+    pricing = response.get_json()['user']['pricing']
+    assert pricing['online'] == 150.0
+    assert pricing['in_person'] == 120.0
+    
+    found = client.get('/api/professionals/search', query_string={'max_price': 130}).get_json()
+    assert len(found['professionals']) == 1
+
+def test_empty_price_clears_it(client):
+    headers = register_professional(client)
+    response = client.patch('/api/users/profile', headers=headers, json={'inPersonPrice': ''})
+    assert response.status_code == 200
+    assert response.get_json()['user']['pricing']['in_person'] is None
+
+@pytest.mark.parametrize('value', ['abc', -10, 'NaN', 'inf', True, [150], {'valor': 150}])
+def test_invalid_price_is_rejected(client, value):
+    headers = register_professional(client)
+    response = client.patch('/api/users/profile', headers=headers, json={'onlinePrice': value})
+    assert response.status_code == 400
+    assert client.get('/api/users/profile', headers=headers).get_json()['user']['pricing']['online'] is None